@@ -3,14 +3,11 @@ import os
 from flask import Flask
 from flask_login import LoginManager
 
-from sap.cf_logging import flask_logging
-from dotenv import load_dotenv
-
 from app.database import DatabaseManager
-from config import Config, config_manager
+from app.utils.startup_utils import StartupTimer
 
-# Load environment variables from .env file (development)
-load_dotenv()
+# environment variables from `.env` (development) are loaded by `config`
+from config import Config, config_manager
 
 # Load extensions
 login_manager = LoginManager()
@@ -24,27 +21,83 @@ def create_app():
     config, authentication, and database management.
     """
 
+    startup = StartupTimer()
+
     # create Flask app
     app = Flask(__name__)
 
-    # initialize configuration
+    # initialize configuration - only the selected one is resolved
     config: Config = config_manager.get(os.getenv("FLASK_ENV") or "DEV")
 
     # setup logging if only in production - else logs become JSON formatted to read
     if config.ENV == "PRODUCTION":
+        from sap.cf_logging import flask_logging
+
         flask_logging.init(app, config.LOGGING_LEVEL)
 
     # load config
     app.config.from_object(config)
+    startup.mark("config")
+
+    # setup JSON serialization
+    from .utils import json_utils
+
+    json_utils.init_app(app)
 
     # setup authentication
     login_manager.init_app(app)
 
+    # warm & refresh XSUAA token verification keys in the background
+    if config.AUTH_TYPE == "xsuaa":
+        from .utils.xsuaa_key_utils import verification_key_refresher
+
+        verification_key_refresher.init_app(app)
+    startup.mark("auth")
+
     # setup database
     db_manager.init_app(app)
+    startup.mark("database")
 
     # dynamic imports since `db_manager` is not yet initialized
     from . import routes
+    from .services.cache_service import catalog_cache
+    from .services import refdata_service
+    from .services import search_service
+    from .utils.auth_utils import security_context_cache
+    from .utils.compression_utils import response_compressor
+
+    startup.mark("imports")
+
+    # HANA indexes are deployed via HDI - create the missing ones for local SQLite
+    if config.DB_TYPE == "sqlite":
+        with app.app_context():
+            db_manager.create_indexes()
+
+    startup.mark("indexes")
+
+    # setup full-text search backend by `DB_TYPE`
+    search_service.init_app(app)
+    startup.mark("search")
+
+    # setup on-demand request profiling - registered ahead of the other request
+    # hooks, as `after_request` hooks run in reverse order, so that it covers them
+    from .utils.profiling_utils import request_profiler
+
+    request_profiler.init_app(app)
+
+    # setup response & auth caching
+    catalog_cache.init_app(app)
+    refdata_service.init_app(app)
+    security_context_cache.init_app(app)
+
+    # setup response compression
+    response_compressor.init_app(app)
+    startup.mark("caches")
+
+    from .utils.heathcheck_utils import DbHealthProber
+
+    # setup background database health probing
+    DbHealthProber(app)
 
     app.add_url_rule(
         "/health",
@@ -52,8 +105,68 @@ def create_app():
         methods=["GET"],
         endpoint="health_check",
     )
+    # setup per-request query accounting & slow query log
+    from .utils.query_utils import init_query_instrumentation
+
+    init_query_instrumentation(app)
+
+    # setup metrics
+    if config.METRICS_ENABLED:
+        from .utils.metrics_utils import init_metrics
+
+        init_metrics(app)
+        app.add_url_rule(
+            "/metrics",
+            view_func=routes.metrics,
+            methods=["GET"],
+            endpoint="metrics",
+        )
+    startup.mark("instrumentation")
+
+    if config.PROFILING_ENABLED:
+        app.add_url_rule(
+            "/profiles",
+            view_func=routes.list_profiles,
+            methods=["GET"],
+            endpoint="list_profiles",
+        )
+        app.add_url_rule(
+            "/profiles/<profile_id>",
+            view_func=routes.get_profile,
+            methods=["GET"],
+            endpoint="get_profile",
+        )
+
+    app.add_url_rule(
+        "/health/live",
+        view_func=routes.health_check_live,
+        methods=["GET"],
+        endpoint="health_check_live",
+    )
+    app.add_url_rule(
+        "/health/ready",
+        view_func=routes.health_check_ready,
+        methods=["GET"],
+        endpoint="health_check_ready",
+    )
+
+    # setup admission control of the API routes, after the metrics so that
+    # shed requests are measured as well
+    from .utils.admission_utils import admission_controller
+
+    admission_controller.init_app(app)
 
     # register routes via blueprint
     app.register_blueprint(routes.bp, url_prefix="/api/v1")
 
+    # register CLI commands
+    from . import commands
+
+    commands.init_app(app)
+    startup.mark("routes")
+
+    # expose the startup timings, e.g. for `flask startup-report`
+    app.extensions["startup_report"] = startup.get_report()
+    startup.log_report()
+
     return app
@@ -0,0 +1,112 @@
+import json
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.services import import_service
+
+# default location of the CSV files deployed via `cds deploy`
+DEFAULT_DATA_DIR = os.path.join(
+    os.path.dirname(__file__), os.pardir, os.pardir, "db", "data"
+)
+
+db_cli = AppGroup("db", help="Database maintenance commands.")
+
+
+@db_cli.command("import-csv")
+@click.argument("paths", nargs=-1, type=click.Path(exists=True))
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    help="Rows inserted per `executemany` (default: `IMPORT_BATCH_SIZE`).",
+)
+@click.option(
+    "--batches-per-transaction",
+    type=click.IntRange(min=1),
+    help="Batches committed per transaction (default: `IMPORT_BATCHES_PER_TRANSACTION`).",
+)
+@click.option(
+    "--delete-existing",
+    is_flag=True,
+    help="Delete the existing rows of the imported tables first.",
+)
+@click.option(
+    "--disable-indexes",
+    is_flag=True,
+    help="Drop the indexes during the import & rebuild them afterwards (SQLite only).",
+)
+def import_csv(paths, batch_size, batches_per_transaction, delete_existing, disable_indexes):
+    """
+    Bulk imports CSV files shaped like `db/data/*.csv` (default: `db/data`).
+
+    PATHS are CSV files or directories of CSV files, each named after the CDS
+    entity of its table, e.g. `sap.sample.bookshop-Books.csv`.
+    """
+
+    def report(result: import_service.ImportResult):
+        click.echo(
+            f"{result.table}: {result.rows} rows in {result.seconds:.2f}s "
+            f"({result.rows_per_second:,.0f} rows/s)"
+        )
+
+    try:
+        results = import_service.import_csv_files(
+            list(paths) or [os.path.normpath(DEFAULT_DATA_DIR)],
+            batch_size=batch_size or current_app.config.get("IMPORT_BATCH_SIZE"),
+            batches_per_transaction=batches_per_transaction
+            or current_app.config.get("IMPORT_BATCHES_PER_TRANSACTION"),
+            delete_existing=delete_existing,
+            disable_indexes=disable_indexes,
+            on_result=report,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    rows = sum(result.rows for result in results)
+    seconds = sum(result.seconds for result in results)
+    click.echo(f"Imported {rows} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)")
+
+
+@click.command("startup-report")
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=20,
+    show_default=True,
+    help="Number of the slowest module imports to report.",
+)
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON, e.g. to track it.")
+def startup_report(top, as_json):
+    """
+    Measures the startup of the app in a fresh interpreter - the import time of
+    the slowest modules and the duration of the phases of `create_app`.
+    """
+    from app.utils.startup_utils import measure_startup
+
+    try:
+        report = measure_startup(top=top, cwd=os.path.join(os.path.dirname(__file__), os.pardir))
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+
+    click.echo(f"Startup: {report['total_ms']:.1f}ms")
+    for phase in report["phases"]:
+        click.echo(f"  {phase['name']:<20} {phase['ms']:>10.1f}ms")
+    click.echo("Slowest imports (cumulative / self):")
+    for module in report["imports"]:
+        click.echo(
+            f"  {module['module']:<40} {module['cumulative_ms']:>10.1f}ms {module['self_ms']:>8.1f}ms"
+        )
+
+
+def init_app(app):
+    """
+    Registers the CLI commands, e.g. `flask --app app db import-csv`
+    """
+    app.cli.add_command(db_cli)
+    app.cli.add_command(startup_report)
@@ -1,16 +1,193 @@
 import logging
+import time
+from functools import wraps
+from threading import Lock
+from typing import Callable, Dict, List, Optional, TypedDict
 
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 
+from sqlalchemy import Engine, event, exc, inspect
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.sql.expression import UpdateBase
 
 log = logging.getLogger("database-manager")
 
+# upper bounds (in seconds) of the pool checkout latency histogram buckets
+CHECKOUT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# bind key of the read replica engine within `SQLALCHEMY_BINDS`
+REPLICA_BIND_KEY = "replica"
+
+# key of the start times of the statements being executed within `Connection.info`
+STATEMENT_STARTS_KEY = "statement_starts"
+
 
 class Base(DeclarativeBase):
     pass
 
 
+class PoolStatus(TypedDict):
+    """
+    Represents a snapshot of the statistics of a connection pool.
+    """
+
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_time_seconds: float
+    checkout_latency_buckets: Dict[str, int]
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    `QueuePool` measuring the latency of every connection checkout
+
+    The checkout latency includes the time waiting for a free connection,
+    establishing new connections and the `pool_pre_ping` (if enabled).
+
+    Requests may wait for a free connection for less than the pool timeout, see
+    `limit_checkout_timeout`.
+    """
+
+    # callables invoked with the latency (in seconds) of every checkout of any
+    # instrumented pool, e.g. to export it as metrics
+    checkout_observers: List[Callable[[float], None]] = []
+    # callables invoked on every checkout of any instrumented pool, which timed out
+    timeout_observers: List[Callable[[], None]] = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.latency_buckets = [0] * (len(CHECKOUT_LATENCY_BUCKETS) + 1)
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            for observer in self.timeout_observers:
+                observer()
+            raise
+        finally:
+            self._record_checkout(time.perf_counter() - start)
+
+    @property
+    def _timeout(self) -> float:
+        # read by `QueuePool` while waiting for a free connection
+        timeout = g.get("db_checkout_timeout") if has_app_context() else None
+        return self.pool_timeout if timeout is None else min(self.pool_timeout, timeout)
+
+    @_timeout.setter
+    def _timeout(self, timeout: float):
+        self.pool_timeout = timeout
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        # not the timeout limited for the current request
+        pool.pool_timeout = self.pool_timeout
+        return pool
+
+    def _record_checkout(self, latency: float):
+        bucket = next(
+            (i for i, bound in enumerate(CHECKOUT_LATENCY_BUCKETS) if latency <= bound),
+            len(CHECKOUT_LATENCY_BUCKETS),
+        )
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_time += latency
+            self.latency_buckets[bucket] += 1
+
+        for observer in self.checkout_observers:
+            observer(latency)
+
+    def get_status(self) -> PoolStatus:
+        """
+        Returns a snapshot of the pool statistics with a cumulative latency histogram
+        """
+        with self._stats_lock:
+            buckets, cumulative = {}, 0
+            for bound, count in zip(
+                (*map(str, CHECKOUT_LATENCY_BUCKETS), "+Inf"), self.latency_buckets
+            ):
+                cumulative += count
+                buckets[bound] = cumulative
+
+            return PoolStatus(
+                size=self.size(),
+                checked_in=self.checkedin(),
+                checked_out=self.checkedout(),
+                overflow=max(self.overflow(), 0),
+                checkouts=self.checkouts,
+                timeouts=self.timeouts,
+                wait_time_seconds=round(self.wait_time, 6),
+                checkout_latency_buckets=buckets,
+            )
+
+
+def read_only(view: Callable) -> Callable:
+    """
+    Decorator marking a route as read-only, so that its queries are served by the
+    read replica (if configured & healthy) instead of the primary database.
+    The mark is dropped once the request - including streamed responses - is done.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_only = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def limit_checkout_timeout(timeout: Optional[float]):
+    """
+    Limits the seconds the current request waits for a free DB connection to
+    `timeout` (at most the pool timeout), e.g. to shed it early under overload.
+    `None` lifts the limit.
+    """
+    g.db_checkout_timeout = timeout
+
+
+def is_read_only() -> bool:
+    """
+    Checks whether the current request has been marked as read-only via `read_only`
+    """
+    return has_app_context() and g.get("db_read_only", False)
+
+
+class RoutingSession(Session):
+    """
+    Session routing the statements of read-only requests to the read replica
+
+    Flushes & DML statements are always executed on the primary database, as is
+    everything else while the replica is unavailable (see `DatabaseManager`).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and is_read_only()
+        ):
+            replica = self.info["db_manager"].get_replica_engine()
+            if replica is not None:
+                return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
 class DatabaseManager:
     """
     SQLAlchemy Flask extension manager
@@ -19,12 +196,208 @@ class DatabaseManager:
     of the database connection
     """
 
+    # callables invoked with the connection, statement, parameters, `executemany` &
+    # duration (in seconds) of every statement executed on any engine, e.g. to log
+    # slow queries or to export metrics - all share a single pair of timing listeners
+    statement_observers: List[Callable[..., None]] = []
+
     def __init__(self, model_class=Base):
         self.model_class = model_class
-        self.db = SQLAlchemy(model_class=self.model_class)
+        self.db = SQLAlchemy(
+            model_class=self.model_class,
+            session_options={"class_": RoutingSession, "info": {"db_manager": self}},
+        )
+        # the replica is skipped for `replica_retry_interval` seconds once marked down
+        self.replica_retry_interval: float = 10
+        self._replica_down_at: Optional[float] = None
 
     def init_app(self, app):
         log.info(
             f"Initializing database manager via SQLAlchemy using URL - {app.config.get('SQLALCHEMY_DATABASE_URI')}..."
         )
+        pool_options = self.get_pool_options(app.config)
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            **pool_options,
+            **app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        }
+        # Flask-SQLAlchemy applies `SQLALCHEMY_ENGINE_OPTIONS` to the default engine only
+        app.config["SQLALCHEMY_BINDS"] = {
+            bind_key: {**pool_options, **(bind if isinstance(bind, dict) else {"url": bind})}
+            for bind_key, bind in app.config.get("SQLALCHEMY_BINDS", {}).items()
+        }
         self.db.init_app(app)
+
+        self.replica_retry_interval = app.config.get(
+            "HEALTH_DB_PROBE_INTERVAL", self.replica_retry_interval
+        )
+        self._replica_down_at = None
+        app.teardown_request(self.clear_read_only)
+
+        with app.app_context():
+            engines = dict(self.db.engines)
+        for engine in engines.values():
+            event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+            event.listen(engine, "handle_error", self.on_statement_error)
+
+        if app.config.get("DB_SQLITE_PRAGMAS_ENABLED", False):
+            for bind_key, engine in engines.items():
+                if engine.dialect.name == "sqlite":
+                    self.apply_sqlite_pragmas(engine, self.get_sqlite_pragmas(app.config, bind_key))
+
+        replica = engines.get(REPLICA_BIND_KEY)
+        if replica is not None:
+            log.info(f"Serving read-only routes from read replica - {replica.url!r}")
+            event.listen(replica, "handle_error", self.on_replica_error)
+
+    @staticmethod
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(STATEMENT_STARTS_KEY, []).append((context, time.perf_counter()))
+
+    @classmethod
+    def after_cursor_execute(cls, conn, cursor, statement, parameters, context, executemany):
+        _, start = conn.info[STATEMENT_STARTS_KEY].pop()
+        duration = time.perf_counter() - start
+        for observer in cls.statement_observers:
+            observer(conn, statement, parameters, executemany, duration)
+
+    @staticmethod
+    def on_statement_error(context):
+        """
+        SQLAlchemy `handle_error` listener dropping the start time of a failed
+        statement, which never reaches `after_cursor_execute` - otherwise the start
+        times would pile up in the (pooled) connection with every failed statement.
+        """
+        if context.connection is None:
+            return
+        starts = context.connection.info.get(STATEMENT_STARTS_KEY)
+        if starts and starts[-1][0] is context.execution_context:
+            starts.pop()
+
+    @staticmethod
+    def clear_read_only(exception=None):
+        g.pop("db_read_only", None)
+
+    def get_replica_engine(self) -> Optional[Engine]:
+        """
+        Returns the engine of the read replica, or `None` if no replica is configured
+        or it has been marked down within the last `replica_retry_interval` seconds.
+        Requires an application context.
+        """
+        down_at = self._replica_down_at
+        if down_at is not None and time.monotonic() - down_at < self.replica_retry_interval:
+            return None
+        return self.db.engines.get(REPLICA_BIND_KEY)
+
+    def mark_replica(self, up: bool):
+        """
+        Records the health of the read replica, e.g. as probed by `DbHealthProber`.
+        While down, read-only routes fall back to the primary database.
+        """
+        if up and self._replica_down_at is not None:
+            log.info("Read replica is up again - serving read-only routes from it")
+        elif not up and self._replica_down_at is None:
+            log.warning("Read replica is down - falling back to the primary database")
+        self._replica_down_at = None if up else time.monotonic()
+
+    def on_replica_error(self, context):
+        """
+        SQLAlchemy `handle_error` listener of the replica engine, marking the replica
+        down if connecting to it failed or the connection got lost.
+        """
+        if context.is_disconnect or context.connection is None:
+            self.mark_replica(up=False)
+
+    @staticmethod
+    def get_pool_options(config) -> dict:
+        """
+        Builds the SQLAlchemy engine pool options from the `DB_POOL_*` config
+        """
+        pool_options = {
+            "poolclass": InstrumentedQueuePool,
+            "pool_size": config.get("DB_POOL_SIZE"),
+            "max_overflow": config.get("DB_POOL_MAX_OVERFLOW"),
+            "pool_timeout": config.get("DB_POOL_TIMEOUT"),
+            "pool_recycle": config.get("DB_POOL_RECYCLE"),
+            "pool_pre_ping": config.get("DB_POOL_PRE_PING"),
+        }
+        log.info(
+            "Connection pool per worker - "
+            f"size={pool_options['pool_size']}, overflow={pool_options['max_overflow']}, "
+            f"timeout={pool_options['pool_timeout']}s, recycle={pool_options['pool_recycle']}s, "
+            f"pre_ping={pool_options['pool_pre_ping']}"
+        )
+        return {key: value for key, value in pool_options.items() if value is not None}
+
+    @staticmethod
+    def get_sqlite_pragmas(config, bind_key: Optional[str] = None) -> Dict[str, object]:
+        """
+        Builds the pragmas of the SQLite engine of a bind (`None` for the primary engine) -
+        the `DB_SQLITE_PRAGMAS` merged with its overrides in `DB_SQLITE_BIND_PRAGMAS`,
+        skipping the ones overridden with `None`
+        """
+        pragmas = {
+            **config.get("DB_SQLITE_PRAGMAS", {}),
+            **config.get("DB_SQLITE_BIND_PRAGMAS", {}).get(bind_key or "default", {}),
+        }
+        for name, value in pragmas.items():
+            if not name.isidentifier() or not (value is None or str(value).lstrip("-").isalnum()):
+                raise ValueError(f"Invalid SQLite pragma - {name}={value}")
+        return {name: value for name, value in pragmas.items() if value is not None}
+
+    @staticmethod
+    def apply_sqlite_pragmas(engine: Engine, pragmas: Dict[str, object]):
+        """
+        Executes the given pragmas on every new connection of the SQLite engine, as most
+        of them (except for a persistent `journal_mode`) only last for the connection
+        """
+        if not pragmas:
+            return
+        log.info(f"Applying SQLite pragmas to {engine.url!r} - {pragmas}")
+
+        @event.listens_for(engine, "connect")
+        def set_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas.items():
+                    cursor.execute(f"PRAGMA {name} = {value}")
+            finally:
+                cursor.close()
+
+    def create_indexes(self) -> List[str]:
+        """
+        Creates the indexes declared on the models (`index=True`) which are missing
+        in the database. Meant for SQLite databases deployed via `cds deploy`, as
+        CDS only generates the indexes for HANA (see `db/src/*.hdbindex`).
+        Requires an application context.
+
+        :return: The names of the created indexes
+        """
+        created = []
+        with self.db.engine.begin() as conn:
+            inspector = inspect(conn)
+            for table in self.db.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    log.warning(f"Skipping indexes of missing table - {table.name}")
+                    continue
+
+                existing = {index["name"] for index in inspector.get_indexes(table.name)}
+                for index in table.indexes:
+                    if index.name not in existing:
+                        index.create(conn)
+                        created.append(index.name)
+
+        if created:
+            log.info(f"Created missing indexes - {created}")
+        return created
+
+    def get_pool_status(self) -> Dict[str, PoolStatus]:
+        """
+        Returns the connection pool statistics of all engines, keyed by their bind key
+        (`default` for the primary engine). Requires an application context.
+        """
+        return {
+            bind_key or "default": engine.pool.get_status()
+            for bind_key, engine in self.db.engines.items()
+            if isinstance(engine.pool, InstrumentedQueuePool)
+        }
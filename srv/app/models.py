@@ -1,4 +1,5 @@
-from typing import Optional
+import uuid
+from typing import TYPE_CHECKING, FrozenSet, Optional
 from datetime import date, datetime
 from abc import ABC, abstractmethod
 
@@ -12,14 +13,16 @@ from sqlalchemy import (
     SmallInteger,
     Numeric,
     Date,
-    UUID,
+    TypeDecorator,
 )
 from sqlalchemy.orm import mapped_column, relationship, Mapped
 
-from sap import xssec
 from app import db_manager
 from config import UserConfig
 
+if TYPE_CHECKING:
+    from sap import xssec
+
 
 ###################
 ### AUTH MODELS ###
@@ -40,6 +43,13 @@ class BaseUser(UserMixin, ABC):
         """
         pass
 
+    def get_name(self) -> str:
+        """
+        Returns the name of the user as recorded in the `managed` fields
+        (`createdBy`, `modifiedBy`) of written entities
+        """
+        return self.get_id()
+
 
 class BasicUser(UserMixin):
     """
@@ -69,6 +79,9 @@ class BasicUser(UserMixin):
     def get_id(self) -> str:
         return self.id
 
+    def get_name(self) -> str:
+        return self.id
+
     def __repr__(self):
         return f"<BasicUser user_id={self.id}, " f"user_config={self.user_config}>"
 
@@ -84,8 +97,13 @@ class XsuaaUser(UserMixin):
     See `flask-login` docs: https://flask-login.readthedocs.io/en/latest/#your-user-class
     """
 
-    def __init__(self, xssec_security_context: xssec.SecurityContextXSUAA):
+    def __init__(
+        self,
+        xssec_security_context: "xssec.SecurityContextXSUAA",
+        scopes: Optional[FrozenSet[str]] = None,
+    ):
         self.security_context = xssec_security_context
+        self.scopes = scopes
 
     def is_authenticated(self) -> bool:
         return self.security_context is not None
@@ -97,11 +115,18 @@ class XsuaaUser(UserMixin):
         return self.email() is None
 
     def check_scope(self, scope: str) -> bool:
+        # use precomputed scopes (see `auth_utils.SecurityContextCache`) if available
+        if self.scopes is not None:
+            return scope in self.scopes
         return self.security_context.check_scope(scope)
 
     def get_id(self) -> str:
         return self.client_id()
 
+    def get_name(self) -> str:
+        # technical users (client credentials flow) have no logon name
+        return self.security_context.get_logon_name() or self.client_id()
+
     def subaccount_id(self) -> str:
         return self.security_context.get_subaccount_id()
 
@@ -146,35 +171,57 @@ COMMON_NAMESPACE = "SAP_COMMON"
 Model = db_manager.db.Model
 
 
+class CdsUUID(TypeDecorator):
+    """
+    CDS `UUID` type, which is persisted as `NVARCHAR(36)` in its canonical
+    (dashed) string form, unlike SQLAlchemy's `UUID` type binding hex strings
+    on databases without a native UUID type (SQLite, HANA).
+    """
+
+    impl = String(36)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return str(uuid.UUID(str(value)))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return uuid.UUID(value)
+
+
 class Books(Model):
     __tablename__ = f"{BOOKSTORE_NAMESPACE}_BOOKS"
 
     ID: Mapped[int] = mapped_column(primary_key=True)
 
-    createdBy: Mapped[str] = mapped_column(String(255))
-    createdAt: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
-    modifiedBy: Mapped[str] = mapped_column(String(255))
-    modifiedAt: Mapped[datetime] = mapped_column(
+    createdBy: Mapped[Optional[str]] = mapped_column(String(255))
+    createdAt: Mapped[Optional[datetime]] = mapped_column(DateTime, server_default=func.now())
+    modifiedBy: Mapped[Optional[str]] = mapped_column(String(255))
+    modifiedAt: Mapped[Optional[datetime]] = mapped_column(
         DateTime, server_default=func.now(), onupdate=func.now()
     )
 
-    title: Mapped[str] = mapped_column(String(111), nullable=False)
-    descr: Mapped[str] = mapped_column(String(1111))
-    stock: Mapped[int] = mapped_column(Integer)
-    price: Mapped[float] = mapped_column(Numeric(9, 2))
+    # indexed columns are kept in sync with `db/src/*.hdbindex`
+    title: Mapped[str] = mapped_column(String(111), nullable=False, index=True)
+    descr: Mapped[Optional[str]] = mapped_column(String(1111))
+    stock: Mapped[Optional[int]] = mapped_column(Integer)
+    price: Mapped[Optional[float]] = mapped_column(Numeric(9, 2), index=True)
 
     AUTHOR_ID: Mapped[int] = mapped_column(
-        ForeignKey(f"{BOOKSTORE_NAMESPACE}_AUTHORS.ID")
+        ForeignKey(f"{BOOKSTORE_NAMESPACE}_AUTHORS.ID"), index=True
     )
     author: Mapped["Authors"] = relationship(back_populates="books")
 
-    genre_ID: Mapped[int] = mapped_column(
-        ForeignKey(f"{BOOKSTORE_NAMESPACE}_GENRES.ID")
+    genre_ID: Mapped[Optional[str]] = mapped_column(
+        ForeignKey(f"{BOOKSTORE_NAMESPACE}_GENRES.ID"), index=True
     )
     genre: Mapped["Genres"] = relationship()
 
-    currency_code: Mapped[str] = mapped_column(
-        String(3), ForeignKey(f"{COMMON_NAMESPACE}_CURRENCIES.code")
+    currency_code: Mapped[Optional[str]] = mapped_column(
+        String(3), ForeignKey(f"{COMMON_NAMESPACE}_CURRENCIES.code"), index=True
     )
     currency: Mapped["Currencies"] = relationship()
 
@@ -196,12 +243,12 @@ class Authors(Model):
 class Genres(Model):
     __tablename__ = f"{BOOKSTORE_NAMESPACE}_GENRES"
 
-    ID: Mapped[str] = mapped_column(UUID, primary_key=True)
+    ID: Mapped[str] = mapped_column(CdsUUID, primary_key=True)
 
     name: Mapped[str] = mapped_column(String(255), nullable=False)
     descr: Mapped[Optional[str]] = mapped_column(String(1000))
 
-    parent_ID: Mapped[str] = mapped_column(
+    parent_ID: Mapped[Optional[str]] = mapped_column(
         ForeignKey(f"{BOOKSTORE_NAMESPACE}_GENRES.ID")
     )
     parent: Mapped["Genres"] = relationship(remote_side=[ID])
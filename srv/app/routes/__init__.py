@@ -1,16 +1,45 @@
-from flask import current_app, jsonify, Blueprint, Request
-from flask_login import login_required
+import time
+import uuid
+from typing import Callable
+from decimal import Decimal, InvalidOperation
+
+from flask import (
+    current_app,
+    jsonify,
+    request,
+    send_file,
+    stream_with_context,
+    url_for,
+    Blueprint,
+    Request,
+    Response,
+)
+from flask_login import current_user, login_required
+from sqlalchemy import exc
 from werkzeug import exceptions
 
 from app import login_manager
+from app.database import read_only
 from app.utils.auth_utils import (
     get_basicuser_from_request,
     get_xsuaauser_from_request,
     roles_required,
 )
-from app.services import books_service
-from app.utils.heathcheck_utils import run_health_check
+from app.services import books_service, genres_service, refdata_service, search_service
+from app.services.books_service import BooksPage
+from app.services.cache_service import catalog_cache, CacheEntry
+from app.utils.admission_utils import admission_controller
+from app.utils.compression_utils import response_compressor
+from app.utils.heathcheck_utils import (
+    run_health_check,
+    run_liveness_check,
+    run_readiness_check,
+)
+from app.utils.metrics_utils import generate_metrics, observe_auth
+from app.utils.profiling_utils import PSTATS_SORT_KEYS, render_pstats, request_profiler
+from app.utils.query_utils import query_budget
 from app.models import BaseUser
+from config import ADMIN_SCOPE, PROFILING_SCOPE
 
 #################
 ### CALLBACKS ###
@@ -22,13 +51,19 @@ def load_user_from_request(request: Request) -> BaseUser:
     """
     Load the user from the request using the configured authentication type.
     """
-    if current_app.config.get("AUTH_TYPE") == "basic":
-        return get_basicuser_from_request(current_app.config, request)
-    elif current_app.config.get("AUTH_TYPE") == "xsuaa":
-        return get_xsuaauser_from_request(current_app.config, request)
+    auth_type = current_app.config.get("AUTH_TYPE")
+    start = time.perf_counter()
+
+    if auth_type == "basic":
+        user = get_basicuser_from_request(current_app.config, request)
+    elif auth_type == "xsuaa":
+        user = get_xsuaauser_from_request(current_app.config, request)
     else:
         return None
 
+    observe_auth(auth_type, user, start)
+    return user
+
 
 @login_manager.unauthorized_handler
 def unauthorized():
@@ -50,14 +85,87 @@ def unauthorized():
 
 def health_check():
     """
-    Health check endpoint to verify the service is running.
+    Health check endpoint to verify the service & its components are healthy,
+    answering with `503` if any component is down.
+    """
+    status = run_health_check(current_app.config)
+    return (
+        jsonify(status),
+        200 if status["status"] == "UP" else 503,
+    )
+
+
+@query_budget(0)
+def health_check_live():
+    """
+    Liveness endpoint to verify the process is able to serve requests.
+    Never touches the database.
     """
     return (
-        jsonify(run_health_check(current_app.config)),
+        jsonify(run_liveness_check()),
         200,
     )
 
 
+def health_check_ready():
+    """
+    Readiness endpoint to verify the service is able to serve traffic, based on
+    the latest result of the background database probe.
+    """
+    status = run_readiness_check()
+    return (
+        jsonify(status),
+        200 if status["status"] == "UP" else 503,
+    )
+
+
+@login_required
+@roles_required([ADMIN_SCOPE])
+def metrics():
+    """
+    Metrics endpoint exposing request, SQL, auth, pool & cache metrics
+    in the Prometheus text format.
+    """
+    return generate_metrics()
+
+
+@login_required
+@roles_required([PROFILING_SCOPE])
+def list_profiles():
+    """
+    Lists the stored request profiles (see `X-Profile` header), latest first
+    """
+    return jsonify(request_profiler.list_profiles())
+
+
+@login_required
+@roles_required([PROFILING_SCOPE])
+def get_profile(profile_id: str):
+    """
+    Returns a stored request profile - collapsed stacks as text, `pstats` profiles
+    as binary (e.g. for `snakeviz`) or as text via `?format=text&sort=..&limit=..`
+    """
+    info, path = request_profiler.get_profile(profile_id)
+    if info["format"] == "collapsed":
+        return send_file(path, mimetype="text/plain")
+    if request.args.get("format") != "text":
+        return send_file(
+            path,
+            mimetype="application/octet-stream",
+            as_attachment=True,
+            download_name=f"{profile_id}.pstats",
+        )
+
+    sort = request.args.get("sort", "cumulative")
+    if sort not in PSTATS_SORT_KEYS:
+        raise exceptions.BadRequest(description=f"Unknown sort key - '{sort}'")
+    try:
+        limit = int(request.args.get("limit", 50))
+    except ValueError:
+        raise exceptions.BadRequest(description="Query parameter 'limit' must be an integer")
+    return Response(render_pstats(path, sort, limit), mimetype="text/plain")
+
+
 ####################
 ### ROUTES - BP1 ###
 ####################
@@ -65,7 +173,33 @@ def health_check():
 bp = Blueprint("routes", __name__)
 
 
-@bp.errorhandler(exceptions.Forbidden)
+@bp.app_errorhandler(exceptions.BadRequest)
+def handle_bad_request(e: exceptions.BadRequest):
+    """
+    Customize bad request 400 response for REST API
+    """
+    return {
+        "error": {
+            "code": 4000001,
+            "message": e.description,
+        }
+    }, 400
+
+
+@bp.app_errorhandler(exceptions.NotFound)
+def handle_not_found(e: exceptions.NotFound):
+    """
+    Customize not found 404 response for REST API
+    """
+    return {
+        "error": {
+            "code": 4040001,
+            "message": e.description,
+        }
+    }, 404
+
+
+@bp.app_errorhandler(exceptions.Forbidden)
 def handle_forbidden(e: exceptions.Forbidden):
     """
     Customize forbidden 403 response for REST API
@@ -78,9 +212,494 @@ def handle_forbidden(e: exceptions.Forbidden):
     }, 403
 
 
+@bp.app_errorhandler(exceptions.ServiceUnavailable)
+def handle_service_unavailable(e: exceptions.ServiceUnavailable):
+    """
+    Customize service unavailable 503 response for REST API, e.g. of shed requests
+    """
+    return (
+        {
+            "error": {
+                "code": 5030001,
+                "message": e.description,
+            }
+        },
+        503,
+        {"Retry-After": str(e.retry_after or admission_controller.retry_after)},
+    )
+
+
+@bp.app_errorhandler(exc.TimeoutError)
+def handle_pool_timeout(e: exc.TimeoutError):
+    """
+    Sheds requests, which timed out waiting for a DB connection (`DB_POOL_TIMEOUT`),
+    with a 503 response instead of failing with a 500
+    """
+    admission_controller.record_shed("pool_timeout")
+    return (
+        {
+            "error": {
+                "code": 5030002,
+                "message": "No database connection available, please retry later",
+            }
+        },
+        503,
+        {"Retry-After": str(admission_controller.retry_after)},
+    )
+
+
 @bp.route("/books", methods=["GET"])
 @login_required
 @roles_required(["uaa.resource"])
+@query_budget(1)
+@read_only
 def get_books():
-    books = books_service.get_books()
-    return jsonify(books)
+    cursor = request.args.get("cursor")
+    filters = get_book_filters()
+    sort = get_book_sort()
+    fields = get_book_fields()
+
+    if is_stream_requested():
+        return stream_books(cursor, filters, sort, fields)
+
+    limit = get_page_limit()
+
+    return books_page_response(
+        {**get_book_query_args(filters, sort, fields), "limit": limit, "cursor": cursor},
+        lambda: books_service.get_books(
+            limit=limit, cursor=cursor, filters=filters, sort=sort, fields=fields
+        ),
+    )
+
+
+@bp.route("/books:batch", methods=["POST"])
+@login_required
+@roles_required([ADMIN_SCOPE])
+@query_budget(5)  # referenced authors, genres & currencies, existing IDs & upsert
+def upsert_books():
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        raise exceptions.BadRequest(
+            description="Request body must be a non-empty JSON array of books"
+        )
+
+    max_size = current_app.config.get("BOOKS_BATCH_MAX_SIZE")
+    if len(items) > max_size:
+        raise exceptions.BadRequest(
+            description=f"Batch exceeds the maximum of {max_size} books - {len(items)}"
+        )
+
+    results = books_service.upsert_books(items, user_name=current_user.get_name())
+    # the upsert bypasses the ORM change tracking invalidating the cache
+    catalog_cache.invalidate()
+
+    summary = {status: 0 for status in ("created", "updated", "invalid")}
+    for result in results:
+        summary[result["status"]] += 1
+    return jsonify({**summary, "results": results}), 200
+
+
+@bp.route("/books/<int:book_id>/reserve", methods=["POST"])
+@login_required
+@roles_required(["uaa.resource"])
+@query_budget(2)  # conditional update & diagnosis on failure
+def reserve_book(book_id: int):
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        raise exceptions.BadRequest(description="Request body must be a JSON object")
+    quantity = get_reservation_quantity(body.get("quantity", 1))
+
+    reserved, results = books_service.reserve_books(
+        {book_id: quantity}, user_name=current_user.get_name()
+    )
+    if results[0]["status"] == "not_found":
+        raise exceptions.NotFound(description=f"Book not found - {book_id}")
+    return reservation_response(reserved, results)
+
+
+@bp.route("/books:reserve", methods=["POST"])
+@login_required
+@roles_required(["uaa.resource"])
+@query_budget(2)  # conditional update & diagnosis on failure
+def reserve_books():
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or not items:
+        raise exceptions.BadRequest(
+            description='Request body must be a non-empty JSON array like [{"id": 1, "quantity": 1}]'
+        )
+
+    max_lines = current_app.config.get("BOOKS_RESERVE_MAX_LINES")
+    if len(items) > max_lines:
+        raise exceptions.BadRequest(
+            description=f"Order exceeds the maximum of {max_lines} lines - {len(items)}"
+        )
+
+    # quantities of repeated books are summed up
+    lines: dict[int, int] = {}
+    for item in items:
+        book_id = item.get("id") if isinstance(item, dict) else None
+        if not isinstance(book_id, int) or isinstance(book_id, bool):
+            raise exceptions.BadRequest(description=f"Field 'id' must be an integer - {item}")
+        lines[book_id] = lines.get(book_id, 0) + get_reservation_quantity(
+            item.get("quantity", 1)
+        )
+
+    reserved, results = books_service.reserve_books(lines, user_name=current_user.get_name())
+    return reservation_response(reserved, results)
+
+
+@bp.route("/books/search", methods=["GET"])
+@login_required
+@roles_required(["uaa.resource"])
+@query_budget(1)
+@read_only
+def search_books():
+    query = request.args.get("q", "")
+    cursor = request.args.get("cursor")
+    limit = get_page_limit()
+
+    return books_page_response(
+        {"q": query, "limit": limit, "cursor": cursor},
+        lambda: search_service.search_books(query, limit=limit, cursor=cursor),
+    )
+
+
+@bp.route("/genres/tree", methods=["GET"])
+@login_required
+@roles_required(["uaa.resource"])
+@query_budget(1)
+@read_only
+def get_genre_tree():
+    def compute():
+        return current_app.json.dumpb(genres_service.get_genre_tree()), {}
+
+    entry = catalog_cache.get_or_set(("genre-tree",), compute)
+    return cached_json_response(entry)
+
+
+@bp.route("/genres", methods=["GET"])
+@login_required
+@roles_required(["uaa.resource"])
+@query_budget(1)  # genres (unless loaded at startup)
+@read_only
+def get_genres():
+    def compute():
+        return current_app.json.dumpb(refdata_service.get_genres()), {}
+
+    entry = catalog_cache.get_or_set(("genres",), compute)
+    return cached_json_response(entry)
+
+
+@bp.route("/currencies", methods=["GET"])
+@login_required
+@roles_required(["uaa.resource"])
+@query_budget(1)  # currencies (unless loaded at startup)
+@read_only
+def get_currencies():
+    def compute():
+        return current_app.json.dumpb(refdata_service.get_currencies()), {}
+
+    entry = catalog_cache.get_or_set(("currencies",), compute)
+    return cached_json_response(entry)
+
+
+@bp.route("/genres/<genre_id>/books", methods=["GET"])
+@login_required
+@roles_required(["uaa.resource"])
+@query_budget(2)  # genres (unless loaded at startup) & books
+@read_only
+def get_genre_books(genre_id: str):
+    if "genre" in request.args:
+        raise exceptions.BadRequest(
+            description="Query parameter 'genre' is not supported - the genre is given by the path"
+        )
+
+    cursor = request.args.get("cursor")
+    filters = get_book_filters()
+    sort = get_book_sort()
+    fields = get_book_fields()
+    limit = get_page_limit()
+
+    def fetch():
+        try:
+            genre_ids = genres_service.get_genre_descendants(genre_id)
+        except ValueError as e:
+            raise exceptions.BadRequest(description=str(e))
+        if genre_ids is None:
+            raise exceptions.NotFound(description=f"Genre not found - {genre_id}")
+
+        # books of the genre including all of its sub-genres
+        return books_service.get_books(
+            limit=limit,
+            cursor=cursor,
+            filters={**filters, "genre_ids": genre_ids},
+            sort=sort,
+            fields=fields,
+        )
+
+    return books_page_response(
+        {**get_book_query_args(filters, sort, fields), "limit": limit, "cursor": cursor},
+        fetch,
+    )
+
+
+def stream_books(
+    cursor: str | None,
+    filters: books_service.BooksFilter,
+    sort: str,
+    fields: tuple[str, ...] | None = None,
+) -> Response:
+    """
+    Streams all books as newline-delimited JSON (NDJSON), serializing one book
+    at a time while the rows are fetched from the database in chunks.
+    """
+    try:
+        books = books_service.iter_books(
+            chunk_size=current_app.config.get("BOOKS_STREAM_CHUNK_SIZE"),
+            cursor=cursor,
+            filters=filters,
+            sort=sort,
+            fields=fields,
+        )
+    except ValueError as e:
+        raise exceptions.BadRequest(description=str(e))
+
+    def generate():
+        for book in books:
+            yield current_app.json.dumpb(book) + b"\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+
+#############
+### UTILS ###
+#############
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+
+def get_reservation_quantity(quantity) -> int:
+    """
+    Validates the quantity of a book to reserve
+    """
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 1:
+        raise exceptions.BadRequest(
+            description=f"Field 'quantity' must be a positive integer - {quantity}"
+        )
+    return quantity
+
+
+def reservation_response(
+    reserved: bool, results: list[books_service.ReservationResult]
+) -> Response:
+    """
+    Creates the response of a stock reservation - `409 Conflict` along with the
+    result of every book, if the stock couldn't be reserved.
+    """
+    if not reserved:
+        return jsonify(
+            {
+                "error": {
+                    "code": 4090001,
+                    "message": "Insufficient stock - nothing has been reserved",
+                    "details": results,
+                }
+            }
+        ), 409
+
+    # the update bypasses the ORM change tracking invalidating the cache - only the
+    # pages listing the reserved books are dropped, pages whose selection depends
+    # on the stock (e.g. `in_stock` or sorted by it) may lag behind up to the TTL
+    catalog_cache.invalidate_tags(("Books", result["id"]) for result in results)
+    return jsonify({"reserved": True, "items": results}), 200
+
+
+def books_page_response(query_args: dict, fetch: Callable[[], BooksPage]) -> Response:
+    """
+    Creates the (cached) JSON response for a page of books fetched via `fetch`,
+    linking the next page via the `Link` header. The normalized query parameters
+    `query_args`, e.g. filters & sort, form the cache key along with the view args
+    and are carried over to the next page - hence equivalent requests share the
+    cached page including its `Link`. The cached page is tagged with the IDs of its
+    books, see `reservation_response`.
+    """
+    cache_key = (
+        request.endpoint,
+        tuple(sorted(request.view_args.items())),
+        tuple(sorted(query_args.items())),
+    )
+
+    def compute():
+        try:
+            page = fetch()
+        except ValueError as e:
+            raise exceptions.BadRequest(description=str(e))
+
+        headers = {}
+        if page["next"]:
+            args = {**request.view_args, **query_args, "cursor": page["next"]}
+            next_url = url_for(request.endpoint, **args)
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        tags = [("Books", book_id) for book_id in page["ids"]]
+        return current_app.json.dumpb(page["items"]), headers, tags
+
+    entry = catalog_cache.get_or_set(cache_key, compute)
+    return cached_json_response(entry)
+
+
+def cached_json_response(entry: CacheEntry) -> Response:
+    """
+    Creates a JSON response from a cache entry with a strong `ETag`, answering
+    with `304 Not Modified` if the client already holds the same representation.
+    The payload is compressed once per content encoding & kept within the entry.
+    """
+    payload, encoding = response_compressor.encode_entry(entry)
+    response = Response(payload, mimetype="application/json", headers=entry.headers)
+    # strong ETags must differ between the representations
+    response.set_etag(f"{entry.etag}-{encoding}" if encoding else entry.etag)
+    if encoding:
+        response.content_encoding = encoding
+    if len(entry.payload) >= response_compressor.min_size:
+        response.vary.add("Accept-Encoding")
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def is_stream_requested() -> bool:
+    """
+    Checks whether the client opted in for a streamed response either via
+    `?stream=1` or by preferring `application/x-ndjson` in the `Accept` header.
+    """
+    if request.args.get("stream", "").lower() in ("1", "true"):
+        return True
+
+    return (
+        request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE])
+        == NDJSON_MIMETYPE
+    )
+
+
+def get_page_limit() -> int:
+    """
+    Reads the `limit` query parameter, falling back to the configured default
+    page size and capping it at the configured maximum page size.
+    """
+    limit = request.args.get("limit")
+    if limit is None:
+        return current_app.config.get("BOOKS_PAGE_SIZE_DEFAULT")
+
+    if not limit.isdigit() or int(limit) < 1:
+        raise exceptions.BadRequest(
+            description=f"Query parameter 'limit' must be a positive integer - {limit}"
+        )
+
+    return min(int(limit), current_app.config.get("BOOKS_PAGE_SIZE_MAX"))
+
+
+def get_book_filters() -> books_service.BooksFilter:
+    """
+    Reads the `author`, `genre`, `currency`, `min_price`, `max_price` & `in_stock`
+    query parameters into the filters applied to the books.
+    """
+    filters = books_service.BooksFilter()
+    args = request.args
+
+    if "author" in args:
+        if not args["author"].isdigit():
+            raise exceptions.BadRequest(
+                description=f"Query parameter 'author' must be an integer - {args['author']}"
+            )
+        filters["author_id"] = int(args["author"])
+
+    if "genre" in args:
+        try:
+            filters["genre_ids"] = (str(uuid.UUID(args["genre"])),)
+        except ValueError:
+            raise exceptions.BadRequest(
+                description=f"Query parameter 'genre' must be a UUID - {args['genre']}"
+            )
+
+    if "currency" in args:
+        currency = args["currency"].upper()
+        if len(currency) != 3 or not currency.isalpha():
+            raise exceptions.BadRequest(
+                description=f"Query parameter 'currency' must be an ISO 4217 code - {args['currency']}"
+            )
+        filters["currency_code"] = currency
+
+    for param in ("min_price", "max_price"):
+        if param in args:
+            try:
+                price = Decimal(args[param])
+            except InvalidOperation:
+                price = None
+            if price is None or not price.is_finite() or price < 0:
+                raise exceptions.BadRequest(
+                    description=f"Query parameter '{param}' must be a non-negative number - {args[param]}"
+                )
+            filters[param] = price
+
+    if "in_stock" in args:
+        in_stock = args["in_stock"].lower()
+        if in_stock not in ("true", "false", "1", "0"):
+            raise exceptions.BadRequest(
+                description=f"Query parameter 'in_stock' must be a boolean - {args['in_stock']}"
+            )
+        filters["in_stock"] = in_stock in ("true", "1")
+
+    return filters
+
+
+def get_book_sort() -> str:
+    """
+    Reads the `sort` query parameter, e.g. `price` or `-price` for descending order.
+    """
+    sort = request.args.get("sort", books_service.DEFAULT_SORT)
+    try:
+        key, descending = books_service.parse_sort(sort)
+    except ValueError as e:
+        raise exceptions.BadRequest(description=str(e))
+    return f"-{key}" if descending else key
+
+
+def get_book_fields() -> tuple[str, ...] | None:
+    """
+    Reads the `fields` query parameter, e.g. `id,title,price.value,author`, selecting
+    the fields of the books to return (default: all).
+    """
+    fields = request.args.get("fields")
+    if fields is None:
+        return None
+    try:
+        return books_service.parse_fields(fields)
+    except ValueError as e:
+        raise exceptions.BadRequest(description=str(e))
+
+
+def get_book_query_args(
+    filters: books_service.BooksFilter, sort: str, fields: tuple[str, ...] | None
+) -> dict:
+    """
+    Returns the query parameters selecting the books by `filters`, `sort` & `fields`
+    in their normalized form, leaving out the defaults - so that equivalent requests
+    (e.g. `currency=eur&min_price=10.50` & `min_price=10.5&currency=EUR`) yield the
+    same parameters.
+    """
+    args = {}
+    if "author_id" in filters:
+        args["author"] = filters["author_id"]
+    if "genre_ids" in filters:
+        args["genre"] = filters["genre_ids"][0]
+    if "currency_code" in filters:
+        args["currency"] = filters["currency_code"]
+    for param in ("min_price", "max_price"):
+        if param in filters:
+            args[param] = format(filters[param].normalize(), "f")
+    if "in_stock" in filters:
+        args["in_stock"] = "true" if filters["in_stock"] else "false"
+    if sort != books_service.DEFAULT_SORT:
+        args["sort"] = sort
+    if fields:
+        args["fields"] = ",".join(fields)
+    return args
@@ -1,56 +1,694 @@
+import base64
+import json
 import logging
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, Iterator, Literal, Optional, Tuple, TypedDict
+
+from sqlalchemy import String, and_, case, or_, text, type_coerce, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 from app import db_manager
 from app.models import Books, Authors, Currencies, Genres
+from app.services.refdata_service import get_currency, get_genre
 
 log = logging.getLogger("route-books")
 
 db = db_manager.db
 
+# columns books can be sorted by - each sort is made unique by `ID` as tie-breaker
+SORT_COLUMNS = {
+    "title": Books.title,
+    "price": Books.price,
+    "stock": Books.stock,
+}
+DEFAULT_SORT = "title"
+
+# leaf fields of the REST representation of books (see `to_book_dict`) by their
+# dotted path, along with the column each one is selected from
+BOOK_FIELDS = {
+    "id": Books.ID,
+    "title": Books.title,
+    "descr": Books.descr,
+    "stock": Books.stock,
+    "price.value": Books.price,
+    "price.currency.code": Books.currency_code,
+    "price.currency.symbol": Books.currency_code,
+    "author": Authors.name.label("author_name"),
+    # the canonical UUID string as stored, sparing the conversion into `uuid.UUID` per row
+    "genre": type_coerce(Books.genre_ID, String(36)).label("genre_ID"),
+}
+# fields resolved from the selected code via the reference data caches instead of
+# joining the (small) code lists on every query
+BOOK_FIELD_RESOLVERS = {
+    "price.currency.symbol": lambda code: getattr(get_currency(code), "symbol", None),
+    "genre": lambda genre_id: getattr(get_genre(genre_id), "name", None),
+}
+BOOK_FIELD_PATHS = {field: tuple(field.split(".")) for field in BOOK_FIELDS}
+# fields of the sort keys, required to encode the cursor
+SORT_FIELDS = {"title": "title", "price": "price.value", "stock": "stock"}
+
+
+class BooksPage(TypedDict):
+    """
+    Represents a single page of books along with the opaque cursor
+    pointing to the next page (`None` if this is the last page).
+    """
+
+    items: list[dict]
+    next: Optional[str]
+    # IDs of the books of the page, even if not selected via `fields`
+    ids: list[int]
+
+
+class BooksFilter(TypedDict, total=False):
+    """
+    Represents the filters applied to the books. All given filters must match.
+    """
+
+    author_id: int
+    genre_ids: Tuple[str, ...]
+    currency_code: str
+    min_price: Decimal
+    max_price: Decimal
+    in_stock: bool
+
+
+def parse_sort(sort: str) -> Tuple[str, bool]:
+    """
+    Parses a sort expression like `price` (ascending) or `-price` (descending).
+
+    :return: The sort key and whether to sort descending
+    :raises ValueError: if the sort key is not supported
+    """
+    descending = sort.startswith("-")
+    key = sort.lstrip("-")
+    if key not in SORT_COLUMNS:
+        raise ValueError(
+            f"Invalid sort - {sort}. Must be one of {list(SORT_COLUMNS)}, "
+            "optionally prefixed with '-' for descending order"
+        )
+    return key, descending
+
+
+def parse_fields(fields: str) -> Tuple[str, ...]:
+    """
+    Parses a comma-separated list of (dotted) field paths like `id,title,price.value`
+    into the leaf fields of `BOOK_FIELDS` they select, in the order of the REST
+    representation. A path selects all fields nested below it, e.g. `price` selects
+    `price.value`, `price.currency.code` & `price.currency.symbol`.
+
+    :raises ValueError: if no or an unknown field is given
+    """
+    paths = [path.strip() for path in fields.split(",") if path.strip()]
+    if not paths:
+        raise ValueError(f"Invalid fields - '{fields}'. Must name at least one field")
+
+    selected = set()
+    for path in paths:
+        matches = [
+            field for field in BOOK_FIELDS if field == path or field.startswith(f"{path}.")
+        ]
+        if not matches:
+            raise ValueError(
+                f"Invalid field - {path}. Must be one of {list(BOOK_FIELDS)} "
+                "or a parent thereof"
+            )
+        selected.update(matches)
+
+    return tuple(field for field in BOOK_FIELDS if field in selected)
+
+
+def encode_cursor(sort: str, value: Any, book_id: int) -> str:
+    """
+    Encodes the keyset position `(<sort value>, ID)` of a book along with the
+    sort it belongs to as an opaque, URL-safe cursor string.
+    """
+    if isinstance(value, Decimal):
+        value = str(value)
+    raw = json.dumps([sort, value, book_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str = DEFAULT_SORT) -> Tuple[Any, int]:
+    """
+    Decodes a cursor created by `encode_cursor` back into its keyset position.
+
+    :param cursor: The cursor to decode
+    :param sort: The sort of the current request, which must match the cursor's sort
+    :raises ValueError: if the cursor is malformed or belongs to another sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, book_id = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor - {cursor}")
+
+    if cursor_sort != sort or not isinstance(book_id, int):
+        raise ValueError(f"Invalid cursor - {cursor}")
+
+    key, _ = parse_sort(sort)
+    try:
+        if value is not None and key == "price":
+            value = Decimal(value)
+        elif value is not None and not isinstance(value, (str if key == "title" else int)):
+            raise ValueError()
+    except Exception:
+        raise ValueError(f"Invalid cursor - {cursor}")
+
+    return value, book_id
+
+
+def get_keyset_condition(column, value: Any, book_id: int, descending: bool):
+    """
+    Builds the condition selecting all books after the keyset position `(value, ID)`.
+
+    This is the expanded form of `(column, ID) > (:value, :id)` as HANA lacks
+    row-value comparisons, which additionally accounts for `NULL` values being
+    sorted first in ascending and last in descending order.
+    """
+    if descending:
+        if value is None:
+            return and_(column.is_(None), Books.ID < book_id)
+        return or_(
+            column < value,
+            and_(column == value, Books.ID < book_id),
+            column.is_(None),
+        )
+
+    if value is None:
+        return or_(and_(column.is_(None), Books.ID > book_id), column.is_not(None))
+    return or_(column > value, and_(column == value, Books.ID > book_id))
+
+
+def get_filter_conditions(filters: BooksFilter) -> list:
+    """
+    Translates the filters into SQL conditions on the (indexed) `Books` columns
+    """
+    conditions = []
+    if "author_id" in filters:
+        conditions.append(Books.AUTHOR_ID == filters["author_id"])
+    if "genre_ids" in filters:
+        conditions.append(Books.genre_ID.in_(filters["genre_ids"]))
+    if "currency_code" in filters:
+        conditions.append(Books.currency_code == filters["currency_code"])
+    if "min_price" in filters:
+        conditions.append(Books.price >= filters["min_price"])
+    if "max_price" in filters:
+        conditions.append(Books.price <= filters["max_price"])
+    if "in_stock" in filters:
+        conditions.append(
+            Books.stock > 0
+            if filters["in_stock"]
+            else or_(Books.stock <= 0, Books.stock.is_(None))
+        )
+    return conditions
+
+
+def select_book_rows(fields: Optional[Tuple[str, ...]] = None):
+    """
+    Builds the unordered select statement for the columns of the REST
+    representation of books (see `to_book_dict`).
+
+    :param fields: Fields of `BOOK_FIELDS` to select (default: all) - the author is
+        only joined if required, currencies & genres are resolved via `BOOK_FIELD_RESOLVERS`
+    """
+    fields = fields or tuple(BOOK_FIELDS)
+    columns = dict.fromkeys(BOOK_FIELDS[field] for field in fields)
+    statement = db.select(*columns).select_from(Books)
+
+    if "author" in fields:
+        # inner join, as every book has an author
+        statement = statement.join(Books.author)
+    return statement
+
+
+def select_books(
+    cursor: Optional[str] = None,
+    filters: Optional[BooksFilter] = None,
+    sort: str = DEFAULT_SORT,
+    fields: Optional[Tuple[str, ...]] = None,
+):
+    """
+    Builds the select statement for the books matching `filters` ordered by
+    `(<sort column>, ID)`, starting right after the keyset position held by `cursor` (if any).
+    Besides `fields` (default: all), the `ID` & the sort column are always selected.
+
+    :raises ValueError: if the sort or the cursor is malformed
+    """
+    key, descending = parse_sort(sort)
+    column = SORT_COLUMNS[key]
+    if fields:
+        fields = tuple(dict.fromkeys(("id", SORT_FIELDS[key], *fields)))
+
+    statement = (
+        select_book_rows(fields)
+        .where(*get_filter_conditions(filters or {}))
+        .order_by(
+            *(
+                (column.desc().nulls_last(), Books.ID.desc())
+                if descending
+                else (column.asc().nulls_first(), Books.ID.asc())
+            )
+        )
+    )
+
+    if cursor:
+        value, book_id = decode_cursor(cursor, sort)
+        statement = statement.where(
+            get_keyset_condition(column, value, book_id, descending)
+        )
+
+    return statement
+
+
+def to_book_dict(book, fields: Optional[Tuple[str, ...]] = None) -> dict:
+    """
+    Converts a row selected via `select_book_rows` into its REST representation,
+    holding only `fields` (default: all).
+    """
+    if fields:
+        book_dict: dict = {}
+        for field in fields:
+            *parents, name = BOOK_FIELD_PATHS[field]
+            target = book_dict
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            value = getattr(book, BOOK_FIELDS[field].key)
+            resolve = BOOK_FIELD_RESOLVERS.get(field)
+            target[name] = resolve(value) if resolve else value
+        return book_dict
+
+    currency = get_currency(book.currency_code)
+    genre = get_genre(book.genre_ID)
+    return {
+        "id": book.ID,
+        "title": book.title,
+        "descr": book.descr,
+        "stock": book.stock,
+        "price": {
+            "value": book.price,
+            "currency": {
+                "code": book.currency_code,
+                "symbol": currency.symbol if currency else None,
+            },
+        },
+        "author": book.author_name,
+        "genre": genre.name if genre else None,
+    }
+
+
+def get_books(
+    limit: int,
+    cursor: Optional[str] = None,
+    filters: Optional[BooksFilter] = None,
+    sort: str = DEFAULT_SORT,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> BooksPage:
+    """
+    Fetches a page of books matching `filters` from the database ordered by
+    `(<sort column>, ID)`.
+
+    Uses keyset pagination - the `cursor` holds the sort value & `ID` of the last
+    book of the previous page, so the database seeks directly to the next row
+    instead of skipping over `OFFSET` rows, keeping every page equally cheap.
+
+    :param limit: Maximum number of books to return
+    :param cursor: Opaque cursor as returned in `next` of the previous page
+    :param filters: Filters the books must match
+    :param sort: Sort key (`title`, `price` or `stock`), prefixed with `-` for descending order
+    :param fields: Fields of the books to select & return (default: all), see `parse_fields`
+    :return: `BooksPage` with the books and the cursor for the next page
+    :raises ValueError: if the sort or the cursor is malformed
+    """
+    log.info(
+        f"Fetching books from the database (limit={limit}, cursor={cursor}, "
+        f"filters={filters}, sort={sort}, fields={fields})..."
+    )
+    # fetch one extra row to know whether a next page exists
+    statement = select_books(cursor, filters, sort, fields).limit(limit + 1)
 
-def get_books():
-    """
-    Fetches all books from the database and returns them as a list of dictionaries.
-    """
-    log.info("Fetching books from the database...")
-    books = db.session.execute(
-        db.select(
-            Books.ID,
-            Books.title,
-            Books.descr,
-            Books.stock,
-            Books.price,
-            Currencies.code.label("currency_code"),
-            Currencies.symbol.label("currency_symbol"),
-            Authors.name.label("author_name"),
-            Genres.name.label("genre"),
-        )
-        .join(Books.author)  # Explicit join to Authors
-        .join(Books.currency)  # Explicit join to Currencies
-        .join(Books.genre)  # Explicit join to Genres
-        .order_by(Books.title)
-    ).all()
+    books = db.session.execute(statement).all()
     log.info(f"Fetched {len(books)} books from the database.")
 
     if not books:
         log.warning("No books found in the database.")
-        return []
-
-    return [
-        {
-            "id": book.ID,
-            "title": book.title,
-            "descr": book.descr,
-            "stock": book.stock,
-            "price": {
-                "value": book.price,
-                "currency": {
-                    "code": book.currency_code,
-                    "symbol": book.currency_symbol,
-                },
-            },
-            "author": book.author_name,
-            "genre": book.genre,
+        return BooksPage(items=[], next=None, ids=[])
+
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        key, _ = parse_sort(sort)
+        next_cursor = encode_cursor(sort, getattr(books[-1], key), books[-1].ID)
+
+    return BooksPage(
+        items=[to_book_dict(book, fields) for book in books],
+        next=next_cursor,
+        ids=[book.ID for book in books],
+    )
+
+
+def iter_books(
+    chunk_size: int,
+    cursor: Optional[str] = None,
+    filters: Optional[BooksFilter] = None,
+    sort: str = DEFAULT_SORT,
+    fields: Optional[Tuple[str, ...]] = None,
+) -> Iterator[dict]:
+    """
+    Lazily yields all books matching `filters` (after `cursor`, if given)
+    ordered by `(<sort column>, ID)`.
+
+    Rows are fetched from the database in chunks of `chunk_size` via `yield_per`,
+    which makes SQLAlchemy use server-side cursors (`stream_results`) where the
+    driver supports it. Hence only a single chunk is held in memory at any time,
+    regardless of the size of the catalog.
+
+    :param chunk_size: Number of rows fetched from the database per round-trip
+    :param cursor: Opaque cursor to start streaming after
+    :param filters: Filters the books must match
+    :param sort: Sort key (`title`, `price` or `stock`), prefixed with `-` for descending order
+    :param fields: Fields of the books to select & yield (default: all), see `parse_fields`
+    :raises ValueError: if the sort or the cursor is malformed
+    """
+    # build the statement eagerly, so that a malformed cursor is reported
+    # before the caller starts streaming
+    statement = select_books(cursor, filters, sort, fields).execution_options(
+        yield_per=chunk_size
+    )
+
+    def generate():
+        log.info(f"Streaming books from the database (chunk_size={chunk_size})...")
+        count = 0
+        for book in db.session.execute(statement):
+            count += 1
+            yield to_book_dict(book, fields)
+        log.info(f"Streamed {count} books from the database.")
+
+    return generate()
+
+
+###############
+### WRITING ###
+###############
+
+# columns written by the upsert besides the `managed` fields
+UPSERT_COLUMNS = (
+    "ID",
+    "title",
+    "descr",
+    "stock",
+    "price",
+    "AUTHOR_ID",
+    "genre_ID",
+    "currency_code",
+)
+
+
+class BookUpsertResult(TypedDict, total=False):
+    """
+    Represents the outcome of upserting a single book of a batch.
+    """
+
+    index: int
+    id: Optional[int]
+    status: Literal["created", "updated", "invalid"]
+    error: str
+
+
+def parse_book_upsert(item: Any) -> dict:
+    """
+    Validates a book of an upsert batch and converts it into the row to write, e.g.
+    `{"id": 1, "title": "..", "descr": "..", "stock": 1, "price": "9.99",
+    "currency_code": "EUR", "author_id": 101, "genre_id": "<UUID>"}`.
+    Only `id`, `title` & `author_id` are mandatory - missing fields are written as `NULL`.
+
+    :raises ValueError: if the book is malformed
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Book must be an object")
+
+    def get_int(field: str, mandatory: bool = False) -> Optional[int]:
+        value = item.get(field)
+        if value is None and not mandatory:
+            return None
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f"Field '{field}' must be an integer")
+        return value
+
+    def get_str(field: str, max_length: int, mandatory: bool = False) -> Optional[str]:
+        value = item.get(field)
+        if value is None and not mandatory:
+            return None
+        if not isinstance(value, str) or not value or len(value) > max_length:
+            raise ValueError(f"Field '{field}' must be a string of 1 to {max_length} characters")
+        return value
+
+    price = item.get("price")
+    if price is not None:
+        try:
+            price = Decimal(str(price))
+        except InvalidOperation:
+            price = None
+        if price is None or not price.is_finite() or price < 0 or price >= 10**7:
+            raise ValueError("Field 'price' must be a non-negative number below 10000000")
+
+    genre_id = get_str("genre_id", 36)
+    if genre_id is not None:
+        try:
+            genre_id = str(uuid.UUID(genre_id))
+        except ValueError:
+            raise ValueError("Field 'genre_id' must be a UUID")
+
+    currency_code = get_str("currency_code", 3)
+    return {
+        "ID": get_int("id", mandatory=True),
+        "title": get_str("title", 111, mandatory=True),
+        "descr": get_str("descr", 1111),
+        "stock": get_int("stock"),
+        "price": price,
+        "AUTHOR_ID": get_int("author_id", mandatory=True),
+        "genre_ID": genre_id,
+        "currency_code": currency_code.upper() if currency_code else None,
+    }
+
+
+# columns of upserted books referencing other entities - field & referenced key
+UPSERT_REFERENCES = {
+    "AUTHOR_ID": ("author_id", Authors.ID),
+    "genre_ID": ("genre_id", Genres.ID),
+    "currency_code": ("currency_code", Currencies.code),
+}
+
+
+def find_unknown_references(rows: list[dict]) -> dict[int, str]:
+    """
+    Checks the authors, genres & currencies referenced by the books of an upsert batch
+    with one `IN` lookup per column for the whole batch, as SQLite doesn't enforce
+    foreign keys - e.g. books of unknown authors would be missing in the catalog,
+    which inner joins the authors.
+
+    :param rows: The books to upsert (see `parse_book_upsert`)
+    :return: The error by ID of the books referencing unknown entities
+    """
+    errors: dict[int, str] = {}
+    for column, (field, key) in UPSERT_REFERENCES.items():
+        values = {row[column] for row in rows if row[column] is not None}
+        if not values:
+            continue
+
+        known = {
+            str(value)
+            for value in db.session.execute(db.select(key).where(key.in_(list(values)))).scalars()
+        }
+        for row in rows:
+            value = row[column]
+            if value is not None and str(value) not in known:
+                errors.setdefault(row["ID"], f"Unknown {field} - {value}")
+    return errors
+
+
+def get_upsert_statement(dialect_name: str):
+    """
+    Builds the set-based upsert of books for the database dialect, to be executed
+    via `executemany` with rows of `UPSERT_COLUMNS` and the `managed` fields.
+    Existing books keep their `createdBy` & `createdAt`.
+    """
+    table = Books.__table__
+    updated_columns = [*UPSERT_COLUMNS[1:], "modifiedBy", "modifiedAt"]
+
+    if dialect_name == "sqlite":
+        statement = sqlite_insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=[table.c.ID],
+            set_={name: statement.excluded[name] for name in updated_columns},
+        )
+
+    if dialect_name == "hana":
+        # CDS deploys the columns in upper case
+        columns = [*UPSERT_COLUMNS, "createdBy", "createdAt", "modifiedBy", "modifiedAt"]
+        source = ", ".join(f':{name} AS "{name.upper()}"' for name in columns)
+        return text(
+            f'MERGE INTO "{table.name}" AS t '
+            f"USING (SELECT {source} FROM DUMMY) AS s "
+            f'ON t."ID" = s."ID" '
+            "WHEN MATCHED THEN UPDATE SET "
+            + ", ".join(f't."{name.upper()}" = s."{name.upper()}"' for name in updated_columns)
+            + " WHEN NOT MATCHED THEN INSERT ("
+            + ", ".join(f'"{name.upper()}"' for name in columns)
+            + ") VALUES ("
+            + ", ".join(f's."{name.upper()}"' for name in columns)
+            + ")"
+        )
+
+    raise ValueError(f"Upserting books is not supported on {dialect_name}")
+
+
+def upsert_books(items: list, user_name: str) -> list[BookUpsertResult]:
+    """
+    Creates or replaces the given books in a single transaction via one set-based
+    upsert (`INSERT .. ON CONFLICT` on SQLite, `MERGE` on HANA) executed as a
+    single `executemany`, instead of one ORM round-trip per book.
+
+    Invalid books, incl. the ones referencing unknown authors, genres or currencies,
+    are skipped & reported, the valid ones are still written. Whether a book was
+    created or updated is derived from the IDs existing right before the upsert.
+
+    :param items: The books to upsert (see `parse_book_upsert`)
+    :param user_name: Name of the user recorded in the `managed` fields
+    :return: The result of every book, in the order of `items`
+    """
+    results: list[BookUpsertResult] = []
+    rows: dict[int, dict] = {}
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    for index, item in enumerate(items):
+        try:
+            row = parse_book_upsert(item)
+        except ValueError as e:
+            book_id = item.get("id") if isinstance(item, dict) else None
+            results.append(
+                BookUpsertResult(index=index, id=book_id, status="invalid", error=str(e))
+            )
+            continue
+
+        if row["ID"] in rows:
+            results.append(
+                BookUpsertResult(
+                    index=index,
+                    id=row["ID"],
+                    status="invalid",
+                    error=f"Duplicate book ID in batch - {row['ID']}",
+                )
+            )
+            continue
+
+        rows[row["ID"]] = {
+            **row,
+            "createdBy": user_name,
+            "createdAt": now,
+            "modifiedBy": user_name,
+            "modifiedAt": now,
         }
-        for book in books
+        results.append(BookUpsertResult(index=index, id=row["ID"], status="created"))
+
+    unknown_references = find_unknown_references(list(rows.values())) if rows else {}
+    for result in results:
+        # IDs of invalid books are taken as given, hence may not even be hashable
+        if result["status"] != "created":
+            continue
+        error = unknown_references.get(result["id"])
+        if error is not None:
+            result.update(status="invalid", error=error)
+            del rows[result["id"]]
+
+    if not rows:
+        return results
+
+    log.info(f"Upserting {len(rows)} books...")
+    existing = set(
+        db.session.execute(
+            db.select(Books.ID).where(Books.ID.in_(list(rows)))
+        ).scalars()
+    )
+    db.session.execute(get_upsert_statement(db.engine.dialect.name), list(rows.values()))
+    db.session.commit()
+    log.info(f"Upserted {len(rows)} books ({len(existing)} updated).")
+
+    for result in results:
+        if result["status"] == "created" and result["id"] in existing:
+            result["status"] = "updated"
+    return results
+
+
+class ReservationResult(TypedDict):
+    """
+    Represents the outcome of reserving the stock of a single book of an order.
+    """
+
+    id: int
+    quantity: int
+    status: Literal["reserved", "insufficient_stock", "not_found", "aborted"]
+
+
+def reserve_books(lines: dict[int, int], user_name: str) -> Tuple[bool, list[ReservationResult]]:
+    """
+    Atomically reserves the stock of all books of an order, or none at all.
+
+    The stock is decremented by a single conditional statement, i.e.
+    `UPDATE .. SET stock = stock - :quantity WHERE ID = :id AND stock >= :quantity`
+    (with `CASE` expressions for multiple books), so that the database checks &
+    decrements the stock atomically. Hence no stock is read upfront and no row
+    locks are held across round-trips, while concurrent orders never oversell.
+
+    :param lines: The quantity to reserve per book ID
+    :param user_name: Name of the user recorded in the `managed` fields
+    :return: Whether the stock got reserved along with the result of every book
+    """
+    table = Books.__table__
+    quantity = (
+        case(lines, value=table.c.ID)
+        if len(lines) > 1
+        else next(iter(lines.values()))
+    )
+    statement = (
+        update(table)
+        .where(table.c.ID.in_(list(lines)), table.c.stock >= quantity)
+        .values(
+            stock=table.c.stock - quantity,
+            modifiedBy=user_name,
+            modifiedAt=datetime.now(timezone.utc).replace(tzinfo=None),
+        )
+    )
+
+    result = db.session.execute(statement)
+    if result.rowcount == len(lines):
+        db.session.commit()
+        log.info(f"Reserved stock of {len(lines)} books.")
+        return True, [
+            ReservationResult(id=book_id, quantity=quantity, status="reserved")
+            for book_id, quantity in lines.items()
+        ]
+
+    # some book lacks stock - nothing is reserved, find out which ones failed
+    db.session.rollback()
+    stocks = dict(
+        db.session.execute(
+            db.select(table.c.ID, table.c.stock).where(table.c.ID.in_(list(lines)))
+        ).all()
+    )
+    db.session.rollback()
+    log.info(f"Failed to reserve stock of {len(lines)} books.")
+
+    def get_status(book_id: int, quantity: int) -> str:
+        if book_id not in stocks:
+            return "not_found"
+        if (stocks[book_id] or 0) < quantity:
+            return "insufficient_stock"
+        return "aborted"
+
+    return False, [
+        ReservationResult(id=book_id, quantity=quantity, status=get_status(book_id, quantity))
+        for book_id, quantity in lines.items()
     ]
@@ -0,0 +1,360 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock, Thread
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    FrozenSet,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.models import Books, Authors, Currencies, Genres
+
+log = logging.getLogger("catalog-cache")
+
+T = TypeVar("T")
+
+
+class CacheEntry(NamedTuple):
+    """
+    Represents a cached, already serialized response payload.
+    """
+
+    payload: bytes
+    etag: str
+    headers: Dict[str, str]
+    expires_at: float
+    # what the payload was rendered from (e.g. the IDs of the listed books), see
+    # `ResponseCache.invalidate_tags`
+    tags: FrozenSet[Hashable]
+    # compressed payloads by content encoding, filled on first use
+    encoded: Dict[str, bytes]
+
+
+class ResponseCache:
+    """
+    Process-local, thread-safe cache for serialized responses
+
+    Entries expire after a TTL and the least recently used entries are evicted
+    once the cache holds more than `max_entries`. Every invalidation bumps the
+    cache `generation`, so that a payload computed from data read before the
+    invalidation is never stored afterwards.
+
+    Entries may be tagged with what they were rendered from, so that a change
+    only drops the entries tagged with the changed records (`invalidate_tags`).
+    """
+
+    # callables invoked with the cache name & whether it was a hit for every lookup
+    # of any response cache, e.g. to export it as metrics
+    lookup_observers: List[Callable[[str, bool], None]] = []
+
+    def __init__(self, name: str = "response", ttl: float = 60, max_entries: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get("CATALOG_CACHE_TTL", self.ttl)
+        self.max_entries = app.config.get("CATALOG_CACHE_MAX_ENTRIES", self.max_entries)
+        self.invalidate()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Returns the cached entry for `key` if present and not yet expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                entry = None
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        for observer in self.lookup_observers:
+            observer(self.name, entry is not None)
+        return entry
+
+    def set(
+        self,
+        key: Hashable,
+        payload: bytes,
+        headers: Dict[str, str],
+        generation: int,
+        tags: Collection[Hashable] = (),
+    ) -> CacheEntry:
+        """
+        Stores the payload for `key`, unless the cache has been invalidated since
+        `generation` was read. Returns the (possibly uncached) entry either way.
+        """
+        entry = CacheEntry(
+            payload=payload,
+            etag=hashlib.blake2b(payload, digest_size=16).hexdigest(),
+            headers=headers,
+            expires_at=time.monotonic() + self.ttl,
+            tags=frozenset(tags),
+            encoded={},
+        )
+
+        with self._lock:
+            if generation != self.generation or self.ttl <= 0 or self.max_entries <= 0:
+                return entry
+
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def get_or_set(
+        self,
+        key: Hashable,
+        compute: Callable[
+            [],
+            Union[Tuple[bytes, Dict[str, str]], Tuple[bytes, Dict[str, str], Collection[Hashable]]],
+        ],
+    ) -> CacheEntry:
+        """
+        Returns the cached entry for `key` or computes & caches it via `compute`,
+        which must return the serialized payload along with its response headers
+        and optionally the tags of the entry.
+        """
+        entry = self.get(key)
+        if entry is not None:
+            return entry
+
+        generation = self.generation
+        payload, headers, *tags = compute()
+        return self.set(key, payload, headers, generation, *tags)
+
+    def invalidate(self):
+        """
+        Drops all entries
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def invalidate_tags(self, tags: Iterable[Hashable]):
+        """
+        Drops the entries tagged with any of `tags`, keeping all others
+        """
+        tags = frozenset(tags)
+        with self._lock:
+            # payloads being computed aren't tagged yet, hence they must not be stored
+            self.generation += 1
+            for key in [key for key, entry in self._entries.items() if not tags.isdisjoint(entry.tags)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# process-local cache of serialized catalog responses
+catalog_cache = ResponseCache("catalog")
+
+
+# models written via the ORM within the current transaction of a session
+CHANGED_MODELS_KEY = "changed_models"
+
+_commit_listeners: list[Tuple[FrozenSet[type], Callable[[Set[type]], None]]] = []
+
+
+def invalidate_on_commit(models: Iterable[type], invalidate: Callable[[Set[type]], None]):
+    """
+    Registers `invalidate` to be called with the changed models, once a transaction
+    writing any of `models` via the ORM got committed.
+
+    Invalidating right at the flush instead would let requests running between the
+    flush & the commit read the still committed rows & cache them as current.
+    """
+    _commit_listeners.append((frozenset(models), invalidate))
+
+
+@event.listens_for(Session, "after_flush")
+def collect_changed_models(session, flush_context):
+    changed = {type(instance) for instance in (*session.new, *session.dirty, *session.deleted)}
+    session.info.setdefault(CHANGED_MODELS_KEY, set()).update(changed)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_models(session):
+    changed = session.info.pop(CHANGED_MODELS_KEY, None)
+    if not changed:
+        return
+    for models, invalidate in _commit_listeners:
+        if not models.isdisjoint(changed):
+            invalidate(changed & models)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_changed_models(session):
+    session.info.pop(CHANGED_MODELS_KEY, None)
+
+
+def invalidate_catalog_cache(models: Set[type]):
+    """
+    Invalidates the catalog cache, whenever any entity contributing to the catalog
+    got written via the ORM.
+    """
+    log.debug(f"Invalidating catalog cache due to change in {sorted(model.__name__ for model in models)}")
+    catalog_cache.invalidate()
+
+
+invalidate_on_commit((Books, Authors, Genres, Currencies), invalidate_catalog_cache)
+
+
+class SnapshotCache(Generic[T]):
+    """
+    Process-local, thread-safe cache of a small dataset loaded as a whole (e.g. a
+    code list), served as an immutable snapshot
+
+    The snapshot is loaded at startup (`init_app`) and reloaded in a background
+    thread once it expired after the TTL or got invalidated, while reads keep
+    being served from the last snapshot without waiting for the database. Only
+    reads before the first successful load (e.g. the database was unavailable at
+    startup) load the snapshot themselves. With a TTL <= 0 the snapshot never
+    expires, i.e. it's only reloaded once invalidated.
+
+    `on_change` is called once a snapshot reloaded due to an invalidation got
+    stored, e.g. to drop responses rendered from the previous snapshot.
+    """
+
+    # seconds to wait before retrying a failed background reload
+    RETRY_INTERVAL = 5.0
+
+    def __init__(
+        self,
+        name: str,
+        load: Callable[[], T],
+        ttl: float = 300,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.name = name
+        self.load = load
+        self.ttl = ttl
+        self.on_change = on_change
+        self.version = 0
+        self._snapshot: Optional[T] = None
+        self._snapshot_version = 0
+        self._refresh_at = 0.0
+        self._retry_at = 0.0
+        self._app = None
+        self._refresher: Optional[Thread] = None
+        self._lock = Lock()
+
+    def init_app(self, app, ttl: Optional[float] = None):
+        self._app = app
+        self.ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self.version += 1
+            self._snapshot = None
+
+        # warm up, so that requests never load the snapshot themselves
+        with app.app_context():
+            try:
+                self.refresh()
+            except SQLAlchemyError as e:
+                log.warning(f"Failed to load {self.name}, loading them on first use - {e}")
+
+    def get(self) -> T:
+        """
+        Returns the current snapshot, triggering a background reload if it's stale.
+        Requires an application context if nothing was loaded yet.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.refresh()
+
+        now = time.monotonic()
+        expired = self.ttl > 0 and self._refresh_at <= now
+        stale = expired or self._snapshot_version != self.version
+        if stale and self._retry_at <= now:
+            self.refresh_in_background()
+        return snapshot
+
+    def refresh(self) -> T:
+        """
+        Loads the snapshot & stores it, unless a newer one got stored meanwhile.
+        Requires an application context.
+        """
+        with self._lock:
+            version = self.version
+
+        log.info(f"Loading {self.name} from the database...")
+        snapshot = self.load()
+        log.info(f"Loaded {self.name} from the database.")
+
+        with self._lock:
+            changed = self._snapshot is not None and version > self._snapshot_version
+            # a snapshot of an invalidated version is stored nonetheless (it's newer
+            # than the current one), but reloaded on the next read
+            if self._snapshot is None or version >= self._snapshot_version:
+                self._snapshot = snapshot
+                self._snapshot_version = version
+                self._refresh_at = time.monotonic() + self.ttl
+
+        if changed and self.on_change is not None:
+            self.on_change()
+        return snapshot
+
+    def refresh_in_background(self):
+        """
+        Reloads the snapshot in a background thread, unless a reload is running already
+        """
+        with self._lock:
+            if self._app is None or (self._refresher is not None and self._refresher.is_alive()):
+                return
+            self._refresher = Thread(
+                target=self._refresh_in_app_context,
+                args=(self._app,),
+                name=f"{self.name}-refresher",
+                daemon=True,
+            )
+            self._refresher.start()
+
+    def _refresh_in_app_context(self, app):
+        try:
+            with app.app_context():
+                self.refresh()
+        except Exception as e:
+            log.warning(f"Failed to reload {self.name}, serving the last snapshot - {e}")
+            self._retry_at = time.monotonic() + self.RETRY_INTERVAL
+
+    def wait_for_refresh(self, timeout: Optional[float] = None):
+        """
+        Waits for a running background reload (if any) to finish
+        """
+        refresher = self._refresher
+        if refresher is not None:
+            refresher.join(timeout)
+
+    def invalidate(self):
+        """
+        Marks the snapshot as stale, the next read triggers a reload
+        """
+        with self._lock:
+            self.version += 1
@@ -0,0 +1,156 @@
+import uuid
+from typing import Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+from app.services.refdata_service import Genre, genre_cache
+
+
+class GenreNode(NamedTuple):
+    """
+    Represents a single genre within the genre hierarchy.
+    """
+
+    id: str
+    name: str
+    descr: Optional[str]
+    parent_id: Optional[str]
+    children: Tuple[str, ...]
+
+
+class GenreTree:
+    """
+    Immutable snapshot of the genre hierarchy
+
+    The hierarchy is linked in memory from the flat list of all genres, which is
+    loaded with a single select (see `refdata_service.genre_cache`), instead of
+    loading the `children` of every genre level by level. This works alike on SQLite
+    and HANA, which lacks recursive common table expressions.
+    """
+
+    def __init__(self, entries: Iterable[Genre]):
+        children: Dict[str, list] = {}
+        genres = {}
+        for genre in entries:
+            genres[genre.id] = (genre.name, genre.descr, genre.parent_id)
+            children.setdefault(genre.parent_id, []).append((genre.name or "", genre.id))
+
+        self.nodes: Dict[str, GenreNode] = {
+            genre_id: GenreNode(
+                id=genre_id,
+                name=name,
+                descr=descr,
+                # parents missing in the table are treated as roots
+                parent_id=parent_id if parent_id in genres else None,
+                children=tuple(child for _, child in sorted(children.get(genre_id, []))),
+            )
+            for genre_id, (name, descr, parent_id) in genres.items()
+        }
+        self.roots: Tuple[str, ...] = tuple(
+            genre_id
+            for _, genre_id in sorted(
+                (node.name or "", node.id)
+                for node in self.nodes.values()
+                if node.parent_id is None
+            )
+        )
+
+    def __contains__(self, genre_id: str) -> bool:
+        return genre_id in self.nodes
+
+    def get_descendants(self, genre_id: str) -> Tuple[str, ...]:
+        """
+        Returns the IDs of the genre and all of its (transitive) sub-genres.
+
+        :raises KeyError: if the genre doesn't exist
+        """
+        descendants, pending = [], [self.nodes[genre_id].id]
+        visited = set()
+        while pending:
+            current = pending.pop()
+            # guards against cycles in the (unconstrained) parent references
+            if current in visited:
+                continue
+            visited.add(current)
+            descendants.append(current)
+            pending.extend(reversed(self.nodes[current].children))
+        return tuple(descendants)
+
+    def to_dict(self, genre_id: str) -> dict:
+        """
+        Converts the subtree rooted at the genre into its nested REST representation.
+
+        :raises KeyError: if the genre doesn't exist
+        """
+
+        def convert(node_id: str, ancestors: frozenset) -> dict:
+            node = self.nodes[node_id]
+            ancestors = ancestors | {node_id}
+            return {
+                "id": node.id,
+                "name": node.name,
+                "descr": node.descr,
+                "children": [
+                    convert(child, ancestors)
+                    for child in node.children
+                    if child not in ancestors
+                ],
+            }
+
+        return convert(genre_id, frozenset())
+
+    def to_list(self) -> list[dict]:
+        """
+        Converts the whole hierarchy into its nested REST representation.
+        """
+        return [self.to_dict(root) for root in self.roots]
+
+
+# genre hierarchy along with the snapshot of `genre_cache` it was built from
+_genre_tree: Tuple[Optional[Mapping[str, Genre]], Optional[GenreTree]] = (None, None)
+
+
+def get_tree() -> GenreTree:
+    """
+    Returns the genre hierarchy of the cached genres (see `refdata_service`),
+    built once per snapshot of the genres
+    """
+    global _genre_tree
+    genres = genre_cache.get()
+    snapshot, tree = _genre_tree
+    if snapshot is not genres:
+        # concurrent requests may build the same tree, storing alike trees
+        tree = GenreTree(genres.values())
+        _genre_tree = (genres, tree)
+    return tree
+
+
+def parse_genre_id(genre_id: str) -> str:
+    """
+    Normalizes a genre ID into the canonical UUID form stored in the database.
+
+    :raises ValueError: if the genre ID is not a UUID
+    """
+    try:
+        return str(uuid.UUID(genre_id))
+    except ValueError:
+        raise ValueError(f"Invalid genre ID - {genre_id}. Must be a UUID")
+
+
+def get_genre_tree() -> list[dict]:
+    """
+    Returns the whole genre hierarchy as a nested list of root genres.
+    """
+    return get_tree().to_list()
+
+
+def get_genre_descendants(genre_id: str) -> Optional[Tuple[str, ...]]:
+    """
+    Returns the IDs of the genre and all of its sub-genres, or `None` if the
+    genre doesn't exist.
+
+    :raises ValueError: if the genre ID is not a UUID
+    """
+    genre_id = parse_genre_id(genre_id)
+    tree = get_tree()
+    if genre_id not in tree:
+        return None
+    return tree.get_descendants(genre_id)
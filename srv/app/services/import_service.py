@@ -0,0 +1,250 @@
+import csv
+import logging
+import os
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+from sqlalchemy import Table, delete, insert
+
+from app import db_manager
+from app.models import Books
+
+log = logging.getLogger("csv-import")
+
+db = db_manager.db
+
+# delimiters used by the CSV files in `db/data` - `sap.common` code lists use `;`
+CSV_DELIMITERS = (",", ";")
+
+
+class ImportResult(NamedTuple):
+    """
+    Represents the outcome of importing a single CSV file.
+    """
+
+    table: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else float("inf")
+
+
+def get_table_for_file(path: str) -> Table:
+    """
+    Resolves the table of a CSV file named after its CDS entity, e.g.
+    `sap.sample.bookshop-Books.csv` -> `SAP_SAMPLE_BOOKSHOP_BOOKS`.
+
+    :raises ValueError: if no model is mapped to the table
+    """
+    entity = os.path.splitext(os.path.basename(path))[0]
+    table_name = entity.replace(".", "_").replace("-", "_").upper()
+    tables = {name.upper(): table for name, table in db.metadata.tables.items()}
+    if table_name not in tables:
+        raise ValueError(f"No table found for CSV file - {path}")
+    return tables[table_name]
+
+
+def get_csv_files(paths: List[str]) -> List[str]:
+    """
+    Expands directories into the CSV files within them and orders the files by
+    the dependencies of their tables, so that referenced rows are imported first.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name)
+                for name in sorted(os.listdir(path))
+                if name.lower().endswith(".csv")
+            )
+        else:
+            files.append(path)
+
+    order = {table.name: i for i, table in enumerate(db.metadata.sorted_tables)}
+    return sorted(files, key=lambda file: order[get_table_for_file(file).name])
+
+
+def get_converter(column) -> Callable[[str], object]:
+    """
+    Returns the function converting CSV values into the Python type of the column
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return str
+
+    if python_type is date:
+        return date.fromisoformat
+    if python_type is datetime:
+        return datetime.fromisoformat
+    if python_type in (int, Decimal, float):
+        return python_type
+    return str
+
+
+def read_csv_rows(file, table: Table) -> Iterator[Dict[str, object]]:
+    """
+    Lazily reads the rows of a CSV file as dictionaries keyed by the (case-insensitively)
+    matching column names of the table, converted into the column types. Empty values
+    are read as `NULL`.
+
+    :raises ValueError: if the header holds a column missing in the table
+    """
+    header_line = file.readline()
+    delimiter = max(CSV_DELIMITERS, key=header_line.count)
+    header = next(csv.reader([header_line], delimiter=delimiter))
+
+    columns = {column.name.lower(): column for column in table.columns}
+    unknown = [name for name in header if name.lower() not in columns]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown} for table - {table.name}")
+
+    fields = [
+        (index, columns[name.lower()].name, get_converter(columns[name.lower()]))
+        for index, name in enumerate(header)
+    ]
+    reader = csv.reader(file, delimiter=delimiter)
+    for values in reader:
+        try:
+            yield {
+                name: convert(values[index]) if values[index] != "" else None
+                for index, name, convert in fields
+            }
+        except (ArithmeticError, IndexError, ValueError) as e:
+            raise ValueError(
+                f"Invalid row in line {reader.line_num + 1} for table {table.name} - {e}"
+            )
+
+
+def batched(rows: Iterator, batch_size: int) -> Iterator[list]:
+    """
+    Splits the rows into lists of at most `batch_size` rows
+    """
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def import_csv_file(
+    path: str,
+    batch_size: int,
+    batches_per_transaction: int,
+    delete_existing: bool = False,
+) -> ImportResult:
+    """
+    Streams the rows of a CSV file into its table via `executemany` in batches of
+    `batch_size` rows, committing every `batches_per_transaction` batches. Hence only
+    a single batch is held in memory and no transaction grows unbounded.
+
+    Rows are inserted via SQLAlchemy Core, bypassing the ORM change tracking - running
+    servers pick up the imported rows once their caches expire.
+    Requires an application context.
+    """
+    table = get_table_for_file(path)
+    log.info(f"Importing {path} into {table.name}...")
+    start = time.perf_counter()
+    count = 0
+
+    with open(path, encoding="utf-8-sig", newline="") as file:
+        rows = read_csv_rows(file, table)
+
+        if delete_existing:
+            with db.engine.begin() as conn:
+                conn.execute(delete(table))
+
+        statement = insert(table)
+        batches = batched(rows, batch_size)
+        while True:
+            inserted = 0
+            with db.engine.begin() as conn:
+                for batch in islice(batches, batches_per_transaction):
+                    conn.execute(statement, batch)
+                    inserted += len(batch)
+            count += inserted
+            log.debug(f"Committed {count} rows into {table.name}")
+
+            # a transaction short of batches means the file is exhausted
+            if inserted < batch_size * batches_per_transaction:
+                break
+
+    result = ImportResult(
+        table=table.name, rows=count, seconds=time.perf_counter() - start
+    )
+    log.info(
+        f"Imported {result.rows} rows into {result.table} in {result.seconds:.2f}s "
+        f"({result.rows_per_second:.0f} rows/s)."
+    )
+    return result
+
+
+def drop_indexes(tables: List[Table]) -> None:
+    """
+    Drops the indexes declared on the models of the tables along with the full-text
+    search triggers on the books, which would otherwise be maintained row by row.
+    Re-create them via `rebuild_indexes`. SQLite only.
+    """
+    from app.services.search_service import SqliteSearchBackend
+
+    with db.engine.begin() as conn:
+        for table in tables:
+            for index in table.indexes:
+                index.drop(conn, checkfirst=True)
+
+    if Books.__table__ in tables:
+        SqliteSearchBackend().drop_triggers()
+
+
+def rebuild_indexes() -> None:
+    """
+    Re-creates the indexes & full-text search triggers dropped via `drop_indexes`
+    and rebuilds the full-text index from the imported books. SQLite only.
+    """
+    from app.services.search_service import SqliteSearchBackend
+
+    db_manager.create_indexes()
+    SqliteSearchBackend().setup(rebuild=True)
+
+
+def import_csv_files(
+    paths: List[str],
+    batch_size: int,
+    batches_per_transaction: int,
+    delete_existing: bool = False,
+    disable_indexes: bool = False,
+    on_result: Optional[Callable[[ImportResult], None]] = None,
+) -> List[ImportResult]:
+    """
+    Imports the CSV files (or directories of CSV files) in the order of their
+    table dependencies. See `import_csv_file`.
+
+    :param disable_indexes: Drop the indexes before & rebuild them after the import,
+        which is faster than maintaining them row by row (SQLite only)
+    :param on_result: Called with the result of every imported file
+    :raises ValueError: if a file doesn't match any table or column
+    """
+    files = get_csv_files(paths)
+    disable_indexes = disable_indexes and db.engine.dialect.name == "sqlite"
+
+    if disable_indexes:
+        drop_indexes([get_table_for_file(file) for file in files])
+
+    results = []
+    try:
+        for file in files:
+            result = import_csv_file(
+                file, batch_size, batches_per_transaction, delete_existing
+            )
+            results.append(result)
+            if on_result:
+                on_result(result)
+    finally:
+        if disable_indexes:
+            start = time.perf_counter()
+            rebuild_indexes()
+            log.info(f"Rebuilt indexes in {time.perf_counter() - start:.2f}s.")
+
+    return results
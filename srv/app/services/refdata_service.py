@@ -0,0 +1,134 @@
+import logging
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Set
+
+from app import db_manager
+from app.models import Currencies, Genres
+from app.services.cache_service import SnapshotCache, catalog_cache, invalidate_on_commit
+
+log = logging.getLogger("refdata-cache")
+
+db = db_manager.db
+
+
+class Currency(NamedTuple):
+    """
+    Represents a currency of the `sap.common.Currencies` code list.
+    """
+
+    code: str
+    name: Optional[str]
+    descr: Optional[str]
+    symbol: Optional[str]
+    minor_unit: Optional[int]
+
+
+class Genre(NamedTuple):
+    """
+    Represents a single genre, without its hierarchy (see `genres_service`).
+    """
+
+    id: str
+    name: Optional[str]
+    descr: Optional[str]
+    parent_id: Optional[str]
+
+
+def load_currencies() -> Mapping[str, Currency]:
+    """
+    Loads all currencies by code, ordered by code
+    """
+    rows = db.session.execute(
+        db.select(
+            Currencies.code,
+            Currencies.name,
+            Currencies.descr,
+            Currencies.symbol,
+            Currencies.minorUnit,
+        ).order_by(Currencies.code)
+    ).all()
+    return MappingProxyType({row.code: Currency(*row) for row in rows})
+
+
+def load_genres() -> Mapping[str, Genre]:
+    """
+    Loads all genres by ID, ordered by name
+    """
+    rows = db.session.execute(
+        db.select(Genres.ID, Genres.name, Genres.descr, Genres.parent_ID).order_by(
+            Genres.name, Genres.ID
+        )
+    ).all()
+    return MappingProxyType(
+        {
+            str(row.ID): Genre(
+                id=str(row.ID),
+                name=row.name,
+                descr=row.descr,
+                parent_id=str(row.parent_ID) if row.parent_ID else None,
+            )
+            for row in rows
+        }
+    )
+
+
+# process-local caches of the code lists referenced by books - the genre hierarchy
+# is built from the cached genres as well (see `genres_service`). Cached catalog
+# responses may have been rendered from the previous snapshot after a change.
+currency_cache: SnapshotCache[Mapping[str, Currency]] = SnapshotCache(
+    "currencies", load_currencies, on_change=catalog_cache.invalidate
+)
+genre_cache: SnapshotCache[Mapping[str, Genre]] = SnapshotCache(
+    "genres", load_genres, on_change=catalog_cache.invalidate
+)
+
+
+def init_app(app):
+    """
+    Configures & loads the reference data caches
+    """
+    ttl = app.config.get("REFDATA_CACHE_TTL")
+    currency_cache.init_app(app, ttl)
+    genre_cache.init_app(app, ttl)
+
+
+def invalidate_refdata_caches(models: Set[type]):
+    """
+    Invalidates the cache of a code list, whenever any of its entries got written
+    via the ORM.
+    """
+    for model in models:
+        cache = currency_cache if model is Currencies else genre_cache
+        log.debug(f"Invalidating {cache.name} cache due to change in {model.__name__}")
+        cache.invalidate()
+
+
+invalidate_on_commit((Currencies, Genres), invalidate_refdata_caches)
+
+
+def get_currency(code: Optional[str]) -> Optional[Currency]:
+    """
+    Returns the currency of the code, or `None` if unknown
+    """
+    return currency_cache.get().get(code) if code else None
+
+
+def get_genre(genre_id) -> Optional[Genre]:
+    """
+    Returns the genre of the ID (a UUID or its string form), or `None` if unknown
+    """
+    return genre_cache.get().get(str(genre_id)) if genre_id else None
+
+
+def get_currencies() -> list[dict]:
+    """
+    Returns all currencies in their REST representation, ordered by code
+    """
+    return [currency._asdict() for currency in currency_cache.get().values()]
+
+
+def get_genres() -> list[dict]:
+    """
+    Returns all genres as a flat list in their REST representation, ordered by name
+    """
+    return [genre._asdict() for genre in genre_cache.get().values()]
@@ -0,0 +1,276 @@
+import base64
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from flask import current_app
+from sqlalchemy import bindparam, column, func, inspect, literal_column, table, text, tuple_
+
+from app import db_manager
+from app.models import Books
+from app.services.books_service import BooksPage, select_book_rows, to_book_dict
+
+log = logging.getLogger("book-search")
+
+db = db_manager.db
+
+# words of a search query - operators & punctuation are dropped, so that user input
+# never reaches the full-text query syntax of the database unescaped
+SEARCH_TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+SEARCH_MAX_TERMS = 16
+
+
+def get_search_terms(query: str) -> list[str]:
+    """
+    Splits a search query into its words.
+
+    :raises ValueError: if the query holds no searchable word
+    """
+    terms = SEARCH_TERM_PATTERN.findall(query or "")[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise ValueError(f"Invalid search query - '{query}' holds no searchable word")
+    return terms
+
+
+def encode_search_cursor(offset: int) -> str:
+    """
+    Encodes the offset of the next page of search results as an opaque cursor.
+
+    Unlike the keyset cursors of `books_service`, search results are paged by
+    offset, as relevance scores can't be used in a `WHERE` clause on HANA.
+    """
+    raw = json.dumps(["search", offset], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> int:
+    """
+    Decodes a cursor created by `encode_search_cursor` back into its offset.
+
+    :raises ValueError: if the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        kind, offset = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor - {cursor}")
+
+    if kind != "search" or not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Invalid cursor - {cursor}")
+
+    return offset
+
+
+class SearchBackend(ABC):
+    """
+    Abstract base class for the database specific full-text search over
+    the titles & descriptions of books.
+    """
+
+    def setup(self):
+        """
+        Creates the database objects required for searching, if any.
+        Requires an application context.
+        """
+        pass
+
+    @abstractmethod
+    def select_ranked_books(self, terms: list[str]):
+        """
+        Builds the select statement for the books matching all `terms`, ordered
+        by relevance (most relevant first) & `ID`.
+        """
+        pass
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    Full-text search via an SQLite FTS5 virtual table
+
+    The FTS table is an external content table over the books table, so it only
+    stores the full-text index - the triggers keep it in sync with the books.
+    """
+
+    FTS_TABLE = f"{Books.__tablename__}_FTS"
+
+    # relevance weights of the `title` & `descr` columns
+    TITLE_WEIGHT = 10.0
+    DESCR_WEIGHT = 1.0
+
+    def setup(self, rebuild: bool = False):
+        """
+        Creates the missing FTS table & triggers. The index is rebuilt from the books
+        if the FTS table got created, if it's out of sync with the books after the
+        triggers got re-created (e.g. the books table was re-deployed via `cds deploy`)
+        or if `rebuild` is set. Skipped if the books table is missing, e.g. before
+        the initial import into a new database.
+
+        :param rebuild: Whether to rebuild the index in any case, e.g. after a bulk import
+        """
+        books_table = Books.__tablename__
+        fts_table = self.FTS_TABLE
+        statements = {
+            fts_table: f"""
+                CREATE VIRTUAL TABLE "{fts_table}" USING fts5(
+                    title, descr,
+                    content='{books_table}', content_rowid='ID',
+                    tokenize='unicode61 remove_diacritics 2'
+                )""",
+            f"{fts_table}_AI": f"""
+                CREATE TRIGGER "{fts_table}_AI" AFTER INSERT ON "{books_table}" BEGIN
+                    INSERT INTO "{fts_table}" (rowid, title, descr)
+                    VALUES (new.ID, new.title, new.descr);
+                END""",
+            f"{fts_table}_AD": f"""
+                CREATE TRIGGER "{fts_table}_AD" AFTER DELETE ON "{books_table}" BEGIN
+                    INSERT INTO "{fts_table}" ("{fts_table}", rowid, title, descr)
+                    VALUES ('delete', old.ID, old.title, old.descr);
+                END""",
+            f"{fts_table}_AU": f"""
+                CREATE TRIGGER "{fts_table}_AU" AFTER UPDATE OF ID, title, descr
+                ON "{books_table}" BEGIN
+                    INSERT INTO "{fts_table}" ("{fts_table}", rowid, title, descr)
+                    VALUES ('delete', old.ID, old.title, old.descr);
+                    INSERT INTO "{fts_table}" (rowid, title, descr)
+                    VALUES (new.ID, new.title, new.descr);
+                END""",
+        }
+
+        with db.engine.begin() as conn:
+            if not inspect(conn).has_table(books_table):
+                log.warning(f"Skipping full-text search setup of missing table - {books_table}")
+                return
+
+            existing = set(
+                conn.execute(
+                    text("SELECT name FROM sqlite_master WHERE name IN :names").bindparams(
+                        bindparam("names", expanding=True)
+                    ),
+                    {"names": list(statements)},
+                ).scalars()
+            )
+            missing = [name for name in statements if name not in existing]
+            for name in missing:
+                conn.execute(text(statements[name]))
+            if missing:
+                log.info(f"Created full-text search objects {missing}")
+
+            if rebuild or fts_table in missing or (missing and not self.is_in_sync(conn)):
+                conn.execute(
+                    text(f'INSERT INTO "{fts_table}" ("{fts_table}") VALUES (\'rebuild\')')
+                )
+                log.info("Rebuilt the full-text search index")
+
+    def is_in_sync(self, conn) -> bool:
+        """
+        Checks whether the index holds as many books as the books table - it gets
+        out of sync while its triggers are missing, e.g. after re-deploying the books
+        table via `cds deploy`, which drops them
+        """
+        # the `docsize` shadow table holds a row per indexed book
+        indexed, books = conn.execute(
+            text(
+                f'SELECT (SELECT count(*) FROM "{self.FTS_TABLE}_docsize"), '
+                f'(SELECT count(*) FROM "{Books.__tablename__}")'
+            )
+        ).one()
+        return indexed == books
+
+    def drop_triggers(self):
+        """
+        Drops the triggers syncing the full-text index, e.g. ahead of bulk imports.
+        Re-create them & rebuild the index via `setup(rebuild=True)`.
+        """
+        with db.engine.begin() as conn:
+            for suffix in ("AI", "AD", "AU"):
+                conn.execute(text(f'DROP TRIGGER IF EXISTS "{self.FTS_TABLE}_{suffix}"'))
+
+    def select_ranked_books(self, terms: list[str]):
+        fts = table(self.FTS_TABLE, column("rowid"), column(self.FTS_TABLE))
+        # each term is a quoted string, which FTS5 implicitly combines via `AND`
+        match = " ".join(f'"{term}"' for term in terms)
+        rank = func.bm25(
+            literal_column(f'"{self.FTS_TABLE}"'), self.TITLE_WEIGHT, self.DESCR_WEIGHT
+        )
+        return (
+            select_book_rows()
+            .join(fts, fts.c.rowid == Books.ID)
+            .where(fts.c[self.FTS_TABLE].match(match))
+            # `bm25` returns lower values for better matches
+            .order_by(rank, Books.ID)
+        )
+
+
+class HanaSearchBackend(SearchBackend):
+    """
+    Full-text search via HANA's `CONTAINS()` predicate, backed by the
+    full-text indexes on the books table (see `db/src/*.hdbfulltextindex`).
+    """
+
+    # minimum similarity of fuzzy matches, tolerating typos
+    FUZZINESS = 0.8
+
+    def select_ranked_books(self, terms: list[str]):
+        contains = func.contains(
+            tuple_(Books.title, Books.descr),
+            " ".join(terms),
+            literal_column(f"FUZZY({self.FUZZINESS})"),
+        )
+        return (
+            select_book_rows()
+            .where(contains)
+            .order_by(func.score().desc(), Books.ID)
+        )
+
+
+SEARCH_BACKENDS = {
+    "sqlite": SqliteSearchBackend,
+    "hana": HanaSearchBackend,
+}
+
+
+def init_app(app):
+    """
+    Selects the search backend by the configured `DB_TYPE` and creates its
+    database objects.
+    """
+    backend = SEARCH_BACKENDS[app.config.get("DB_TYPE")]()
+    with app.app_context():
+        backend.setup()
+    app.extensions["book_search"] = backend
+
+
+def search_books(query: str, limit: int, cursor: Optional[str] = None) -> BooksPage:
+    """
+    Searches the titles & descriptions of books for all words of `query`,
+    ranked by relevance.
+
+    :param query: Search query
+    :param limit: Maximum number of books to return
+    :param cursor: Opaque cursor as returned in `next` of the previous page
+    :return: `BooksPage` with the books and the cursor for the next page
+    :raises ValueError: if the query or the cursor is malformed
+    """
+    terms = get_search_terms(query)
+    offset = decode_search_cursor(cursor) if cursor else 0
+
+    log.info(f"Searching books (terms={terms}, limit={limit}, offset={offset})...")
+    backend: SearchBackend = current_app.extensions["book_search"]
+    # fetch one extra row to know whether a next page exists
+    statement = backend.select_ranked_books(terms).offset(offset).limit(limit + 1)
+
+    books = db.session.execute(statement).all()
+    log.info(f"Found {len(books)} books.")
+
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        next_cursor = encode_search_cursor(offset + limit)
+
+    return BooksPage(
+        items=[to_book_dict(book) for book in books],
+        next=next_cursor,
+        ids=[book.ID for book in books],
+    )
@@ -0,0 +1,173 @@
+import logging
+from threading import RLock, Semaphore
+from typing import Callable, Dict, List, Tuple, TypedDict
+
+from flask import Flask, g, request
+from werkzeug import exceptions
+
+from app.database import limit_checkout_timeout
+
+log = logging.getLogger("admission-control")
+
+
+class AdmissionStatus(TypedDict):
+    """
+    Represents a snapshot of the admission control of a worker process.
+    """
+
+    max_concurrency: int
+    max_queue: int
+    active: int
+    queued: int
+    shed: Dict[str, int]
+
+
+class AdmissionController:
+    """
+    Per-process admission control of the API routes
+
+    At most `max_concurrency` requests are served at once, further requests wait
+    in a queue of at most `max_queue` requests for up to `queue_timeout` seconds.
+    Requests beyond are shed right away with a `503 Service Unavailable` carrying
+    `Retry-After`, instead of piling up on the DB connection pool until every caller
+    (including health checks, which are not subject to admission control) times out.
+
+    Admitted requests wait for a DB connection for up to `checkout_timeout` seconds
+    (instead of the pool timeout), so that they are shed early as well once the
+    connections are exhausted.
+
+    A slot is held until the request is torn down, i.e. streamed responses hold
+    it until they are fully sent.
+    """
+
+    # reasons requests are shed for, `pool_timeout` is recorded via `record_shed`
+    SHED_REASONS = ("queue_full", "queue_timeout", "pool_timeout")
+
+    # callables invoked with the reason of every shed request, e.g. to export it as metrics
+    shed_observers: List[Callable[[str], None]] = []
+    # callables invoked for every admitted request with whether it has been queued
+    admit_observers: List[Callable[[bool], None]] = []
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        max_queue: int = 0,
+        queue_timeout: float = 1.0,
+        checkout_timeout: float = 1.0,
+        retry_after: int = 1,
+        blueprints: Tuple[str, ...] = ("routes",),
+    ):
+        self.enabled = True
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.checkout_timeout = checkout_timeout
+        self.retry_after = retry_after
+        self.blueprints = blueprints
+        self.slots = Semaphore(max_concurrency)
+        self.active = 0
+        self.queued = 0
+        self.shed = dict.fromkeys(self.SHED_REASONS, 0)
+        self._lock = RLock()
+
+    def init_app(self, app: Flask):
+        self.enabled = app.config.get("ADMISSION_ENABLED", self.enabled)
+        self.max_concurrency = app.config.get("ADMISSION_MAX_CONCURRENCY", self.max_concurrency)
+        self.max_queue = app.config.get("ADMISSION_MAX_QUEUE", self.max_queue)
+        self.queue_timeout = app.config.get("ADMISSION_QUEUE_TIMEOUT", self.queue_timeout)
+        self.checkout_timeout = app.config.get("ADMISSION_CHECKOUT_TIMEOUT", self.checkout_timeout)
+        self.retry_after = app.config.get("ADMISSION_RETRY_AFTER", self.retry_after)
+        with self._lock:
+            self.slots = Semaphore(self.max_concurrency)
+            self.active = self.queued = 0
+            self.shed = dict.fromkeys(self.SHED_REASONS, 0)
+
+        log.info(
+            f"Admission control per worker - enabled={self.enabled}, "
+            f"concurrency={self.max_concurrency}, queue={self.max_queue}, "
+            f"queue_timeout={self.queue_timeout}s, checkout_timeout={self.checkout_timeout}s"
+        )
+        # registered on the app, as the (module-level) blueprints are registered by
+        # every app created, which forbids adding hooks to them afterwards
+        app.before_request(self.admit)
+        app.teardown_request(self.release)
+
+    def admit(self):
+        """
+        `before_request` hook acquiring a slot for requests to the controlled blueprints
+
+        :raises ServiceUnavailable: if the queue is full or no slot got free in time
+        """
+        queued = False
+        if not self.enabled or request.blueprint not in self.blueprints:
+            return
+
+        with self._lock:
+            acquired = self.slots.acquire(blocking=False)
+            if acquired:
+                self.active += 1
+            elif self.queued >= self.max_queue:
+                raise self.reject("queue_full")
+            else:
+                self.queued += 1
+                queued = True
+
+        if queued:
+            acquired = self.slots.acquire(timeout=self.queue_timeout)
+            with self._lock:
+                self.queued -= 1
+                if not acquired:
+                    raise self.reject("queue_timeout")
+                self.active += 1
+
+        g.admission_slot = True
+        limit_checkout_timeout(self.checkout_timeout)
+        for observer in self.admit_observers:
+            observer(queued)
+
+    def release(self, exception=None):
+        """
+        `teardown_request` hook releasing the slot of the request (if any)
+        """
+        if g.pop("admission_slot", False):
+            limit_checkout_timeout(None)
+            with self._lock:
+                self.active -= 1
+            self.slots.release()
+
+    def record_shed(self, reason: str):
+        """
+        Records a request shed for the given reason, e.g. a DB pool checkout timeout
+        """
+        with self._lock:
+            self.shed[reason] = self.shed.get(reason, 0) + 1
+            log.warning(
+                f"Shedding request to {request.endpoint} ({reason}) - "
+                f"{self.active} active, {self.queued} queued"
+            )
+        for observer in self.shed_observers:
+            observer(reason)
+
+    def reject(self, reason: str) -> exceptions.ServiceUnavailable:
+        """
+        Records a shed request & returns the `503` to raise
+        """
+        self.record_shed(reason)
+        return exceptions.ServiceUnavailable(
+            description="Service is overloaded, please retry later",
+            retry_after=self.retry_after,
+        )
+
+    def get_status(self) -> AdmissionStatus:
+        with self._lock:
+            return AdmissionStatus(
+                max_concurrency=self.max_concurrency,
+                max_queue=self.max_queue,
+                active=self.active,
+                queued=self.queued,
+                shed=dict(self.shed),
+            )
+
+
+# admission control of the API routes of this worker process
+admission_controller = AdmissionController()
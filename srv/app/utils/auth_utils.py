@@ -1,14 +1,181 @@
+from collections import OrderedDict
+from datetime import timezone
 from functools import wraps
+from threading import Lock
+from typing import Callable, FrozenSet, List, NamedTuple, Optional
 import base64
+import hashlib
+import time
 
 from flask import Request
 from flask_login import current_user
-
-from sap import xssec
 from werkzeug import exceptions
 
 from config import Config
 from app.models import BaseUser, BasicUser, XsuaaUser
+from app.utils.startup_utils import lazy_import
+
+# loaded on first use, i.e. the first XSUAA token - never with basic authentication
+jwt = lazy_import("jwt")
+xssec = lazy_import("sap.xssec")
+
+
+XSAPPNAME_PREFIX = "$XSAPPNAME."
+
+
+class SecurityContextCacheEntry(NamedTuple):
+    """
+    Represents a validated xssec security context along with the precomputed
+    set of scopes granted to the token.
+    """
+
+    security_context: "xssec.SecurityContextXSUAA"
+    scopes: Optional[FrozenSet[str]]
+    expires_at: float
+
+
+class SecurityContextCache:
+    """
+    Bounded, thread-safe cache of validated xssec security contexts
+
+    Entries are keyed by the SHA-256 hash of the access token (the raw token is
+    never stored as key) and expire at the token's `exp` claim or after `max_ttl`
+    seconds, whichever comes first. Once full, the least recently used entry is evicted.
+    """
+
+    # callables invoked with the cache name & whether it was a hit for every lookup,
+    # e.g. to export it as metrics
+    lookup_observers: List[Callable[[str, bool], None]] = []
+
+    def __init__(
+        self, name: str = "xsuaa_security_context", max_size: int = 1024, max_ttl: float = 300
+    ):
+        self.name = name
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, SecurityContextCacheEntry] = OrderedDict()
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.max_size = app.config.get("AUTH_XSUAA_CACHE_MAX_SIZE", self.max_size)
+        self.max_ttl = app.config.get("AUTH_XSUAA_CACHE_MAX_TTL", self.max_ttl)
+        self.clear()
+
+    @staticmethod
+    def _key(access_token: str) -> str:
+        return hashlib.sha256(access_token.encode("utf-8")).hexdigest()
+
+    def get(self, access_token: str) -> Optional[SecurityContextCacheEntry]:
+        """
+        Returns the cached entry for the token if present and not yet expired
+        """
+        key = self._key(access_token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.expires_at <= time.time():
+                self._entries.pop(key, None)
+                self.misses += 1
+                entry = None
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        for observer in self.lookup_observers:
+            observer(self.name, entry is not None)
+        return entry
+
+    def set(
+        self,
+        access_token: str,
+        security_context: "xssec.SecurityContextXSUAA",
+        xsappname: Optional[str] = None,
+    ) -> SecurityContextCacheEntry:
+        """
+        Caches the validated security context of the token and precomputes its scopes
+        """
+        claims = get_unverified_claims(access_token)
+        expires_at = time.time() + self.max_ttl
+        if claims.get("exp"):
+            expires_at = min(expires_at, float(claims["exp"]))
+        elif getattr(security_context, "get_expiration_date", None):
+            expiration_date = security_context.get_expiration_date()
+            if expiration_date:
+                expires_at = min(
+                    expires_at,
+                    expiration_date.replace(tzinfo=timezone.utc).timestamp(),
+                )
+
+        entry = SecurityContextCacheEntry(
+            security_context=security_context,
+            scopes=get_scopes_from_claims(claims, xsappname),
+            expires_at=expires_at,
+        )
+
+        if self.max_size <= 0 or self.max_ttl <= 0:
+            return entry
+
+        with self._lock:
+            self._entries[self._key(access_token)] = entry
+            self._entries.move_to_end(self._key(access_token))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def clear(self):
+        """
+        Drops all entries and resets the counters
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the hit/miss counters and the current size of the cache
+        """
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+# process-local cache of validated XSUAA security contexts
+security_context_cache = SecurityContextCache()
+
+
+def get_unverified_claims(access_token: str) -> dict:
+    """
+    Decodes the claims of a JWT without verifying its signature.
+
+    Must only be used for tokens, which are already validated by xssec.
+    """
+    try:
+        return jwt.decode(access_token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return {}
+
+
+def get_scopes_from_claims(claims: dict, xsappname: Optional[str]) -> Optional[FrozenSet[str]]:
+    """
+    Precomputes the set of scopes granted in the `scope` claim of a token.
+
+    Application scopes (`<xsappname>.<scope>`) are additionally added in their
+    `$XSAPPNAME.<scope>` form, so that checks resolve with a single set lookup.
+    Returns `None` if the claims carry no scopes to precompute.
+    """
+    if "scope" not in claims:
+        return None
+
+    scopes = set(claims.get("scope") or [])
+    if xsappname:
+        app_prefix = f"{xsappname}."
+        scopes.update(
+            XSAPPNAME_PREFIX + scope[len(app_prefix) :]
+            for scope in list(scopes)
+            if scope.startswith(app_prefix)
+        )
+    return frozenset(scopes)
 
 
 def get_xsuaauser_from_request(config: Config, request: Request) -> XsuaaUser | None:
@@ -17,6 +184,9 @@ def get_xsuaauser_from_request(config: Config, request: Request) -> XsuaaUser |
     creates an xssec security context using the provided config credentials,
     and returns an `XsuaaUser` instance if successful.
 
+    Validated security contexts are cached per token (see `SecurityContextCache`),
+    so that the signature verification runs once per token instead of once per request.
+
     :param config: Config object containing XSUAA credentials
     :param request: Flask Request object
     :return: `XsuaaUser` instance if token and context are valid, otherwise None
@@ -28,11 +198,17 @@ def get_xsuaauser_from_request(config: Config, request: Request) -> XsuaaUser |
 
     access_token = header_auth[7:]
 
-    xssec_context = xssec.create_security_context(
-        access_token, config.get("AUTH_XSUAA_CRED")
-    )
+    entry = security_context_cache.get(access_token)
+    if entry is None:
+        credentials = config.get("AUTH_XSUAA_CRED")
+        xssec_context = xssec.create_security_context(access_token, credentials)
+        if not xssec_context:
+            return None
+
+        xsappname = credentials.get("xsappname") if isinstance(credentials, dict) else None
+        entry = security_context_cache.set(access_token, xssec_context, xsappname)
 
-    return XsuaaUser(xssec_context) if xssec_context else None
+    return XsuaaUser(entry.security_context, entry.scopes)
 
 
 def get_basicuser_from_request(config: Config, request: Request) -> BasicUser | None:
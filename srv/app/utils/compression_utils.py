@@ -0,0 +1,111 @@
+import gzip
+import logging
+from typing import Optional
+
+import brotli
+from flask import Flask, Response, request
+
+from app.services.cache_service import CacheEntry
+
+log = logging.getLogger("compression")
+
+# media types worth compressing - e.g. images are compressed already
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/plain",
+    "text/html",
+}
+
+
+class ResponseCompressor:
+    """
+    Compresses responses via the best encoding (`br` or `gzip`) accepted by the
+    client, negotiated from the `Accept-Encoding` header.
+
+    Responses are compressed by an `after_request` hook, except for the ones served
+    from the catalog cache, which are compressed via `encode_entry` once per encoding
+    & stored along with the cache entry instead of being compressed per request.
+    """
+
+    # ordered by preference, if the client accepts multiple encodings alike
+    ENCODINGS = ("br", "gzip")
+
+    def __init__(self, min_size: int = 1024, gzip_level: int = 6, brotli_level: int = 5):
+        self.enabled = True
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_level = brotli_level
+
+    def init_app(self, app: Flask):
+        self.enabled = app.config.get("COMPRESSION_ENABLED", self.enabled)
+        self.min_size = app.config.get("COMPRESSION_MIN_SIZE", self.min_size)
+        self.gzip_level = app.config.get("COMPRESSION_GZIP_LEVEL", self.gzip_level)
+        self.brotli_level = app.config.get("COMPRESSION_BROTLI_LEVEL", self.brotli_level)
+        app.after_request(self.compress_response)
+
+    def select_encoding(self, size: int) -> Optional[str]:
+        """
+        Returns the preferred encoding accepted by the client of the current
+        request, or `None` if a payload of `size` bytes is too small to benefit from compression
+        """
+        if not self.enabled or size < self.min_size:
+            return None
+        return request.accept_encodings.best_match(self.ENCODINGS)
+
+    def compress(self, payload: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(payload, mode=brotli.MODE_TEXT, quality=self.brotli_level)
+        # a fixed `mtime` keeps the output deterministic
+        return gzip.compress(payload, compresslevel=self.gzip_level, mtime=0)
+
+    def encode_entry(self, entry: CacheEntry) -> tuple[bytes, Optional[str]]:
+        """
+        Returns the payload of a cache entry in the encoding preferred by the client
+        along with the encoding. Compressed payloads are stored within the entry.
+        """
+        encoding = self.select_encoding(len(entry.payload))
+        if encoding is None:
+            return entry.payload, None
+
+        payload = entry.encoded.get(encoding)
+        if payload is None:
+            # concurrent requests may compress the same entry, storing alike payloads
+            payload = entry.encoded[encoding] = self.compress(entry.payload, encoding)
+        return payload, encoding
+
+    def compress_response(self, response: Response) -> Response:
+        """
+        `after_request` hook compressing eligible responses
+        """
+        if (
+            not self.enabled
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or "no-transform" in response.headers.get("Cache-Control", "")
+        ):
+            return response
+
+        payload = response.get_data()
+        encoding = self.select_encoding(len(payload))
+        if len(payload) >= self.min_size:
+            response.vary.add("Accept-Encoding")
+        if encoding is None:
+            return response
+
+        response.set_data(self.compress(payload, encoding))
+        response.content_encoding = encoding
+        # strong ETags must differ between the representations
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        log.debug(f"Compressed {len(payload)} to {response.content_length} bytes via {encoding}")
+        return response
+
+
+# compressor of the responses of the app
+response_compressor = ResponseCompressor()
@@ -1,10 +1,18 @@
-from typing import TypedDict, Dict, Literal
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional, TypedDict, Dict, Literal
 
-from sqlalchemy import text
+from flask import current_app
+from sqlalchemy import Engine, text
 
 from app import db_manager
+from app.database import REPLICA_BIND_KEY, PoolStatus
 from config import Config
 
+log = logging.getLogger("health-check")
+
 db = db_manager.db
 
 
@@ -16,6 +24,25 @@ class ComponentHealthCheckStatus(TypedDict):
     status: Literal["UP", "DOWN"]
 
 
+class DbHealthCheckStatus(ComponentHealthCheckStatus):
+    """
+    Represents the health check status of the database, including the measured
+    round-trip latency and the time of the check.
+    """
+
+    latency_ms: float
+    checked_at: str
+
+
+class PoolHealthCheckStatus(ComponentHealthCheckStatus):
+    """
+    Represents the health check status of the database connection pools,
+    including their live statistics.
+    """
+
+    details: Dict[str, PoolStatus]
+
+
 class HealthCheckStatus(ComponentHealthCheckStatus):
     """
     Represents the overall health check status of the application,
@@ -30,26 +57,176 @@ def run_health_check(config: Config) -> HealthCheckStatus:
     Run the health check for the application.
 
     Checks the status of various components of the application,
-    such as the database, and returns their health status.
+    such as the database, and returns their health status along with the worst of
+    them as overall status. The database status is taken from the background
+    `DbHealthProber` of the current app if available.
     """
+    prober: Optional[DbHealthProber] = current_app.extensions.get("db_health_prober")
+    components = {
+        "db": prober.get_status() if prober else run_health_check_db(config),
+        "pool": run_health_check_pool(config),
+    }
+    replica_status = prober.get_replica_status() if prober else None
+    if replica_status is not None:
+        components["db_replica"] = replica_status
+
+    down = any(component["status"] == "DOWN" for component in components.values())
+    return HealthCheckStatus(status="DOWN" if down else "UP", components=components)
+
+
+def run_liveness_check() -> ComponentHealthCheckStatus:
+    """
+    Run the liveness check for the application - never touches any dependency,
+    hence reports `UP` as long as the process is able to serve requests.
+    """
+    return ComponentHealthCheckStatus(status="UP")
+
+
+def run_readiness_check() -> HealthCheckStatus:
+    """
+    Run the readiness check for the application, reporting the last result of
+    the background `DbHealthProber` instead of querying the database per request.
+    """
+    db_status = current_app.extensions["db_health_prober"].get_status()
     return HealthCheckStatus(
-        status="UP",
+        status=db_status["status"],
         components={
-            "db": run_health_check_db(config),
+            "db": db_status,
         },
     )
 
 
+###########
+# PROBERS #
+###########
+class DbHealthProber:
+    """
+    Probes the database health from a background thread
+
+    The prober runs `run_health_check_db` every `interval` seconds and keeps the
+    latest result, so that health checks read a cached result instead of taking
+    a pooled connection each time. The background thread is started on first use;
+    until the first probe completed (or if the last result is stale), the database
+    is probed synchronously.
+    """
+
+    def __init__(self, app=None, interval: float = 10):
+        self.interval = interval
+        self.app = None
+        self._status: Optional[DbHealthCheckStatus] = None
+        self._replica_status: Optional[DbHealthCheckStatus] = None
+        self._probed_at = 0.0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get("HEALTH_DB_PROBE_INTERVAL", self.interval)
+        app.extensions["db_health_prober"] = self
+
+    def probe(self) -> DbHealthCheckStatus:
+        """
+        Probes the database (and its read replica, if configured) synchronously
+        and stores the result. Read-only routes fall back to the primary database
+        while the replica is down.
+        """
+        with self.app.app_context():
+            try:
+                status = self._probe_db()
+            finally:
+                db.session.remove()
+
+            replica = db.engines.get(REPLICA_BIND_KEY)
+            if replica is not None:
+                self._replica_status = self._probe_db(replica)
+                db_manager.mark_replica(up=self._replica_status["status"] == "UP")
+
+        self._status, self._probed_at = status, time.monotonic()
+        return status
+
+    def _probe_db(self, engine: Optional[Engine] = None) -> DbHealthCheckStatus:
+        try:
+            return run_health_check_db(self.app.config, engine)
+        except Exception as e:
+            log.error(f"Database health probe failed - {e}")
+            return DbHealthCheckStatus(
+                status="DOWN",
+                latency_ms=-1,
+                checked_at=datetime.now(timezone.utc).isoformat(),
+            )
+
+    def get_status(self) -> DbHealthCheckStatus:
+        """
+        Returns the latest probe result, probing synchronously if there is no
+        recent result (e.g. right after startup)
+        """
+        self.start()
+        if self._status is None or time.monotonic() - self._probed_at > 3 * self.interval:
+            return self.probe()
+        return self._status
+
+    def get_replica_status(self) -> Optional[DbHealthCheckStatus]:
+        """
+        Returns the latest probe result of the read replica, or `None` if no replica
+        is configured
+        """
+        self.get_status()
+        return self._replica_status
+
+    def start(self):
+        """
+        Starts the background probe thread (if not yet running)
+        """
+        if self._thread is not None or self.interval <= 0:
+            return
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="db-health-prober", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self.probe()
+            time.sleep(self.interval)
+
+
 ##############
 # COMPONENTS #
 ##############
-def run_health_check_db(config: Config) -> ComponentHealthCheckStatus:
+def run_health_check_db(config: Config, engine: Optional[Engine] = None) -> DbHealthCheckStatus:
     """
-    Run the health check for the database component
+    Run the health check for the database component - the primary database,
+    unless the `engine` of another bind (e.g. the read replica) is given
     """
     # use SQLite/HANA specific query to check database connectivity
-    statement = "SELECT 1 FROM DUMMY" if config.get("DB_TYPE") == "hana" else "SELECT 1"
+    statement = text("SELECT 1 FROM DUMMY" if config.get("DB_TYPE") == "hana" else "SELECT 1")
+
+    start = time.perf_counter()
+    if engine is None:
+        result = db.session.execute(statement).scalar()
+    else:
+        with engine.connect() as conn:
+            result = conn.execute(statement).scalar()
+    latency_ms = (time.perf_counter() - start) * 1000
 
-    return ComponentHealthCheckStatus(
-        status=("UP" if db.session.execute(text(statement)).scalar() else "DOWN"),
+    return DbHealthCheckStatus(
+        status=("UP" if result else "DOWN"),
+        latency_ms=round(latency_ms, 3),
+        checked_at=datetime.now(timezone.utc).isoformat(),
+    )
+
+
+def run_health_check_pool(config: Config) -> PoolHealthCheckStatus:
+    """
+    Run the health check for the database connection pools, reporting their
+    live statistics (checked out connections, overflow, checkout latencies)
+    """
+    return PoolHealthCheckStatus(
+        status="UP",
+        details=db_manager.get_pool_status(),
     )
@@ -0,0 +1,103 @@
+from decimal import Decimal
+from typing import Any, Literal
+
+import orjson
+from flask import Flask, Response
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+DecimalMode = Literal["string", "number"]
+
+
+def encode_decimal(value: Decimal, mode: DecimalMode):
+    """
+    Converts a `Decimal` into its JSON representation - either a string, which
+    is lossless for any precision, or a number. Numbers are emitted via their
+    shortest round-tripping float representation, which is lossless for the
+    `Numeric(9,2)` prices (less than 16 significant digits).
+    """
+    return float(value) if mode == "number" else str(value)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """
+    Flask's default JSON provider based on the standard library `json` module,
+    encoding `Decimal`s according to the configured `JSON_DECIMAL_MODE`.
+    """
+
+    def __init__(self, app: Flask):
+        super().__init__(app)
+        self.decimal_mode: DecimalMode = app.config.get("JSON_DECIMAL_MODE", "string")
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, Decimal):
+            return encode_decimal(o, self.decimal_mode)
+        return DefaultJSONProvider.default(o)
+
+    def dumpb(self, obj: Any, **kwargs: Any) -> bytes:
+        """
+        Serializes the data as JSON into UTF-8 encoded bytes
+        """
+        return self.dumps(obj, **kwargs).encode("utf-8")
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    JSON provider based on `orjson`, which serializes whole (nested) structures in
+    C and directly into bytes. `datetime`, `date`, `UUID` & dataclasses are encoded
+    natively (dates as ISO 8601), `Decimal`s according to `JSON_DECIMAL_MODE`.
+
+    Unlike Flask's default provider, keys are not sorted unless `sort_keys` is set.
+    """
+
+    sort_keys = False
+    compact: bool | None = None
+    mimetype = "application/json"
+
+    def __init__(self, app: Flask):
+        super().__init__(app)
+        self.decimal_mode: DecimalMode = app.config.get("JSON_DECIMAL_MODE", "string")
+
+    def default(self, o: Any) -> Any:
+        if isinstance(o, Decimal):
+            return encode_decimal(o, self.decimal_mode)
+        if hasattr(o, "__html__"):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+    def get_options(self) -> int:
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumpb(self, obj: Any, **kwargs: Any) -> bytes:
+        """
+        Serializes the data as JSON into UTF-8 encoded bytes
+        """
+        return orjson.dumps(obj, default=self.default, option=self.get_options())
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return self.dumpb(obj).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumpb(obj) + b"\n", mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {
+    "orjson": OrjsonProvider,
+    "json": StdlibJSONProvider,
+}
+
+
+def init_app(app: Flask):
+    """
+    Replaces the JSON provider of the app (`app.json`) by the configured `JSON_PROVIDER`,
+    used by `jsonify` and the (cached) JSON responses of the API.
+    """
+    app.json = JSON_PROVIDERS[app.config.get("JSON_PROVIDER", "orjson")](app)
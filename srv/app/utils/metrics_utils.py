@@ -0,0 +1,276 @@
+import hashlib
+import os
+import re
+import time
+from typing import Optional
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from app.database import DatabaseManager, InstrumentedQueuePool
+from app.services.cache_service import ResponseCache
+from app.utils.admission_utils import AdmissionController
+from app.utils.auth_utils import SecurityContextCache
+
+METRICS_NAMESPACE = "bookstore"
+
+# seconds between refreshes of the gauges derived from process-local state
+STATE_GAUGES_REFRESH_INTERVAL = 1.0
+
+###############
+### METRICS ###
+###############
+
+# NOTE: gauges define a `multiprocess_mode`, so that they are aggregated across
+# gunicorn workers when running in multiprocess mode (see `gunicorn.conf.py`).
+# Events (e.g. cache hits) are counted via counters as they happen, so that their
+# totals survive worker restarts - gauges only reflect the current state.
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latency of HTTP requests per endpoint",
+    ["endpoint", "method", "status"],
+    namespace=METRICS_NAMESPACE,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "Number of HTTP requests currently being served per endpoint",
+    ["endpoint"],
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livesum",
+)
+SQL_DURATION = Histogram(
+    "sql_statement_duration_seconds",
+    "Execution time of SQL statements per statement fingerprint",
+    ["operation", "fingerprint"],
+    namespace=METRICS_NAMESPACE,
+)
+SQL_STATEMENTS = Counter(
+    "sql_statements",
+    "Number of executed SQL statements per statement fingerprint",
+    ["operation", "fingerprint"],
+    namespace=METRICS_NAMESPACE,
+)
+AUTH_DURATION = Histogram(
+    "auth_duration_seconds",
+    "Time spent loading the user from the request per authentication loader",
+    ["loader", "outcome"],
+    namespace=METRICS_NAMESPACE,
+)
+DB_POOL_CHECKOUT_DURATION = Histogram(
+    "db_pool_checkout_duration_seconds",
+    "Latency of DB connection pool checkouts",
+    namespace=METRICS_NAMESPACE,
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Number of DB connections per pool & state",
+    ["pool", "state"],
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livesum",
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Number of DB connection pool checkouts, which timed out",
+    namespace=METRICS_NAMESPACE,
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests",
+    "Number of cache lookups per cache & result",
+    ["cache", "result"],
+    namespace=METRICS_NAMESPACE,
+)
+
+HTTP_REQUESTS_SHED = Counter(
+    "http_requests_shed",
+    "Number of API requests shed by the admission control with a 503 per reason",
+    ["reason"],
+    namespace=METRICS_NAMESPACE,
+)
+ADMISSION_REQUESTS = Counter(
+    "admission_requests",
+    "Number of API requests admitted right away (`immediate`) or after waiting for a slot (`queued`)",
+    ["admission"],
+    namespace=METRICS_NAMESPACE,
+)
+ADMISSION_SLOTS = Gauge(
+    "admission_slots",
+    "Number of API requests currently admitted (`active`) or waiting for a slot (`queued`)",
+    ["state"],
+    namespace=METRICS_NAMESPACE,
+    multiprocess_mode="livesum",
+)
+
+
+###############
+### HELPERS ###
+###############
+
+_NUMBER_LITERAL = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Normalizes a SQL statement, so that statements differing only in literal values,
+    the length of `IN (...)` lists or whitespace share the same normalized form.
+    """
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = re.sub(r"\?|:\w+|%\(\w+\)s", "?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def fingerprint_statement(statement: str) -> str:
+    """
+    Returns a short, stable fingerprint of the normalized SQL statement
+    """
+    normalized = normalize_statement(statement)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+def get_statement_operation(statement: str) -> str:
+    """
+    Returns the leading SQL keyword (e.g. `SELECT`) of the statement
+    """
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+
+
+def observe_auth(loader: str, user, start: float):
+    """
+    Records the duration of an authentication loader started at `start`
+    (`time.perf_counter()`) along with its outcome
+    """
+    outcome = "success" if user is not None else "failure"
+    AUTH_DURATION.labels(loader, outcome).observe(time.perf_counter() - start)
+
+
+##############
+### EVENTS ###
+##############
+
+
+def observe_statement(conn, statement, parameters, executemany, duration):
+    labels = (get_statement_operation(statement), fingerprint_statement(statement))
+    SQL_DURATION.labels(*labels).observe(duration)
+    SQL_STATEMENTS.labels(*labels).inc()
+
+
+def observe_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_shed(reason: str):
+    HTTP_REQUESTS_SHED.labels(reason).inc()
+
+
+def observe_admission(queued: bool):
+    ADMISSION_REQUESTS.labels("queued" if queued else "immediate").inc()
+
+
+def before_request():
+    g.metrics_request_start = time.perf_counter()
+    g.metrics_endpoint = request.endpoint or "unknown"
+    REQUESTS_IN_FLIGHT.labels(g.metrics_endpoint).inc()
+
+
+def after_request(response):
+    start: Optional[float] = g.get("metrics_request_start")
+    if start is not None:
+        REQUEST_DURATION.labels(
+            g.metrics_endpoint, request.method, str(response.status_code)
+        ).observe(time.perf_counter() - start)
+    return response
+
+
+def teardown_request(exc):
+    if g.get("metrics_request_start") is not None:
+        REQUESTS_IN_FLIGHT.labels(g.metrics_endpoint).dec()
+        refresh_state_gauges()
+
+
+###############
+### MANAGER ###
+###############
+
+
+_state_gauges_refreshed_at = 0.0
+
+
+def refresh_state_gauges(force: bool = False):
+    """
+    Copies process-local state (connection pools, admission control) into the gauges.
+    Throttled to once per `STATE_GAUGES_REFRESH_INTERVAL`, since every worker has
+    to publish its own state for the multiprocess aggregation.
+    """
+    global _state_gauges_refreshed_at
+
+    now = time.monotonic()
+    if not force and now - _state_gauges_refreshed_at < STATE_GAUGES_REFRESH_INTERVAL:
+        return
+    _state_gauges_refreshed_at = now
+
+    from app import db_manager
+    from app.utils.admission_utils import admission_controller
+
+    for pool, status in db_manager.get_pool_status().items():
+        DB_POOL_CONNECTIONS.labels(pool, "checked_out").set(status["checked_out"])
+        DB_POOL_CONNECTIONS.labels(pool, "checked_in").set(status["checked_in"])
+        DB_POOL_CONNECTIONS.labels(pool, "overflow").set(status["overflow"])
+
+    admission = admission_controller.get_status()
+    ADMISSION_SLOTS.labels("active").set(admission["active"])
+    ADMISSION_SLOTS.labels("queued").set(admission["queued"])
+
+
+def init_metrics(app: Flask):
+    """
+    Wires the metrics instrumentation into the Flask app, the statements executed
+    on any SQLAlchemy engine, the connection pools, the caches & the admission control
+    """
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.teardown_request(teardown_request)
+
+    if observe_statement not in DatabaseManager.statement_observers:
+        DatabaseManager.statement_observers.append(observe_statement)
+
+    if DB_POOL_CHECKOUT_DURATION.observe not in InstrumentedQueuePool.checkout_observers:
+        InstrumentedQueuePool.checkout_observers.append(DB_POOL_CHECKOUT_DURATION.observe)
+    if DB_POOL_TIMEOUTS.inc not in InstrumentedQueuePool.timeout_observers:
+        InstrumentedQueuePool.timeout_observers.append(DB_POOL_TIMEOUTS.inc)
+
+    for observers, observer in (
+        (ResponseCache.lookup_observers, observe_cache_lookup),
+        (SecurityContextCache.lookup_observers, observe_cache_lookup),
+        (AdmissionController.shed_observers, observe_shed),
+        (AdmissionController.admit_observers, observe_admission),
+    ):
+        if observer not in observers:
+            observers.append(observer)
+
+
+def generate_metrics() -> Response:
+    """
+    Renders all metrics in the Prometheus text format. In multiprocess mode
+    (`PROMETHEUS_MULTIPROC_DIR` is set), metrics of all gunicorn workers are aggregated.
+    """
+    refresh_state_gauges(force=True)
+
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,353 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import List, Literal, Optional, Tuple, TypedDict
+
+from flask import Flask, g, request
+from flask_login import login_required
+from werkzeug import exceptions
+
+from app.utils.auth_utils import roles_required
+from config import PROFILING_SCOPE
+
+log = logging.getLogger("request-profiler")
+
+ProfileFormat = Literal["collapsed", "pstats"]
+
+# IDs are prefixed by their creation time (milliseconds since the epoch)
+PROFILE_ID_PATTERN = re.compile(r"^\d{13}-[0-9a-f]{8}$")
+
+# keys `pstats` profiles can be sorted by, e.g. `cumulative` or `tottime`
+PSTATS_SORT_KEYS = frozenset(pstats.Stats.sort_arg_dict_default)
+
+# held while a request is profiled via `cProfile` - only a single profiler may be
+# active per process (Python 3.12+ refuses a second one), which traces all threads
+_pstats_lock = threading.Lock()
+
+
+class ProfileInfo(TypedDict):
+    """
+    Represents the metadata of a stored request profile.
+    """
+
+    id: str
+    format: ProfileFormat
+    method: str
+    path: str
+    endpoint: Optional[str]
+    status: int
+    duration_ms: float
+    created_at: float  # seconds since the epoch
+
+
+@lru_cache(maxsize=4096)
+def shorten_filename(filename: str) -> str:
+    """
+    Returns the filename relative to its (longest) `sys.path` entry, e.g.
+    `flask/app.py` instead of the absolute path within `site-packages`
+    """
+    prefixes = [path for path in sys.path if path and filename.startswith(path + os.sep)]
+    if not prefixes:
+        return filename
+    return filename[len(max(prefixes, key=len)) + 1 :]
+
+
+def collapse_stack(frame) -> str:
+    """
+    Returns the stack of `frame` in the collapsed format of flame graphs - the
+    frames from the root to the leaf, separated by `;`
+    """
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_name} ({shorten_filename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """
+    Sampling profiler of a single thread, recording its stack every `interval` seconds
+    from a background thread - the profiled thread runs at full speed in between.
+
+    Provides `enable` & `disable` like `cProfile.Profile`, the samples are aggregated
+    as collapsed stacks (see `to_collapsed`), as consumed by `flamegraph.pl` or
+    speedscope.
+
+    The sampling thread needs the GIL to record a sample, which a busy thread only
+    hands over every switch interval (5ms by default) - hence the switch interval
+    is lowered to the sampling interval while any sampler is active.
+    """
+
+    _active = 0
+    _switch_interval = None
+    _lock = threading.Lock()
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._enabled = False
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.sample, name="stack-sampler", daemon=True)
+
+    def enable(self):
+        with StackSampler._lock:
+            if StackSampler._active == 0:
+                StackSampler._switch_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(self.interval, StackSampler._switch_interval))
+            StackSampler._active += 1
+        self._enabled = True
+        try:
+            self._thread.start()
+        except BaseException:
+            self._restore_switch_interval()
+            raise
+
+    def disable(self):
+        try:
+            self._stopped.set()
+            if self._thread.is_alive():
+                self._thread.join()
+        finally:
+            self._restore_switch_interval()
+
+    def _restore_switch_interval(self):
+        with StackSampler._lock:
+            if not self._enabled:
+                return
+            self._enabled = False
+            StackSampler._active -= 1
+            if StackSampler._active == 0:
+                sys.setswitchinterval(StackSampler._switch_interval)
+
+    def sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse_stack(frame)] += 1
+
+    def to_collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def render_pstats(path: str, sort: str = "cumulative", limit: int = 50) -> str:
+    """
+    Returns the `limit` top functions of a stored `pstats` profile by `sort` as text
+    """
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+class RequestProfiler:
+    """
+    On-demand profiling of single requests
+
+    Requests carrying the `X-Profile` header run under a profiler, if the caller
+    holds the profiling scope - `collapsed` samples the stack of the request thread
+    (flame graph compatible), `pstats` traces every call via `cProfile`. Profiles are
+    stored in `directory` (shared by the workers of an instance), of which the
+    `max_profiles` latest are kept, and are referred to by the `X-Profile-Id` header
+    of the response.
+
+    The hooks are registered before the other request hooks of the app, so that
+    the profile covers them. Unprofiled requests merely look up the header.
+
+    Only a single request per process is profiled via `pstats` at a time, further
+    ones are answered with `503 Service Unavailable`.
+    """
+
+    HEADER = "X-Profile"
+    FORMATS = ("collapsed", "pstats")
+    EXTENSIONS = {"collapsed": "txt", "pstats": "pstats"}
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_profiles: int = 50,
+        sample_interval: float = 0.001,
+    ):
+        self.enabled = True
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask):
+        self.enabled = app.config.get("PROFILING_ENABLED", self.enabled)
+        self.directory = app.config.get("PROFILING_DIR", self.directory)
+        self.max_profiles = app.config.get("PROFILING_MAX_PROFILES", self.max_profiles)
+        self.sample_interval = app.config.get("PROFILING_SAMPLE_INTERVAL", self.sample_interval)
+        if not self.enabled:
+            return
+
+        log.info(f"Request profiling via `{self.HEADER}` enabled - storing profiles in {self.directory}")
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.teardown_request(self.teardown_request)
+
+    def before_request(self):
+        """
+        `before_request` hook starting the profiler of requests asking for it
+        """
+        profile_format = request.headers.get(self.HEADER)
+        if profile_format is not None:
+            return self.start(profile_format.strip().lower() or self.FORMATS[0])
+
+    @login_required
+    @roles_required([PROFILING_SCOPE])
+    def start(self, profile_format: str):
+        if profile_format not in self.FORMATS:
+            raise exceptions.BadRequest(
+                description=f"Header '{self.HEADER}' must be one of {list(self.FORMATS)} - '{profile_format}'"
+            )
+
+        if profile_format == "pstats":
+            if not _pstats_lock.acquire(blocking=False):
+                raise self.busy()
+            try:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            except ValueError:
+                # another profiler (e.g. a debugger or coverage) is active
+                _pstats_lock.release()
+                raise self.busy()
+        else:
+            profiler = StackSampler(threading.get_ident(), self.sample_interval)
+            profiler.enable()
+        g.request_profile = (profile_format, profiler, time.perf_counter())
+
+    def busy(self) -> exceptions.ServiceUnavailable:
+        return exceptions.ServiceUnavailable(
+            description="Another request is being profiled via 'pstats', please retry later",
+            retry_after=1,
+        )
+
+    def stop(self, profile_format: str, profiler):
+        try:
+            profiler.disable()
+        finally:
+            if profile_format == "pstats":
+                _pstats_lock.release()
+
+    def after_request(self, response):
+        """
+        `after_request` hook stopping the profiler & storing the profile of the request
+        """
+        active = g.pop("request_profile", None)
+        if active is None:
+            return response
+
+        profile_format, profiler, start = active
+        self.stop(profile_format, profiler)
+        info = ProfileInfo(
+            id=f"{time.time_ns() // 1_000_000:013d}-{secrets.token_hex(4)}",
+            format=profile_format,
+            method=request.method,
+            path=request.full_path.rstrip("?"),
+            endpoint=request.endpoint,
+            status=response.status_code,
+            duration_ms=round((time.perf_counter() - start) * 1000, 2),
+            created_at=time.time(),
+        )
+        try:
+            self.save(info, profiler)
+        except OSError as e:
+            log.error(f"Failed to store profile of {info['method']} {info['path']} - {e}")
+            return response
+
+        log.info(f"Profiled {info['method']} {info['path']} in {info['duration_ms']}ms - {info['id']}")
+        response.headers["X-Profile-Id"] = info["id"]
+        return response
+
+    def teardown_request(self, exception=None):
+        """
+        `teardown_request` hook stopping the profiler of requests failed before
+        their response got created (if any)
+        """
+        active = g.pop("request_profile", None)
+        if active is not None:
+            self.stop(*active[:2])
+
+    def get_path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{extension}")
+
+    def save(self, info: ProfileInfo, profiler):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.get_path(info["id"], self.EXTENSIONS[info["format"]])
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(path)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(profiler.to_collapsed())
+
+        # the metadata is written last, so that only complete profiles are listed
+        with open(self.get_path(info["id"], "json"), "w", encoding="utf-8") as f:
+            json.dump(info, f)
+        self.prune()
+
+    def prune(self):
+        """
+        Deletes the oldest profiles beyond `max_profiles`
+        """
+        with self._lock:
+            for info in self.list_profiles()[self.max_profiles :]:
+                for extension in ("json", self.EXTENSIONS[info["format"]]):
+                    try:
+                        os.remove(self.get_path(info["id"], extension))
+                    except FileNotFoundError:
+                        pass  # pruned by another worker
+
+    def list_profiles(self) -> List[ProfileInfo]:
+        """
+        Returns the metadata of the stored profiles, latest first
+        """
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+
+        profiles = []
+        for name in names:
+            profile_id, extension = os.path.splitext(name)
+            if extension == ".json" and PROFILE_ID_PATTERN.match(profile_id):
+                try:
+                    with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                        profiles.append(json.load(f))
+                except (OSError, ValueError):
+                    pass  # pruned or being written by another worker
+        # IDs created within the same millisecond are ordered by creation time
+        return sorted(profiles, key=lambda info: info["created_at"], reverse=True)
+
+    def get_profile(self, profile_id: str) -> Tuple[ProfileInfo, str]:
+        """
+        Returns the metadata & the path of a stored profile
+
+        :raises NotFound: if there is no profile of the ID
+        """
+        if PROFILE_ID_PATTERN.match(profile_id):
+            try:
+                with open(self.get_path(profile_id, "json"), encoding="utf-8") as f:
+                    info: ProfileInfo = json.load(f)
+                path = self.get_path(profile_id, self.EXTENSIONS[info["format"]])
+                if os.path.exists(path):
+                    return info, path
+            except FileNotFoundError:
+                pass
+        raise exceptions.NotFound(description=f"Profile not found - {profile_id}")
+
+
+# on-demand request profiling of this worker process
+request_profiler = RequestProfiler()
@@ -0,0 +1,191 @@
+import logging
+import time
+from functools import wraps
+from typing import Optional
+
+from flask import Flask, current_app, g, has_app_context, has_request_context, request
+
+from app.database import DatabaseManager
+
+log = logging.getLogger("sql-query")
+
+# statements, for which a query plan can be captured
+EXPLAINABLE_OPERATIONS = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised (if enforced) when a request executes more SQL statements than
+    declared via `query_budget` for its route.
+    """
+
+
+def query_budget(max_queries: int):
+    """
+    Route decorator declaring the maximum number of SQL statements a request to
+    the route may execute. May be combined with other decorators in any order, as
+    the budget is looked up along the wrapped functions (see `get_query_budget`).
+
+    Exceeding the budget is logged, or raises `QueryBudgetExceeded` if
+    `SQL_QUERY_BUDGET_ENFORCE` is set (e.g. in tests).
+
+    :param max_queries: Maximum number of SQL statements per request
+    """
+
+    def decorated_function(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            return f(*args, **kwargs)
+
+        wrapper.query_budget = max_queries
+        return wrapper
+
+    return decorated_function
+
+
+def get_query_budget(view) -> Optional[int]:
+    """
+    Returns the query budget of a view function declared via `query_budget`, if any,
+    following the chain of `__wrapped__` functions of decorators wrapping it
+    """
+    while view is not None:
+        budget = view.__dict__.get("query_budget")
+        if budget is not None:
+            return budget
+        view = getattr(view, "__wrapped__", None)
+    return None
+
+
+def get_query_stats() -> tuple[int, float]:
+    """
+    Returns the number of SQL statements & total DB time (in seconds) of the current request
+    """
+    return g.get("sql_query_count", 0), g.get("sql_query_time", 0.0)
+
+
+###############
+### EXPLAIN ###
+###############
+
+
+def explain_statement(dbapi_connection, dialect_name: str, statement: str, parameters) -> Optional[str]:
+    """
+    Captures the query plan of the statement via `EXPLAIN QUERY PLAN` (SQLite)
+    or `EXPLAIN PLAN` (HANA). Runs on a separate raw DBAPI cursor, so that
+    neither the original cursor nor any SQLAlchemy event is affected.
+
+    :return: The query plan as text, or None if it could not be captured
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        if dialect_name == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+            return "\n".join(
+                f"{row[0]}|{row[1]}|{row[3]}" for row in cursor.fetchall()
+            )
+        elif dialect_name == "hana":
+            statement_name = f"slow_query_{time.monotonic_ns()}"
+            cursor.execute(
+                f"EXPLAIN PLAN SET STATEMENT_NAME = '{statement_name}' FOR {statement}",
+                parameters or (),
+            )
+            cursor.execute(
+                "SELECT OPERATOR_NAME, OPERATOR_DETAILS, TABLE_NAME, ESTIMATED_OUTPUT_ROW_COUNT "
+                "FROM EXPLAIN_PLAN_TABLE WHERE STATEMENT_NAME = ? ORDER BY OPERATOR_ID",
+                (statement_name,),
+            )
+            plan = "\n".join("|".join(str(col) for col in row) for row in cursor.fetchall())
+            cursor.execute(
+                "DELETE FROM EXPLAIN_PLAN_TABLE WHERE STATEMENT_NAME = ?", (statement_name,)
+            )
+            return plan
+        return None
+    except Exception as e:
+        log.debug(f"Failed to capture query plan - {e}")
+        return None
+    finally:
+        cursor.close()
+
+
+##############
+### EVENTS ###
+##############
+
+
+def observe_statement(conn, statement, parameters, executemany, duration):
+    """
+    Statement observer (see `DatabaseManager.statement_observers`) accounting the
+    statements per request & logging slow ones along with their query plan
+    """
+    if has_request_context():
+        g.sql_query_count = g.get("sql_query_count", 0) + 1
+        g.sql_query_time = g.get("sql_query_time", 0.0) + duration
+
+    if not has_app_context():
+        return
+
+    threshold_ms = current_app.config.get("SQL_SLOW_QUERY_THRESHOLD_MS")
+    if threshold_ms is None or duration * 1000 < threshold_ms:
+        return
+
+    plan = None
+    if (
+        current_app.config.get("SQL_EXPLAIN_SLOW_QUERIES")
+        and not executemany
+        and statement.lstrip().upper().startswith(EXPLAINABLE_OPERATIONS)
+    ):
+        plan = explain_statement(
+            conn.connection.dbapi_connection, conn.dialect.name, statement, parameters
+        )
+
+    if executemany:
+        # only log the first parameter sets of bulk statements
+        parameters = (
+            f"{list(parameters[:3])} ... ({len(parameters)} parameter sets)"
+            if len(parameters) > 3
+            else parameters
+        )
+
+    log.warning(
+        f"Slow SQL statement took {duration * 1000:.1f}ms "
+        f"(threshold {threshold_ms}ms): {statement} - parameters: {parameters}"
+        + (f"\nQuery plan:\n{plan}" if plan else "")
+    )
+
+
+def before_request():
+    # the app context (holding `g`) may outlive a request, e.g. in tests
+    g.sql_query_count, g.sql_query_time = 0, 0.0
+
+
+def after_request(response):
+    count, duration = get_query_stats()
+
+    if current_app.config.get("SQL_SERVER_TIMING_ENABLED"):
+        response.headers.add(
+            "Server-Timing", f'db;dur={duration * 1000:.3f};desc="{count} queries"'
+        )
+
+    budget = get_query_budget(current_app.view_functions.get(request.endpoint))
+    if budget is not None and count > budget:
+        message = (
+            f"Route '{request.endpoint}' executed {count} SQL statements, "
+            f"exceeding its query budget of {budget}"
+        )
+        if current_app.config.get("SQL_QUERY_BUDGET_ENFORCE"):
+            raise QueryBudgetExceeded(message)
+        log.warning(message)
+
+    return response
+
+
+def init_query_instrumentation(app: Flask):
+    """
+    Wires the per-request query accounting & slow query log into the Flask app
+    & the statements executed on any SQLAlchemy engine
+    """
+    app.before_request(before_request)
+    app.after_request(after_request)
+
+    if observe_statement not in DatabaseManager.statement_observers:
+        DatabaseManager.statement_observers.append(observe_statement)
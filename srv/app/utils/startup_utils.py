@@ -0,0 +1,135 @@
+import importlib.util
+import json
+import logging
+import subprocess
+import sys
+import time
+from types import ModuleType
+from typing import List, Optional, TypedDict
+
+log = logging.getLogger("startup")
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Imports a module lazily - the module is registered right away, but only executed
+    on first attribute access. Keeps heavy modules (e.g. `sap.xssec`) off the import
+    path of configurations never using them. Already imported modules are returned as is.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class StartupPhase(TypedDict):
+    """
+    Represents the duration of a single phase of the app startup.
+    """
+
+    name: str
+    ms: float
+
+
+class StartupReport(TypedDict):
+    """
+    Represents the timings of the app startup - the phases of `create_app` and,
+    if measured in a fresh interpreter, the import time of the slowest modules.
+    """
+
+    total_ms: float
+    phases: List[StartupPhase]
+    imports: List[dict]
+
+
+class StartupTimer:
+    """
+    Measures the phases of the app startup - every `mark` ends the current
+    phase & starts the next one
+    """
+
+    def __init__(self):
+        self.started_at = self._last = time.perf_counter()
+        self.phases: List[StartupPhase] = []
+
+    def mark(self, name: str):
+        now = time.perf_counter()
+        self.phases.append(StartupPhase(name=name, ms=round((now - self._last) * 1000, 2)))
+        self._last = now
+
+    def get_report(self) -> StartupReport:
+        return StartupReport(
+            total_ms=round(sum(phase["ms"] for phase in self.phases), 2),
+            phases=self.phases,
+            imports=[],
+        )
+
+    def log_report(self):
+        report = self.get_report()
+        phases = ", ".join(f"{phase['name']}={phase['ms']:.1f}ms" for phase in report["phases"])
+        log.info(f"Created app in {report['total_ms']:.1f}ms ({phases})")
+
+
+def parse_import_times(output: str, top: Optional[int] = None) -> List[dict]:
+    """
+    Parses the output of `python -X importtime` into the modules & their self and
+    cumulative import time, ordered by the cumulative import time (slowest first)
+    """
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append(
+            {
+                "module": name.strip(),
+                "self_ms": round(int(self_us) / 1000, 2),
+                "cumulative_ms": round(int(cumulative_us) / 1000, 2),
+            }
+        )
+    modules.sort(key=lambda module: module["cumulative_ms"], reverse=True)
+    return modules[:top] if top else modules
+
+
+# creates the app in a fresh interpreter & prints its startup report
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+report = app.extensions["startup_report"]
+report["phases"].insert(0, {"name": "import", "ms": round((imported - start) * 1000, 2)})
+report["total_ms"] = round((time.perf_counter() - start) * 1000, 2)
+print(json.dumps(report))
+"""
+
+
+def measure_startup(top: int = 20, cwd: Optional[str] = None) -> StartupReport:
+    """
+    Measures the startup of the app in a fresh interpreter (`python -X importtime`),
+    i.e. the time to import the app package and the phases of `create_app`, along
+    with the `top` slowest module imports.
+
+    :raises RuntimeError: if the app fails to start
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"App failed to start - {result.stderr.strip()[-2000:]}")
+
+    report: StartupReport = json.loads(result.stdout.strip().splitlines()[-1])
+    report["imports"] = parse_import_times(result.stderr, top)
+    return report
@@ -0,0 +1,178 @@
+import logging
+import re
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+try:
+    from sap.xssec import key_cache
+    from sap.xssec.security_context_xsuaa import SecurityContextXSUAA
+except ImportError:  # moved by another `sap-xssec` version, see `supports_key_cache`
+    key_cache = SecurityContextXSUAA = None
+
+log = logging.getLogger("xsuaa-key-refresher")
+
+
+def supports_key_cache() -> bool:
+    """
+    Checks whether the installed `sap-xssec` provides the key cache internals, which
+    `VerificationKeyRefresher` seeds - these are not part of its public API, hence
+    `sap-xssec` is pinned in `pyproject.toml`.
+    """
+    cache = getattr(SecurityContextXSUAA, "verificationKeyCache", None)
+    return (
+        hasattr(key_cache, "lock")
+        and hasattr(key_cache, "CacheEntry")
+        and isinstance(getattr(cache, "_cache", None), dict)
+        and callable(getattr(cache, "_create_cache_key", None))
+    )
+
+
+def get_jkus(credentials: dict) -> List[str]:
+    """
+    Returns the `jku` URLs, which `xssec` derives for tokens issued by the XSUAA
+    instance of the given credentials - with and without the zone id of the instance.
+    """
+    uaa_domain = credentials.get("uaadomain") or credentials.get("url")
+    if not uaa_domain:
+        return []
+
+    uaa_domain = re.sub(r"^https://", "", uaa_domain)
+    jkus = [f"https://{uaa_domain}/token_keys"]
+
+    zone_id = credentials.get("identityzoneid") or credentials.get("zoneid")
+    if zone_id:
+        jkus.append(f"https://{uaa_domain}/token_keys?zid={zone_id}")
+    return jkus
+
+
+class VerificationKeyRefresher:
+    """
+    Prefetches & periodically refreshes the XSUAA token verification keys
+
+    `xssec` fetches the verification keys synchronously within
+    `create_security_context` whenever its key cache misses or an entry expired
+    (after 15 minutes), stalling the request. This refresher warms the `xssec`
+    key cache on startup and re-fetches the keys from a background thread before
+    the entries expire, so that request threads never block on key retrieval.
+
+    If fetching fails, the last known good keys are kept in the cache. If the
+    installed `xssec` lacks the key cache internals (see `supports_key_cache`), the
+    prefetch is skipped and `xssec` fetches the keys on demand.
+    """
+
+    def __init__(self, refresh_interval: float = 600, timeout: float = 2):
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self.credentials: dict = {}
+        self.token_keys_url: Optional[str] = None
+        self.last_refresh_at: Optional[float] = None
+        self._keys: Dict[str, Dict[str, str]] = {}  # jku -> kid -> key
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def init_app(self, app):
+        self.credentials = app.config.get("AUTH_XSUAA_CRED") or {}
+        self.refresh_interval = app.config.get(
+            "AUTH_XSUAA_KEY_REFRESH_INTERVAL", self.refresh_interval
+        )
+        self.token_keys_url = app.config.get("AUTH_XSUAA_TOKEN_KEYS_URL")
+
+        if not get_jkus(self.credentials):
+            log.warning("No XSUAA domain configured. Skipping verification key prefetch.")
+            return
+        if not supports_key_cache():
+            log.warning(
+                "Unsupported `sap-xssec` key cache. Skipping verification key prefetch."
+            )
+            return
+
+        self.refresh()
+        self.start()
+
+    def start(self):
+        """
+        Starts the background refresh thread (if not yet running)
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="xsuaa-key-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background refresh thread
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def refresh(self) -> bool:
+        """
+        Fetches the verification keys for all `jku`s and stores them in the `xssec` key cache.
+
+        :return: True if all keys were fetched successfully, False otherwise
+        """
+        success = True
+        for jku in get_jkus(self.credentials):
+            try:
+                keys = self._fetch_keys(self.token_keys_url or jku)
+                self._keys[jku] = keys
+                log.info(f"Refreshed {len(keys)} verification keys for '{jku}'")
+            except (httpx.HTTPError, ValueError) as e:
+                success = False
+                log.warning(
+                    f"Failed to refresh verification keys for '{jku}' - {e}. "
+                    "Keeping last known good keys."
+                )
+
+            # (re-)stamp the keys in the cache, so they are never treated as expired
+            self._store_keys(jku, self._keys.get(jku, {}))
+
+        self.last_refresh_at = time.time()
+        return success
+
+    def _fetch_keys(self, url: str) -> Dict[str, str]:
+        response = httpx.get(url, timeout=self.timeout)
+        response.raise_for_status()
+
+        keys = {
+            key["kid"]: key["value"]
+            for key in response.json().get("keys", [])
+            if key.get("kid") and key.get("value")
+        }
+        if not keys:
+            raise ValueError(f"No verification keys returned from '{url}'")
+        return keys
+
+    @staticmethod
+    def _store_keys(jku: str, keys: Dict[str, str]):
+        # `xssec` does not offer a public API to seed its key cache, hence the
+        # entries are written the same way `KeyCache.load_key` does
+        cache = SecurityContextXSUAA.verificationKeyCache
+        with key_cache.lock:
+            for kid, key in keys.items():
+                cache._cache[cache._create_cache_key(jku, kid)] = key_cache.CacheEntry(
+                    key, time.time()
+                )
+
+    def get_keys(self, jku: str) -> Dict[str, str]:
+        """
+        Returns the last known good keys (`kid` -> key) of the `jku`
+        """
+        return dict(self._keys.get(jku, {}))
+
+
+# process-local refresher of XSUAA verification keys
+verification_key_refresher = VerificationKeyRefresher()
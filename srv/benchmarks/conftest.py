@@ -0,0 +1,95 @@
+"""
+Fixtures of the micro-benchmarks, run against a synthetic database of
+`BENCHMARK_SCALE` (default `10k`), which is generated on first use:
+
+    # in `srv` folder
+    BENCHMARK_SCALE=100k python -m pytest benchmarks --benchmark-autosave
+"""
+
+import os
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+BENCHMARK_SCALE = os.environ.get("BENCHMARK_SCALE", "10k").lower()
+BENCHMARK_DB_FILE = os.path.join(
+    os.path.dirname(__file__), "data", f"bookstore-{BENCHMARK_SCALE}.sqlite3"
+)
+
+# must be set before `config` is imported (also via `benchmarks.generate_data`)
+os.environ["DB_FILE"] = BENCHMARK_DB_FILE
+
+from benchmarks.generate_data import SCALES, generate  # noqa: E402
+
+# stand-in XSUAA credentials - tokens are signed locally & verified offline
+XSUAA_KID = "benchmark-key"
+XSUAA_CREDENTIALS = {
+    "clientid": "sb-bookstore!t1",
+    "clientsecret": "benchmark",
+    "xsappname": "bookstore!t1",
+    "identityzoneid": "benchmark-zone",
+    "uaadomain": "uaa.benchmark.local",
+    "url": "https://benchmark.uaa.benchmark.local",
+}
+
+
+def pytest_configure(config):
+    if not os.path.exists(BENCHMARK_DB_FILE):
+        generate(BENCHMARK_DB_FILE, SCALES[BENCHMARK_SCALE])
+    config.addinivalue_line("markers", "benchmark: micro-benchmark")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+
+    app = create_app()
+    # benchmarks must neither log nor fail on purpose-built slow paths
+    app.config["SQL_SLOW_QUERY_THRESHOLD_MS"] = None
+    app.config["SQL_QUERY_BUDGET_ENFORCE"] = False
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def xsuaa_token(app):
+    """
+    Returns a JWT signed with a local key, whose public key is seeded into the
+    `xssec` verification key cache - so tokens are verified without any network.
+    """
+    from app.utils.xsuaa_key_utils import VerificationKeyRefresher, get_jkus
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_key = (
+        key.public_key()
+        .public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+        .decode("ascii")
+    )
+    credentials = {**XSUAA_CREDENTIALS, "verificationkey": public_key}
+    for jku in get_jkus(credentials):
+        VerificationKeyRefresher._store_keys(jku, {XSUAA_KID: public_key})
+    app.config["AUTH_XSUAA_CRED"] = credentials
+
+    now = int(time.time())
+    claims = {
+        "iss": f"{credentials['url']}/oauth/token",
+        "aud": [credentials["clientid"], credentials["xsappname"]],
+        "cid": credentials["clientid"],
+        "client_id": credentials["clientid"],
+        "azp": credentials["clientid"],
+        "zid": credentials["identityzoneid"],
+        "ext_attr": {"enhancer": "XSUAA"},
+        "scope": ["uaa.resource", f"{credentials['xsappname']}.sapbtp-flask-bookstore-admin"],
+        "grant_type": "client_credentials",
+        "iat": now,
+        "exp": now + 24 * 3600,
+    }
+    return jwt.encode(claims, key, algorithm="RS256", headers={"kid": XSUAA_KID})
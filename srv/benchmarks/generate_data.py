@@ -0,0 +1,205 @@
+"""
+Synthetic data generator for benchmarks
+
+Creates an SQLite database shaped like the CDS-deployed one, filled with a
+reproducible (seeded) catalog of the given scale, e.g.
+
+    # in `srv` folder
+    python -m benchmarks.generate_data --scale 100k
+
+Point the app (or the benchmarks) at it via `DB_FILE=benchmarks/data/bookstore-100k.sqlite3`.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from typing import Iterator, NamedTuple
+
+from sqlalchemy import create_engine, insert
+
+from app.models import Authors, Books, Currencies, Genres
+from app.services.import_service import batched, read_csv_rows
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+CSV_DIR = os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, "db", "data")
+
+
+class Scale(NamedTuple):
+    books: int
+    authors: int
+    genres: int
+
+
+SCALES = {
+    "10k": Scale(books=10_000, authors=1_000, genres=100),
+    "100k": Scale(books=100_000, authors=10_000, genres=500),
+    "1m": Scale(books=1_000_000, authors=100_000, genres=2_000),
+}
+
+WORDS = (
+    "night day river stone garden shadow empire winter summer letter house city "
+    "journey secret silent golden broken lost last first raven heart storm island "
+    "mountain sea fire glass iron paper king queen child father mother war peace "
+    "dream memory light dark road north south song story time world"
+).split()
+
+
+def get_default_path(scale: str) -> str:
+    return os.path.join(DATA_DIR, f"bookstore-{scale}.sqlite3")
+
+
+def generate_genres(rng: random.Random, count: int) -> Iterator[dict]:
+    """
+    Generates a genre hierarchy, where every genre is attached to one of the
+    previously generated genres (or is a root), keeping the tree a few levels deep.
+    """
+    ids = []
+    for i in range(count):
+        genre_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        # ~5% roots, otherwise a child of a genre among the first third
+        parent_id = (
+            ids[rng.randrange(max(1, len(ids) // 3))] if ids and rng.random() > 0.05 else None
+        )
+        ids.append(genre_id)
+        yield {
+            "ID": genre_id,
+            "name": f"{rng.choice(WORDS).title()} {i}",
+            "descr": None,
+            "parent_ID": parent_id,
+        }
+
+
+def generate_authors(rng: random.Random, count: int, now: datetime) -> Iterator[dict]:
+    for i in range(1, count + 1):
+        born = date(1700, 1, 1) + timedelta(days=rng.randrange(300 * 365))
+        yield {
+            "ID": i,
+            "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}",
+            "dateOfBirth": born,
+            "dateOfDeath": born + timedelta(days=rng.randrange(30 * 365, 90 * 365)),
+            "placeOfBirth": rng.choice(WORDS).title(),
+            "placeOfDeath": rng.choice(WORDS).title(),
+            "createdBy": "generator",
+            "createdAt": now,
+            "modifiedBy": "generator",
+            "modifiedAt": now,
+        }
+
+
+def generate_books(
+    rng: random.Random,
+    scale: Scale,
+    genre_ids: list,
+    currency_codes: list,
+    now: datetime,
+) -> Iterator[dict]:
+    for i in range(1, scale.books + 1):
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))).title()
+        yield {
+            "ID": i,
+            "title": f"{title} {i}",
+            "descr": " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120))),
+            # ~10% out of stock
+            "stock": 0 if rng.random() < 0.1 else rng.randint(1, 1000),
+            "price": Decimal(rng.randint(100, 20_000)) / 100,
+            "AUTHOR_ID": rng.randint(1, scale.authors),
+            "genre_ID": rng.choice(genre_ids),
+            "currency_code": rng.choice(currency_codes),
+            "createdBy": "generator",
+            "createdAt": now,
+            "modifiedBy": "generator",
+            "modifiedAt": now,
+        }
+
+
+def insert_rows(engine, table, rows: Iterator[dict], batch_size: int) -> int:
+    count = 0
+    statement = insert(table)
+    batches = batched(rows, batch_size)
+    while True:
+        inserted = 0
+        # commit every 20 batches, keeping transactions bounded
+        with engine.begin() as conn:
+            for batch in islice(batches, 20):
+                conn.execute(statement, batch)
+                inserted += len(batch)
+        count += inserted
+        if inserted < batch_size * 20:
+            return count
+
+
+def generate(path: str, scale: Scale, seed: int = 42, batch_size: int = 5000) -> dict:
+    """
+    Creates the database at `path` (replacing an existing one) and fills it with
+    synthetic data of the given scale.
+
+    :return: Summary of the generated rows & duration
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    rng = random.Random(seed)
+    now = datetime(2025, 1, 1)
+    engine = create_engine(f"sqlite:///{path}")
+    Books.metadata.create_all(engine)
+    start = time.perf_counter()
+
+    with open(os.path.join(CSV_DIR, "sap.common-Currencies.csv"), encoding="utf-8") as file:
+        currencies = list(read_csv_rows(file, Currencies.__table__))
+    genres = list(generate_genres(rng, scale.genres))
+
+    counts = {
+        "currencies": insert_rows(engine, Currencies.__table__, iter(currencies), batch_size),
+        "genres": insert_rows(engine, Genres.__table__, iter(genres), batch_size),
+        "authors": insert_rows(
+            engine, Authors.__table__, generate_authors(rng, scale.authors, now), batch_size
+        ),
+        "books": insert_rows(
+            engine,
+            Books.__table__,
+            generate_books(
+                rng,
+                scale,
+                [genre["ID"] for genre in genres],
+                [currency["code"] for currency in currencies],
+                now,
+            ),
+            batch_size,
+        ),
+    }
+    engine.dispose()
+
+    return {
+        "path": path,
+        "seed": seed,
+        "rows": counts,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", choices=list(SCALES), default="10k")
+    parser.add_argument("--output", help="(default: benchmarks/data/bookstore-<scale>.sqlite3)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    summary = generate(
+        args.output or get_default_path(args.scale),
+        SCALES[args.scale],
+        seed=args.seed,
+        batch_size=args.batch_size,
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+HTTP load driver
+
+Starts a local gunicorn (configured via `gunicorn.conf.py`) against a synthetic
+database, drives it with concurrent keep-alive clients and reports latency
+percentiles & throughput per path as JSON, e.g.
+
+    # in `srv` folder
+    python -m benchmarks.load_test --scale 100k --workers 2 --threads 4 --concurrency 16
+
+Results are saved to `benchmarks/results/` along with the commit they were measured
+on - pass a previous result via `--compare` to print the relative change.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+
+SRV_DIR = os.path.join(os.path.dirname(__file__), os.pardir)
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+DEFAULT_PATHS = [
+    "/api/v1/books?limit=50",
+    "/api/v1/books?limit=50&min_price=50&max_price=60&sort=-price",
+    "/api/v1/books/search?q=golden+river&limit=20",
+    "/health/live",
+]
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SRV_DIR, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def start_server(port: int, db_file: str, workers: int, threads: int) -> subprocess.Popen:
+    """
+    Starts gunicorn in the background and waits until it is live
+    """
+    env = {
+        **os.environ,
+        "DB_FILE": db_file,
+        "WEB_CONCURRENCY": str(workers),
+        "WEB_THREADS": str(threads),
+        # lock waits & slow pages under load must not flood the output
+        "SQL_SLOW_QUERY_THRESHOLD_MS": os.environ.get("SQL_SLOW_QUERY_THRESHOLD_MS", "10000"),
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app:create_app()", "--bind", f"127.0.0.1:{port}"],
+        cwd=SRV_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {server.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health/live", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+
+    server.terminate()
+    raise RuntimeError("gunicorn did not become live within 60s")
+
+
+def drive(url: str, headers: dict, concurrency: int, duration: float) -> dict:
+    """
+    Requests `url` from `concurrency` threads for `duration` seconds
+    """
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        samples, codes = [], Counter()
+        with httpx.Client(headers=headers, timeout=30) as client:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    codes[client.get(url).status_code] += 1
+                except httpx.HTTPError as e:
+                    codes[type(e).__name__] += 1
+                samples.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(samples)
+            statuses.update(codes)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p90_ms": round(percentiles[89] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def compare(result: dict, baseline: dict):
+    """
+    Prints the relative change of throughput & latency against a previous result
+    """
+    print(f"Compared to {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for path, current in result["paths"].items():
+        previous = baseline.get("paths", {}).get(path)
+        if not previous:
+            continue
+        changes = ", ".join(
+            f"{metric} {(current[metric] - previous[metric]) / previous[metric]:+.1%}"
+            for metric in ("rps", "p50_ms", "p99_ms")
+            if previous[metric]
+        )
+        print(f"  {path}: {changes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Base URL of a running server (default: start gunicorn)")
+    parser.add_argument("--scale", default="10k", help="Synthetic data scale (see `generate_data`)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per path")
+    parser.add_argument("--warmup", type=float, default=2, help="Seconds of warmup per path")
+    parser.add_argument("--path", action="append", help="Path to request (repeatable)")
+    parser.add_argument("--user", default="me:me", help="Basic auth credentials")
+    parser.add_argument("--output", help="(default: benchmarks/results/load-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Previous result to compare against")
+    args = parser.parse_args()
+
+    from benchmarks.generate_data import SCALES, generate, get_default_path
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        db_file = os.path.abspath(get_default_path(args.scale.lower()))
+        if not os.path.exists(db_file):
+            generate(db_file, SCALES[args.scale.lower()])
+        server = start_server(args.port, db_file, args.workers, args.threads)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    user, password = args.user.split(":", 1)
+    headers = {"Authorization": httpx.BasicAuth(user, password)._auth_header}
+    paths = args.path or DEFAULT_PATHS
+
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    result = {
+        "commit": get_commit(),
+        "timestamp": timestamp,
+        "config": {
+            key: getattr(args, key)
+            for key in ("url", "scale", "workers", "threads", "concurrency", "duration")
+        },
+        "paths": {},
+    }
+    try:
+        for path in paths:
+            if args.warmup > 0:
+                drive(base_url + path, headers, args.concurrency, args.warmup)
+            result["paths"][path] = drive(base_url + path, headers, args.concurrency, args.duration)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load-{result['commit']}-{timestamp}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(result, file, indent=2)
+
+    print(json.dumps(result, indent=2))
+    print(f"Saved results to {output}")
+    if args.compare:
+        with open(args.compare) as file:
+            compare(result, json.load(file))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Concurrency benchmark of stock reservations
+
+Reserves the stock of a single scratch book from many threads at once, comparing
+the atomic conditional `UPDATE` of `books_service.reserve_books` against a naive
+read-modify-write, and reports throughput & oversold units as JSON.
+
+Usage (in `srv` folder, against the configured database):
+
+    python -m benchmarks.reserve_benchmark --threads 32 --reservations 5000
+"""
+
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app, db_manager
+from app.models import Books
+from app.services.books_service import reserve_books, upsert_books
+
+# ID of the scratch book, far outside of the sample data
+BENCHMARK_BOOK_ID = 999_999_001
+
+db = db_manager.db
+
+
+def reserve_atomic() -> bool:
+    return reserve_books({BENCHMARK_BOOK_ID: 1}, user_name="benchmark")[0]
+
+
+def reserve_read_modify_write() -> bool:
+    book = db.session.get(Books, BENCHMARK_BOOK_ID)
+    if (book.stock or 0) < 1:
+        db.session.rollback()
+        return False
+    book.stock = book.stock - 1
+    db.session.commit()
+    return True
+
+
+STRATEGIES = {
+    "atomic": reserve_atomic,
+    "read-modify-write": reserve_read_modify_write,
+}
+
+
+def reset_stock(stock: int):
+    upsert_books(
+        [{"id": BENCHMARK_BOOK_ID, "title": "Benchmark", "author_id": 101, "stock": stock}],
+        user_name="benchmark",
+    )
+
+
+def run(app, strategy: str, threads: int, reservations: int, stock: int) -> dict:
+    with app.app_context():
+        reset_stock(stock)
+
+    reserve = STRATEGIES[strategy]
+    errors = []
+    lock = threading.Lock()
+
+    def task(_):
+        with app.app_context():
+            try:
+                return reserve()
+            except Exception as e:  # e.g. `database is locked` on SQLite
+                with lock:
+                    errors.append(type(e).__name__)
+                db.session.rollback()
+                return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        reserved = sum(executor.map(task, range(reservations)))
+    seconds = time.perf_counter() - start
+
+    with app.app_context():
+        final_stock = db.session.get(Books, BENCHMARK_BOOK_ID).stock
+
+    return {
+        "strategy": strategy,
+        "threads": threads,
+        "reservations": reservations,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(reservations / seconds, 1),
+        "initial_stock": stock,
+        "reserved": reserved,
+        "final_stock": final_stock,
+        # units handed out beyond the initial stock, i.e. lost updates
+        "oversold": max(0, reserved - (stock - final_stock)),
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--reservations", type=int, default=5000)
+    parser.add_argument(
+        "--stock",
+        type=int,
+        help="Initial stock of the scratch book (default: half of the reservations)",
+    )
+    parser.add_argument(
+        "--strategy", choices=list(STRATEGIES), action="append", help="(default: all)"
+    )
+    args = parser.parse_args()
+
+    app = create_app()
+    # lock waits would flood the slow query log
+    app.config["SQL_SLOW_QUERY_THRESHOLD_MS"] = None
+    stock = args.stock if args.stock is not None else args.reservations // 2
+    try:
+        results = [
+            run(app, strategy, args.threads, args.reservations, stock)
+            for strategy in args.strategy or STRATEGIES
+        ]
+    finally:
+        with app.app_context():
+            db.session.execute(db.delete(Books).where(Books.ID == BENCHMARK_BOOK_ID))
+            db.session.commit()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Multi-process SQLite read/write concurrency benchmark
+
+Runs reader & writer processes (like gunicorn workers) against a copy of a synthetic
+database, once per SQLite profile - `default` (no pragmas, i.e. rollback journal)
+and `tuned` (`DB_SQLITE_PRAGMAS`, i.e. WAL & co.) - and reports throughput, latency
+percentiles & `database is locked` errors per role as JSON, e.g.
+
+    # in `srv` folder
+    python -m benchmarks.sqlite_benchmark --scale 100k --readers 4 --writers 2 --duration 10
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections import Counter
+from decimal import Decimal
+from typing import Optional
+
+# environment of the app per profile, the DB file is set per run
+PROFILES = {
+    "default": {"DB_SQLITE_PRAGMAS_ENABLED": "false"},
+    "tuned": {"DB_SQLITE_PRAGMAS_ENABLED": "true"},
+}
+
+# the journal mode is persisted in the database file, hence it's reset on the copy
+# of profiles not setting it - e.g. the synthetic databases are in WAL mode already
+JOURNAL_MODES = {"default": "DELETE"}
+
+
+def read(books_service, rng: random.Random, max_id: int):
+    min_price = rng.randint(0, 190)
+    books_service.get_books(
+        limit=50,
+        filters={"min_price": Decimal(min_price), "max_price": Decimal(min_price + 10)},
+        sort="-price",
+    )
+
+
+def write(books_service, rng: random.Random, max_id: int):
+    from app import db_manager
+    from app.models import Books
+
+    db = db_manager.db
+    book_id = rng.randint(1, max_id)
+    db.session.execute(
+        db.update(Books).where(Books.ID == book_id).values(stock=Books.stock + 1)
+    )
+    db.session.commit()
+
+
+ROLES = {"reader": read, "writer": write}
+
+
+def create_benchmark_app(env: dict):
+    """
+    Creates the app after applying `env` (the config is read on import)
+    """
+    os.environ.update(env)
+    from app import create_app
+
+    app = create_app()
+    # lock waits must not flood the output
+    app.config["SQL_SLOW_QUERY_THRESHOLD_MS"] = None
+    return app
+
+
+def worker(role: str, env: dict, max_id: int, duration: float, barrier, results):
+    """
+    Runs the operation of the `role` in a loop for `duration` seconds
+    """
+    app = create_benchmark_app(env)
+    from app import db_manager
+    from app.services import books_service
+
+    operation = ROLES[role]
+    rng = random.Random(os.getpid())
+    latencies, errors = [], Counter()
+
+    barrier.wait(timeout=120)
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        with app.app_context():
+            try:
+                operation(books_service, rng, max_id)
+            except Exception as e:  # e.g. `database is locked`
+                errors[str(getattr(e, "orig", e))] += 1
+                db_manager.db.session.rollback()
+        latencies.append(time.perf_counter() - start)
+
+    results.put({"role": role, "latencies": latencies, "errors": dict(errors)})
+
+
+def summarize(samples: list[dict], duration: float) -> dict:
+    latencies = [latency for sample in samples for latency in sample["latencies"]]
+    errors = Counter()
+    for sample in samples:
+        errors.update(sample["errors"])
+    percentiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "processes": len(samples),
+        "operations": len(latencies),
+        "ops_per_second": round(len(latencies) / duration, 1),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2),
+        "max_ms": round(max(latencies, default=0) * 1000, 2),
+        "errors": sum(errors.values()),
+        "error_messages": dict(errors.most_common(3)),
+    }
+
+
+def copy_database(db_file: str, copy: str, journal_mode: Optional[str] = None) -> int:
+    """
+    Copies `db_file` via the backup API, which includes changes not yet checkpointed
+    from its WAL file, & sets the `journal_mode` of the copy (if given)
+
+    :return: The highest ID of the books
+    """
+    source, target = sqlite3.connect(db_file), sqlite3.connect(copy)
+    try:
+        source.backup(target)
+        if journal_mode:
+            mode = target.execute(f"PRAGMA journal_mode={journal_mode}").fetchone()[0]
+            if mode.upper() != journal_mode.upper():
+                raise RuntimeError(f"Failed to set journal mode {journal_mode} - {mode}")
+        return target.execute("SELECT max(ID) FROM sap_sample_bookshop_Books").fetchone()[0]
+    finally:
+        source.close()
+        target.close()
+
+
+def run(profile: str, db_file: str, readers: int, writers: int, duration: float) -> dict:
+    """
+    Runs the readers & writers of a profile against a fresh copy of `db_file` - the
+    journal mode is persisted in the file, so profiles must not share it
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy = os.path.join(tmp_dir, "bookstore.sqlite3")
+        max_id = copy_database(db_file, copy, JOURNAL_MODES.get(profile))
+
+        env = {**PROFILES[profile], "DB_FILE": copy}
+        context = multiprocessing.get_context("spawn")
+        # creates the missing indexes & search tables once, before the workers race for it
+        setup = context.Process(target=create_benchmark_app, args=(env,))
+        setup.start()
+        setup.join()
+        if setup.exitcode != 0:
+            raise RuntimeError(f"App setup failed with exit code {setup.exitcode}")
+
+        barrier = context.Barrier(readers + writers)
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=worker, args=(role, env, max_id, duration, barrier, results)
+            )
+            for role in ["reader"] * readers + ["writer"] * writers
+        ]
+        for process in processes:
+            process.start()
+        # a crashed process breaks the barrier of the others
+        samples = [results.get(timeout=duration + 180) for _ in processes]
+        for process in processes:
+            process.join()
+
+        with sqlite3.connect(copy) as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+    return {
+        "profile": profile,
+        "journal_mode": journal_mode,
+        **{
+            f"{role}s": summarize([s for s in samples if s["role"] == role], duration)
+            for role in ROLES
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", default="10k", help="Synthetic data scale (see `generate_data`)")
+    parser.add_argument("--db", help="Database to copy (default: the synthetic one of `--scale`)")
+    parser.add_argument("--readers", type=int, default=4, help="Reader processes")
+    parser.add_argument("--writers", type=int, default=2, help="Writer processes")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per profile")
+    parser.add_argument("--profile", choices=list(PROFILES), action="append", help="(default: all)")
+    args = parser.parse_args()
+
+    from benchmarks.generate_data import SCALES, generate, get_default_path
+
+    db_file = args.db or os.path.abspath(get_default_path(args.scale.lower()))
+    if not os.path.exists(db_file):
+        generate(db_file, SCALES[args.scale.lower()])
+
+    results = [
+        run(profile, db_file, args.readers, args.writers, args.duration)
+        for profile in args.profile or PROFILES
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Micro-benchmarks of the hot paths of `GET /api/v1/books` - see `conftest.py`.
+"""
+
+import base64
+from itertools import islice
+
+import pytest
+
+from app import db_manager
+from app.models import Books
+from app.services import books_service, search_service
+from app.services.cache_service import catalog_cache
+from app.utils.auth_utils import (
+    get_basicuser_from_request,
+    get_xsuaauser_from_request,
+    security_context_cache,
+)
+from app.utils.json_utils import JSON_PROVIDERS
+
+BASIC_AUTH = {"Authorization": "Basic " + base64.b64encode(b"me:me").decode()}
+
+
+@pytest.fixture(scope="module")
+def middle_cursor(app):
+    """
+    Cursor pointing to the middle of the catalog (sorted by title)
+    """
+    count = db_manager.db.session.query(Books).count()
+    book = db_manager.db.session.execute(
+        books_service.select_books().offset(count // 2).limit(1)
+    ).one()
+    return books_service.encode_cursor("title", book.title, book.ID)
+
+
+@pytest.fixture(scope="module")
+def page(app):
+    return books_service.get_books(limit=500)["items"]
+
+
+#####################
+### BOOKS SERVICE ###
+#####################
+
+
+def test_get_books_first_page(benchmark, app):
+    result = benchmark(books_service.get_books, limit=50)
+    assert len(result["items"]) == 50
+
+
+def test_get_books_middle_page(benchmark, app, middle_cursor):
+    result = benchmark(books_service.get_books, limit=50, cursor=middle_cursor)
+    assert len(result["items"]) == 50
+
+
+def test_get_books_filtered_sorted(benchmark, app):
+    filters = books_service.BooksFilter(min_price=50, max_price=60, in_stock=True)
+    result = benchmark(books_service.get_books, limit=50, filters=filters, sort="-price")
+    assert result["items"]
+
+
+def test_get_books_sparse_fields(benchmark, app):
+    fields = books_service.parse_fields("id,title,price.value,author")
+    result = benchmark(books_service.get_books, limit=500, fields=fields)
+    assert len(result["items"]) == 500
+
+
+def test_get_books_all_fields(benchmark, app):
+    result = benchmark(books_service.get_books, limit=500)
+    assert len(result["items"]) == 500
+
+
+def test_iter_books_chunk(benchmark, app):
+    def stream():
+        return sum(1 for _ in islice(books_service.iter_books(chunk_size=1000), 1000))
+
+    assert benchmark(stream) == 1000
+
+
+def test_search_books(benchmark, app):
+    result = benchmark(search_service.search_books, "golden river", limit=50)
+    assert result["items"]
+
+
+#####################
+### SERIALIZATION ###
+#####################
+
+
+@pytest.fixture(params=list(JSON_PROVIDERS))
+def json_provider(request, app):
+    """
+    Every JSON provider, to compare them against each other
+    """
+    return JSON_PROVIDERS[request.param](app)
+
+
+def test_serialize_page_50(benchmark, json_provider, page):
+    assert benchmark(json_provider.dumpb, page[:50])
+
+
+def test_serialize_page_500(benchmark, json_provider, page):
+    assert benchmark(json_provider.dumpb, page)
+
+
+####################
+### AUTH LOADERS ###
+####################
+
+
+def test_basic_auth_loader(benchmark, app):
+    with app.test_request_context(headers=BASIC_AUTH) as ctx:
+        assert benchmark(get_basicuser_from_request, app.config, ctx.request)
+
+
+def test_xsuaa_auth_loader_uncached(benchmark, app, xsuaa_token):
+    def load(request):
+        # every round verifies the token signature
+        security_context_cache.clear()
+        return get_xsuaauser_from_request(app.config, request)
+
+    headers = {"Authorization": f"Bearer {xsuaa_token}"}
+    with app.test_request_context(headers=headers) as ctx:
+        assert benchmark(load, ctx.request)
+
+
+def test_xsuaa_auth_loader_cached(benchmark, app, xsuaa_token):
+    headers = {"Authorization": f"Bearer {xsuaa_token}"}
+    with app.test_request_context(headers=headers) as ctx:
+        assert get_xsuaauser_from_request(app.config, ctx.request)
+        assert benchmark(get_xsuaauser_from_request, app.config, ctx.request)
+
+
+##################
+### FULL STACK ###
+##################
+
+
+def test_http_get_books_uncached(benchmark, client):
+    response = benchmark.pedantic(
+        client.get,
+        args=("/api/v1/books?limit=50",),
+        kwargs={"headers": BASIC_AUTH},
+        setup=catalog_cache.invalidate,
+        rounds=200,
+    )
+    assert response.status_code == 200
+
+
+def test_http_get_books_cached(benchmark, client):
+    response = benchmark(client.get, "/api/v1/books?limit=50", headers=BASIC_AUTH)
+    assert response.status_code == 200
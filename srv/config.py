@@ -1,14 +1,42 @@
-import os, logging
-from typing import Literal, Dict, TypedDict
+import os, logging, tempfile
+from functools import lru_cache
+from typing import Callable, Literal, Dict, TypedDict
 
-from cfenv import AppEnv
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Initialize cfenv to get environment variables
-cfenv = AppEnv()
+
+@lru_cache(maxsize=1)
+def get_cfenv():
+    """
+    Parses the Cloud Foundry environment (`VCAP_APPLICATION` & `VCAP_SERVICES`)
+    on first use - only the production config requires it.
+    """
+    from cfenv import AppEnv
+
+    return AppEnv()
+
+
+class lazy:
+    """
+    Config attribute resolved on first access via the given function of the config
+    class (and cached on it), e.g. credentials of bound CF services. Hence only the
+    attributes of the config class selected via `FLASK_ENV` are ever resolved.
+    """
+
+    def __init__(self, resolve: Callable[[type], object]):
+        self.resolve = resolve
+        self.name = getattr(resolve, "__name__", None)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        value = self.resolve(owner)
+        setattr(owner, self.name, value)
+        return value
 
 
 class UserConfig(TypedDict):
@@ -20,13 +48,21 @@ class UserConfig(TypedDict):
     attr: dict
 
 
+# Scope of administrative users as defined in `xs-security.json`
+ADMIN_SCOPE = "$XSAPPNAME.sapbtp-flask-bookstore-admin"
+# Scope of users allowed to profile requests as defined in `xs-security.json`
+PROFILING_SCOPE = "$XSAPPNAME.sapbtp-flask-bookstore-profiler"
+
+
 class Config(dict):
     # Runtime
     ENV = "DEV"
 
     # Server configuration
     HOST = os.environ.get("HOST")
-    PORT = int(os.environ.get("PORT"))
+    PORT: int = lazy(lambda cls: int(os.environ["PORT"]))
+    WEB_CONCURRENCY: int = int(os.environ.get("WEB_CONCURRENCY", 1))  # gunicorn workers
+    WEB_THREADS: int = int(os.environ.get("WEB_THREADS", 1))  # gunicorn threads per worker
 
     # Logging
     LOGGING_LEVEL: int = os.environ.get("LOGGING_LEVEL", logging.INFO)
@@ -38,16 +74,130 @@ class Config(dict):
             "password": "me",
             "roles": ["uaa.resource"],
             "attr": {},
-        }
+        },
+        "admin": {
+            "password": "admin",
+            "roles": ["uaa.resource", ADMIN_SCOPE, PROFILING_SCOPE],
+            "attr": {},
+        },
     }
 
+    AUTH_XSUAA_CACHE_MAX_SIZE: int = int(os.environ.get("AUTH_XSUAA_CACHE_MAX_SIZE", 1024))
+    AUTH_XSUAA_CACHE_MAX_TTL: int = int(os.environ.get("AUTH_XSUAA_CACHE_MAX_TTL", 300))  # seconds
+
     ## Database - SQLite
     DB_TYPE: Literal["sqlite", "hana"] = "sqlite"
-    DB_FILE: str = os.path.abspath("db.sqlite3")
+    DB_FILE: str = os.path.abspath(os.environ.get("DB_FILE", "db.sqlite3"))
 
     ## SQLAlchemy - Database URI
     SQLALCHEMY_DATABASE_URI = f"{DB_TYPE}:///{DB_FILE}"
 
+    ## Database - Read replica serving read-only routes (bind key `replica`)
+    # locally a read-only connection to the same SQLite file
+    DB_READ_REPLICA_ENABLED: bool = os.environ.get("DB_READ_REPLICA_ENABLED", "true").lower() == "true"
+    SQLALCHEMY_BINDS: dict = (
+        {"replica": f"{DB_TYPE}:///file:{DB_FILE}?mode=ro&uri=true"}
+        if DB_READ_REPLICA_ENABLED
+        else {}
+    )
+
+    ## Database - SQLite pragmas executed on every new connection of SQLite engines
+    # WAL lets readers proceed alongside a writer (and is persisted in the DB file),
+    # `synchronous=NORMAL` is durable in WAL mode except for the last commits on power loss
+    DB_SQLITE_PRAGMAS_ENABLED: bool = os.environ.get("DB_SQLITE_PRAGMAS_ENABLED", "true").lower() == "true"
+    # executed in order - the busy timeout first, as switching the journal mode awaits locks
+    DB_SQLITE_PRAGMAS: dict = {
+        "busy_timeout": int(os.environ.get("DB_SQLITE_BUSY_TIMEOUT", 5000)),  # milliseconds
+        "journal_mode": os.environ.get("DB_SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": os.environ.get("DB_SQLITE_SYNCHRONOUS", "NORMAL"),
+        "mmap_size": int(os.environ.get("DB_SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),  # bytes
+        "cache_size": int(os.environ.get("DB_SQLITE_CACHE_SIZE", -64 * 1024)),  # negative: KiB
+        "temp_store": os.environ.get("DB_SQLITE_TEMP_STORE", "MEMORY"),
+    }
+    # overrides of `DB_SQLITE_PRAGMAS` per bind key (`default` for the primary engine),
+    # `None` skips a pragma - the journal mode can't be changed via read-only connections
+    DB_SQLITE_BIND_PRAGMAS: dict = {"replica": {"journal_mode": None}}
+
+    ## Database - Connection pool (per worker process & engine, i.e. primary & replica)
+    # every worker thread may hold one connection, plus one for background probes
+    DB_POOL_SIZE: int = int(os.environ.get("DB_POOL_SIZE", WEB_THREADS + 1))
+    DB_POOL_MAX_OVERFLOW: int = int(
+        os.environ.get("DB_POOL_MAX_OVERFLOW", max(1, WEB_THREADS // 2))
+    )
+    DB_POOL_TIMEOUT: float = float(os.environ.get("DB_POOL_TIMEOUT", 10))  # seconds
+    DB_POOL_RECYCLE: int = int(os.environ.get("DB_POOL_RECYCLE", -1))  # seconds
+    DB_POOL_PRE_PING: bool = os.environ.get("DB_POOL_PRE_PING", "false").lower() == "true"
+
+    ## Admission control of the API routes (per worker process)
+    # requests beyond the concurrency wait in a bounded queue for a slot, otherwise
+    # they are shed with `503` - by default a thread is kept free for health checks
+    ADMISSION_ENABLED: bool = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_CONCURRENCY: int = int(
+        os.environ.get("ADMISSION_MAX_CONCURRENCY", max(1, WEB_THREADS - 1))
+    )
+    ADMISSION_MAX_QUEUE: int = int(os.environ.get("ADMISSION_MAX_QUEUE", WEB_THREADS))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 1))  # seconds
+    # seconds admitted requests wait for a DB connection, at most `DB_POOL_TIMEOUT`
+    ADMISSION_CHECKOUT_TIMEOUT: float = float(os.environ.get("ADMISSION_CHECKOUT_TIMEOUT", 1))
+    ADMISSION_RETRY_AFTER: int = int(os.environ.get("ADMISSION_RETRY_AFTER", 1))  # seconds
+
+    ## On-demand request profiling via the `X-Profile` header (see `profiling_utils`)
+    PROFILING_ENABLED: bool = os.environ.get("PROFILING_ENABLED", "true").lower() == "true"
+    # profiles are stored per instance, i.e. shared by its gunicorn workers
+    PROFILING_DIR: str = os.environ.get(
+        "PROFILING_DIR", os.path.join(tempfile.gettempdir(), "bookstore-profiles")
+    )
+    PROFILING_MAX_PROFILES: int = int(os.environ.get("PROFILING_MAX_PROFILES", 50))
+    PROFILING_SAMPLE_INTERVAL: float = float(
+        os.environ.get("PROFILING_SAMPLE_INTERVAL", 0.001)
+    )  # seconds
+
+    # Metrics
+    METRICS_ENABLED: bool = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+    # SQL instrumentation
+    SQL_SLOW_QUERY_THRESHOLD_MS: int = int(os.environ.get("SQL_SLOW_QUERY_THRESHOLD_MS", 200))
+    SQL_EXPLAIN_SLOW_QUERIES: bool = os.environ.get("SQL_EXPLAIN_SLOW_QUERIES", "true").lower() == "true"
+    SQL_QUERY_BUDGET_ENFORCE: bool = False  # raise on exceeded query budgets (tests)
+    SQL_SERVER_TIMING_ENABLED: bool = False  # expose DB time & query count via `Server-Timing`
+
+    # Health checks
+    HEALTH_DB_PROBE_INTERVAL: int = int(os.environ.get("HEALTH_DB_PROBE_INTERVAL", 10))  # seconds
+
+    # JSON serialization
+    JSON_PROVIDER: Literal["orjson", "json"] = os.environ.get("JSON_PROVIDER", "orjson")
+    # encode `Decimal`s, e.g. prices, as JSON strings (lossless) or numbers
+    JSON_DECIMAL_MODE: Literal["string", "number"] = os.environ.get("JSON_DECIMAL_MODE", "string")
+
+    # Response compression (`br` or `gzip`, negotiated via `Accept-Encoding`)
+    COMPRESSION_ENABLED: bool = os.environ.get("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.environ.get("COMPRESSION_MIN_SIZE", 1024))  # bytes
+    COMPRESSION_GZIP_LEVEL: int = int(os.environ.get("COMPRESSION_GZIP_LEVEL", 6))  # 1-9
+    COMPRESSION_BROTLI_LEVEL: int = int(os.environ.get("COMPRESSION_BROTLI_LEVEL", 5))  # 0-11
+
+    # Pagination
+    BOOKS_PAGE_SIZE_DEFAULT: int = int(os.environ.get("BOOKS_PAGE_SIZE_DEFAULT", 50))
+    BOOKS_PAGE_SIZE_MAX: int = int(os.environ.get("BOOKS_PAGE_SIZE_MAX", 500))
+
+    # Bulk writes
+    BOOKS_BATCH_MAX_SIZE: int = int(os.environ.get("BOOKS_BATCH_MAX_SIZE", 10000))
+    BOOKS_RESERVE_MAX_LINES: int = int(os.environ.get("BOOKS_RESERVE_MAX_LINES", 100))
+
+    # Streaming
+    BOOKS_STREAM_CHUNK_SIZE: int = int(os.environ.get("BOOKS_STREAM_CHUNK_SIZE", 1000))
+
+    # Caching
+    CATALOG_CACHE_TTL: int = int(os.environ.get("CATALOG_CACHE_TTL", 60))  # seconds
+    CATALOG_CACHE_MAX_ENTRIES: int = int(os.environ.get("CATALOG_CACHE_MAX_ENTRIES", 256))
+    # code lists (currencies & genres, incl. the genre hierarchy) resolved in-process
+    # instead of joined per query - reloaded in the background once expired (never
+    # if <= 0) or changed
+    REFDATA_CACHE_TTL: int = int(os.environ.get("REFDATA_CACHE_TTL", 300))  # seconds
+
+    # Bulk CSV import (`flask --app app db import-csv`)
+    IMPORT_BATCH_SIZE: int = int(os.environ.get("IMPORT_BATCH_SIZE", 5000))
+    IMPORT_BATCHES_PER_TRANSACTION: int = int(os.environ.get("IMPORT_BATCHES_PER_TRANSACTION", 20))
+
 
 class DevelopmentConfig(Config):
     ENV = "DEV"
@@ -56,6 +206,9 @@ class DevelopmentConfig(Config):
     HOST = "localhost"
     PORT = 5000
 
+    # SQL instrumentation
+    SQL_SERVER_TIMING_ENABLED: bool = True
+
 
 class ProductionConfig(Config):
     ENV = "PRODUCTION"
@@ -66,28 +219,59 @@ class ProductionConfig(Config):
         os.environ.get("PORT", 8080)
     )  # 8080 is the default port for Cloud Foundry
 
-    # Cloud Foundry - Credentials
-    CFCRED_XSUAA: dict = cfenv.get_service(label="xsuaa").credentials
-    CFCRED_HANA: dict = cfenv.get_service(label="hana").credentials
+    # Cloud Foundry - Credentials (resolved from `VCAP_SERVICES` on first access)
+    CFCRED_XSUAA: dict = lazy(lambda cls: get_cfenv().get_service(label="xsuaa").credentials)
+    CFCRED_HANA: dict = lazy(lambda cls: get_cfenv().get_service(label="hana").credentials)
 
     # Authentication
     AUTH_TYPE: Literal["xsuaa", "basic"] = "xsuaa"
-    AUTH_XSUAA_CRED: dict = CFCRED_XSUAA
+    AUTH_XSUAA_CRED: dict = lazy(lambda cls: cls.CFCRED_XSUAA)
+    AUTH_XSUAA_KEY_REFRESH_INTERVAL: int = int(
+        os.environ.get("AUTH_XSUAA_KEY_REFRESH_INTERVAL", 600)
+    )  # seconds, must stay below xssec's key cache expiry of 15 minutes
+    AUTH_XSUAA_TOKEN_KEYS_URL: str | None = os.environ.get("AUTH_XSUAA_TOKEN_KEYS_URL")
 
     ## Database - HANA
     DB_TYPE: Literal["sqlite", "hana"] = "hana"
-    DB_HOST: str = CFCRED_HANA["host"]
-    DB_PORT: str = CFCRED_HANA["port"]
-    DB_USER: str = CFCRED_HANA["user"]
-    DB_PASSWORD: str = CFCRED_HANA["password"]
-    DB_SCHEMA: str = CFCRED_HANA["schema"]
+    DB_HOST: str = lazy(lambda cls: cls.CFCRED_HANA["host"])
+    DB_PORT: str = lazy(lambda cls: cls.CFCRED_HANA["port"])
+    DB_USER: str = lazy(lambda cls: cls.CFCRED_HANA["user"])
+    DB_PASSWORD: str = lazy(lambda cls: cls.CFCRED_HANA["password"])
+    DB_SCHEMA: str = lazy(lambda cls: cls.CFCRED_HANA["schema"])
 
     ## SQLAlchemy - Database URI
-    SQLALCHEMY_DATABASE_URI = (
-        f"{DB_TYPE}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}"
-        f"?encrypt=true&currentSchema={DB_SCHEMA}"
+    SQLALCHEMY_DATABASE_URI = lazy(
+        lambda cls: (
+            f"{cls.DB_TYPE}://{cls.DB_USER}:{cls.DB_PASSWORD}@{cls.DB_HOST}:{cls.DB_PORT}"
+            f"?encrypt=true&currentSchema={cls.DB_SCHEMA}"
+        )
+    )
+
+    ## Database - Read replica serving read-only routes (bind key `replica`)
+    # a read-enabled HANA system replica (active/active), accessed with the same credentials
+    DB_REPLICA_HOST: str | None = os.environ.get("DB_REPLICA_HOST")
+    DB_REPLICA_PORT: str = lazy(lambda cls: os.environ.get("DB_REPLICA_PORT", cls.DB_PORT))
+    DB_READ_REPLICA_ENABLED: bool = DB_REPLICA_HOST is not None
+    SQLALCHEMY_BINDS: dict = lazy(
+        lambda cls: (
+            {
+                "replica": (
+                    f"{cls.DB_TYPE}://{cls.DB_USER}:{cls.DB_PASSWORD}"
+                    f"@{cls.DB_REPLICA_HOST}:{cls.DB_REPLICA_PORT}"
+                    f"?encrypt=true&currentSchema={cls.DB_SCHEMA}"
+                )
+            }
+            if cls.DB_READ_REPLICA_ENABLED
+            else {}
+        )
     )
 
+    ## Database - Connection pool (per worker process)
+    # recycle connections before HANA / the network drops them as idle,
+    # and ping them on checkout to replace connections dropped nevertheless
+    DB_POOL_RECYCLE: int = int(os.environ.get("DB_POOL_RECYCLE", 1800))  # seconds
+    DB_POOL_PRE_PING: bool = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+
 
 config_manager = {
     "DEV": DevelopmentConfig,
@@ -0,0 +1,31 @@
+import os
+import shutil
+import tempfile
+
+# Gunicorn configuration - picked up automatically from the working directory
+# See https://docs.gunicorn.org/en/stable/settings.html
+
+# number of worker processes & threads per worker process - read from the same
+# environment variables as `WEB_CONCURRENCY` & `WEB_THREADS` in `config.py`,
+# which size the DB connection pool of each worker accordingly
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("WEB_THREADS", 1))
+
+# Prometheus multiprocess mode - every worker writes its metrics to this directory,
+# which `/metrics` aggregates. Must be set before `prometheus_client` is imported.
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "prometheus")
+)
+
+
+def on_starting(server):
+    # start with a clean slate - metrics of a previous run must not be aggregated
+    multiproc_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
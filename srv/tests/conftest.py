@@ -0,0 +1,8 @@
+from config import Config
+
+
+def pytest_configure(config):
+    # raise on routes exceeding their query budget (see `query_budget`), so that
+    # N+1 regressions fail the tests - set before any app is created, incl. the ones
+    # created by the autouse fixtures of `pytest-flask`
+    Config.SQL_QUERY_BUDGET_ENFORCE = True
@@ -0,0 +1,128 @@
+import base64
+import threading
+import time
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import exc
+
+from app import create_app, db_manager
+from app.services import books_service
+from app.utils.admission_utils import admission_controller
+
+BASIC_AUTH = {"Authorization": "Basic bWU6bWU="}
+ADMIN_AUTH = {"Authorization": "Basic " + base64.b64encode(b"admin:admin").decode()}
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+@pytest.fixture()
+def busy(client):
+    """
+    Occupies all slots, as if the worker was busy serving other requests
+    """
+    slots = admission_controller.max_concurrency
+    for _ in range(slots):
+        admission_controller.slots.acquire()
+    yield admission_controller.slots
+    for _ in range(slots):
+        admission_controller.slots.release()
+
+
+def assert_shed(response, code: int):
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(admission_controller.retry_after)
+    assert response.get_json()["error"]["code"] == code
+
+
+def test_request_releases_slot(client):
+    assert client.get("/api/v1/books", headers=BASIC_AUTH).status_code == 200
+
+    status = admission_controller.get_status()
+    assert status["active"] == 0 and status["queued"] == 0
+    assert sum(status["shed"].values()) == 0
+
+
+def test_shed_queue_full(client, busy):
+    admission_controller.max_queue = 0
+
+    assert_shed(client.get("/api/v1/books", headers=BASIC_AUTH), 5030001)
+    assert admission_controller.get_status()["shed"]["queue_full"] == 1
+    # health checks are not subject to admission control
+    assert client.get("/health/live").status_code == 200
+
+
+def test_shed_queue_timeout(client, busy):
+    admission_controller.max_queue = 1
+    admission_controller.queue_timeout = 0.01
+
+    assert_shed(client.get("/api/v1/books", headers=BASIC_AUTH), 5030001)
+    status = admission_controller.get_status()
+    assert status["shed"]["queue_timeout"] == 1
+    assert status["queued"] == 0
+
+
+def test_queued_request_admitted(client, busy):
+    admission_controller.max_queue = 1
+    admission_controller.queue_timeout = 5
+    # a slot gets free while the request is queued
+    timer = threading.Timer(0.05, busy.release)
+    timer.start()
+
+    assert client.get("/api/v1/books", headers=BASIC_AUTH).status_code == 200
+    timer.join()
+    busy.acquire()
+
+
+def test_shed_pool_timeout(client, monkeypatch):
+    def get_books(**kwargs):
+        raise exc.TimeoutError("QueuePool limit of size 1 overflow 0 reached")
+
+    monkeypatch.setattr(books_service, "get_books", get_books)
+
+    assert_shed(client.get("/api/v1/books", headers=BASIC_AUTH), 5030002)
+    assert admission_controller.get_status()["shed"]["pool_timeout"] == 1
+
+
+def test_shed_pool_checkout_timeout(client):
+    admission_controller.checkout_timeout = 0.05
+    pool = db_manager.db.engine.pool
+    # occupy all connections, as if held by other requests
+    connections = [pool.connect() for _ in range(pool.size() + pool._max_overflow)]
+    try:
+        start = time.perf_counter()
+        response = client.post("/api/v1/books/201/reserve", headers=BASIC_AUTH)
+        elapsed = time.perf_counter() - start
+    finally:
+        for connection in connections:
+            connection.close()
+
+    # shed right after the checkout timeout instead of the pool timeout
+    assert_shed(response, 5030002)
+    assert elapsed < pool.pool_timeout
+    assert admission_controller.get_status()["shed"]["pool_timeout"] == 1
+
+
+def test_shed_requests_metrics(client, busy):
+    def get_shed():
+        return REGISTRY.get_sample_value(
+            "bookstore_http_requests_shed_total", {"reason": "queue_full"}
+        ) or 0
+
+    admission_controller.max_queue = 0
+    shed = get_shed()
+    client.get("/api/v1/books", headers=BASIC_AUTH)
+    assert get_shed() == shed + 1
+
+    metrics = client.get("/metrics", headers=ADMIN_AUTH).get_data(as_text=True)
+    assert 'bookstore_http_requests_shed_total{reason="queue_full"}' in metrics
@@ -1,5 +1,12 @@
+import json
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
 import pytest
+from sqlalchemy import inspect
+
 from app import create_app, db_manager
+from app.services.cache_service import catalog_cache
 
 
 @pytest.fixture()
@@ -23,6 +30,21 @@ def test_health_check(client):
     assert data["components"]["db"]["status"] == "UP"
 
 
+def test_health_check_live(client):
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "UP"}
+
+
+def test_health_check_ready(client):
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["status"] == "UP"
+    assert data["components"]["db"]["status"] == "UP"
+    assert data["components"]["db"]["latency_ms"] >= 0
+
+
 def test_get_books_unauthorized(client):
     response = client.get("/api/v1/books")
     assert response.status_code == 401
@@ -40,3 +62,193 @@ def test_get_books(client):
     assert "id" in data[0]
     assert "title" in data[0]
     assert "author" in data[0]
+
+
+def test_get_books_paginated(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    response = client.get("/api/v1/books?limit=1", headers=headers)
+    assert response.status_code == 200
+    first_page = response.get_json()
+    assert len(first_page) == 1
+    assert 'rel="next"' in response.headers["Link"]
+
+    # follow the `next` link to the second page
+    next_url = response.headers["Link"].split(">")[0][1:]
+    response = client.get(next_url, headers=headers)
+    assert response.status_code == 200
+    second_page = response.get_json()
+    assert len(second_page) == 1
+    assert (second_page[0]["title"], second_page[0]["id"]) > (
+        first_page[0]["title"],
+        first_page[0]["id"],
+    )
+
+    # all books fit into a single page - no `next` link
+    response = client.get("/api/v1/books?limit=500", headers=headers)
+    assert "Link" not in response.headers
+
+
+def test_get_books_normalized_link(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    catalog_cache.invalidate()
+    first = client.get(
+        "/api/v1/books?currency=gbp&min_price=5.0&sort=title&stream=0&limit=1", headers=headers
+    )
+    misses = catalog_cache.misses
+    second = client.get("/api/v1/books?limit=1&min_price=5&currency=GBP", headers=headers)
+
+    # equivalent requests share the cached page, linking the next page alike
+    assert catalog_cache.misses == misses
+    assert first.headers["Link"] == second.headers["Link"]
+    next_url = urlsplit(first.headers["Link"].split(">")[0][1:])
+    assert next_url.path == "/api/v1/books"
+    assert parse_qs(next_url.query) == {
+        "currency": ["GBP"],
+        "min_price": ["5"],
+        "limit": ["1"],
+        "cursor": [mock.ANY],
+    }
+
+
+def test_get_books_invalid_page_params(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    response = client.get("/api/v1/books?limit=0", headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()["error"]["code"] == 4000001
+
+    response = client.get("/api/v1/books?cursor=not-a-cursor", headers=headers)
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.get_json()["error"]["message"]
+
+
+def test_get_books_filtered(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    books = client.get("/api/v1/books?limit=500", headers=headers).get_json()
+
+    response = client.get("/api/v1/books?author=150", headers=headers)
+    assert response.status_code == 200
+    assert {book["author"] for book in response.get_json()} == {"Edgar Allen Poe"}
+
+    response = client.get(
+        "/api/v1/books?genre=11aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa", headers=headers
+    )
+    assert {book["id"] for book in response.get_json()} == {201, 207}
+
+    response = client.get(
+        "/api/v1/books?currency=usd&min_price=13.5&max_price=14", headers=headers
+    )
+    assert [book["id"] for book in response.get_json()] == [252]
+
+    in_stock = client.get("/api/v1/books?in_stock=true", headers=headers).get_json()
+    out_of_stock = client.get("/api/v1/books?in_stock=false", headers=headers).get_json()
+    assert all(book["stock"] > 0 for book in in_stock)
+    assert len(in_stock) + len(out_of_stock) == len(books)
+
+
+def test_get_books_sorted(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    books = client.get("/api/v1/books?limit=500&sort=-price", headers=headers).get_json()
+    prices = [book["price"]["value"] for book in books]
+    assert prices == sorted(prices, key=float, reverse=True)
+
+    # follow the `next` links page by page - sort & filters are carried over
+    paged, url = [], "/api/v1/books?limit=2&sort=-price"
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        paged.extend(response.get_json())
+        url = response.headers.get("Link", ">").split(">")[0][1:]
+    assert paged == books
+
+
+def test_get_books_invalid_filter_params(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    for query in (
+        "author=poe",
+        "genre=fiction",
+        "currency=EURO",
+        "min_price=-1",
+        "max_price=cheap",
+        "in_stock=maybe",
+        "sort=author",
+    ):
+        response = client.get(f"/api/v1/books?{query}", headers=headers)
+        assert response.status_code == 400, query
+        assert response.get_json()["error"]["code"] == 4000001
+
+    # cursor of another sort is rejected
+    response = client.get("/api/v1/books?limit=1", headers=headers)
+    next_url = response.headers["Link"].split(">")[0][1:]
+    response = client.get(f"{next_url}&sort=price", headers=headers)
+    assert response.status_code == 400
+
+
+def test_get_books_sparse_fields(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    books = client.get("/api/v1/books?limit=500&sort=-price", headers=headers).get_json()
+
+    response = client.get(
+        "/api/v1/books?limit=500&sort=-price&fields=id,title,price.value,author",
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {
+            "id": book["id"],
+            "title": book["title"],
+            "price": {"value": book["price"]["value"]},
+            "author": book["author"],
+        }
+        for book in books
+    ]
+
+    # fields are carried over to the next page, sorting by a field not returned
+    paged, url = [], "/api/v1/books?limit=2&sort=-price&fields=genre"
+    while url:
+        response = client.get(url, headers=headers)
+        paged.extend(response.get_json())
+        url = response.headers.get("Link", ">").split(">")[0][1:]
+    assert paged == [{"genre": book["genre"]} for book in books]
+
+    response = client.get("/api/v1/books?stream=1&fields=price.currency", headers=headers)
+    lines = response.get_data(as_text=True).splitlines()
+    assert json.loads(lines[0]) == {"price": {"currency": books[0]["price"]["currency"]}}
+
+    for fields in ("", "isbn", "price.amount", "id,descr.text"):
+        response = client.get(f"/api/v1/books?fields={fields}", headers=headers)
+        assert response.status_code == 400, fields
+        assert response.get_json()["error"]["code"] == 4000001
+
+
+def test_book_indexes(client):
+    indexes = inspect(db_manager.db.engine).get_indexes("SAP_SAMPLE_BOOKSHOP_BOOKS")
+    # column names are case-insensitive
+    indexed = {index["column_names"][0].lower() for index in indexes}
+    assert indexed >= {"author_id", "genre_id", "currency_code", "title", "price"}
+
+
+def test_get_books_streamed(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    books = client.get("/api/v1/books?limit=500", headers=headers).get_json()
+
+    response = client.get("/api/v1/books?stream=1", headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line) for line in lines] == books
+
+    # opt-in via `Accept` header
+    response = client.get(
+        "/api/v1/books",
+        headers={**headers, "Accept": "application/x-ndjson"},
+    )
+    assert response.mimetype == "application/x-ndjson"
+    assert len(response.get_data(as_text=True).splitlines()) == len(books)
+
+
+def test_get_books_streamed_invalid_cursor(client):
+    response = client.get(
+        "/api/v1/books?stream=1&cursor=not-a-cursor",
+        headers={"Authorization": "Basic bWU6bWU="},
+    )
+    assert response.status_code == 400
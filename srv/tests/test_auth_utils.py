@@ -131,3 +131,73 @@ def test_roles_required_denies_access(app):
         assert isinstance(excinfo.value, Forbidden)
         assert "You do not have one or all roles required" in str(excinfo.value)
         logout_user()
+
+
+def test_get_xsuaauser_from_request_cached(monkeypatch):
+    import time
+    import jwt
+    from app.utils import auth_utils
+
+    class DummyXssecContext:
+        def check_scope(self, scope):
+            raise AssertionError("scopes must be resolved from the cache")
+
+    calls = []
+
+    def create_security_context(token, cred):
+        calls.append(token)
+        return DummyXssecContext()
+
+    monkeypatch.setattr(
+        auth_utils,
+        "xssec",
+        type("xssec", (), {"create_security_context": create_security_context}),
+    )
+    monkeypatch.setattr(
+        auth_utils, "security_context_cache", auth_utils.SecurityContextCache()
+    )
+
+    app_config = {"AUTH_XSUAA_CRED": {"xsappname": "bookstore"}}
+    token = jwt.encode(
+        {"exp": int(time.time()) + 60, "scope": ["bookstore.admin", "openid"]},
+        "secret",
+    )
+    req = DummyRequest({"authorization": f"Bearer {token}"})
+
+    user = auth_utils.get_xsuaauser_from_request(app_config, req)
+    assert auth_utils.get_xsuaauser_from_request(app_config, req) is not None
+    assert len(calls) == 1
+    assert auth_utils.security_context_cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "size": 1,
+    }
+
+    # precomputed scopes resolve both the global and the `$XSAPPNAME` form
+    assert user.check_scope("bookstore.admin")
+    assert user.check_scope("$XSAPPNAME.admin")
+    assert user.check_scope("openid")
+    assert not user.check_scope("$XSAPPNAME.other")
+
+
+def test_security_context_cache_expiry_and_size_bound():
+    import time
+    import jwt
+    from app.utils.auth_utils import SecurityContextCache
+
+    cache = SecurityContextCache(max_size=2, max_ttl=300)
+
+    # entries expire at the token's `exp` claim
+    expired_token = jwt.encode({"exp": int(time.time()) - 1}, "secret")
+    cache.set(expired_token, object())
+    assert cache.get(expired_token) is None
+
+    # entries expire after `max_ttl` at the latest
+    entry = cache.set(jwt.encode({"exp": int(time.time()) + 3600}, "secret"), object())
+    assert entry.expires_at <= time.time() + 300
+
+    for token in ("a", "b", "c"):
+        cache.set(token, object())
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["size"] == 2
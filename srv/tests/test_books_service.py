@@ -0,0 +1,301 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import pytest
+
+from app import create_app, db_manager
+from app.models import Books
+from app.services.cache_service import catalog_cache
+from app.services.books_service import (
+    parse_book_upsert,
+    parse_fields,
+    reserve_books,
+    select_books,
+    upsert_books,
+)
+
+ADMIN_AUTH = {"Authorization": "Basic " + base64.b64encode(b"admin:admin").decode()}
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+@pytest.fixture()
+def cleanup(client):
+    ids = []
+    yield ids
+    db_manager.db.session.rollback()
+    db_manager.db.session.execute(db_manager.db.delete(Books).where(Books.ID.in_(ids)))
+    db_manager.db.session.commit()
+
+
+def test_parse_book_upsert():
+    assert parse_book_upsert(
+        {"id": 1, "title": "T", "author_id": 2, "price": 9.9, "currency_code": "eur"}
+    ) == {
+        "ID": 1,
+        "title": "T",
+        "descr": None,
+        "stock": None,
+        "price": Decimal("9.9"),
+        "AUTHOR_ID": 2,
+        "genre_ID": None,
+        "currency_code": "EUR",
+    }
+
+    for item in (
+        [],
+        {"title": "T", "author_id": 2},
+        {"id": "1", "title": "T", "author_id": 2},
+        {"id": 1, "title": "", "author_id": 2},
+        {"id": 1, "title": "T", "author_id": 2, "price": "free"},
+        {"id": 1, "title": "T", "author_id": 2, "genre_id": "fiction"},
+    ):
+        with pytest.raises(ValueError):
+            parse_book_upsert(item)
+
+
+def test_parse_fields():
+    assert parse_fields("author, title,id") == ("id", "title", "author")
+    assert parse_fields("price") == (
+        "price.value",
+        "price.currency.code",
+        "price.currency.symbol",
+    )
+    assert parse_fields("price.currency.code,price.currency") == (
+        "price.currency.code",
+        "price.currency.symbol",
+    )
+
+    for fields in ("", " , ", "isbn", "price.amount", "pri"):
+        with pytest.raises(ValueError):
+            parse_fields(fields)
+
+
+def test_select_books_joins_by_fields():
+    sql = str(select_books(fields=("id", "title", "price.value", "author")))
+    assert "AUTHORS" in sql
+    assert "CURRENCIES" not in sql and "GENRES" not in sql
+    assert "descr" not in sql
+
+    # genres & currencies are resolved via the reference data caches
+    sql = str(select_books(sort="-stock", fields=("genre", "price.currency.code", "price.currency.symbol")))
+    assert "GENRES" not in sql and "CURRENCIES" not in sql and "AUTHORS" not in sql
+    assert sql.count('"SAP_SAMPLE_BOOKSHOP_BOOKS".currency_code') == 1
+    # ID & sort column are selected for the cursor
+    assert '"SAP_SAMPLE_BOOKSHOP_BOOKS"."ID"' in sql
+    assert '"SAP_SAMPLE_BOOKSHOP_BOOKS".stock' in sql
+
+    sql = str(select_books())
+    assert "AUTHORS" in sql
+    assert "CURRENCIES" not in sql and "GENRES" not in sql
+
+
+def test_upsert_books(cleanup):
+    cleanup.extend([9101, 9102])
+    results = upsert_books(
+        [
+            {"id": 9101, "title": "First", "author_id": 101, "stock": 1},
+            {"id": 9102, "title": "Second", "author_id": 101},
+            {"id": 9101, "title": "Duplicate", "author_id": 101},
+            {"title": "Invalid"},
+        ],
+        user_name="tester",
+    )
+    assert [result["status"] for result in results] == [
+        "created",
+        "created",
+        "invalid",
+        "invalid",
+    ]
+
+    results = upsert_books(
+        [{"id": 9101, "title": "Renamed", "author_id": 101, "stock": 2}],
+        user_name="other",
+    )
+    assert results == [{"index": 0, "id": 9101, "status": "updated"}]
+
+    book = db_manager.db.session.get(Books, 9101)
+    assert (book.title, book.stock) == ("Renamed", 2)
+    assert (book.createdBy, book.modifiedBy) == ("tester", "other")
+
+
+def test_upsert_books_unknown_references(cleanup):
+    cleanup.extend([9111, 9112, 9113, 9114])
+    results = upsert_books(
+        [
+            {"id": 9111, "title": "Valid", "author_id": 101, "currency_code": "gbp"},
+            {"id": 9112, "title": "Unknown Author", "author_id": 999999},
+            {
+                "id": 9113,
+                "title": "Unknown Genre",
+                "author_id": 101,
+                "genre_id": "99aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa",
+            },
+            {"id": 9114, "title": "Unknown Currency", "author_id": 101, "currency_code": "XXX"},
+            # malformed (unhashable) IDs are reported as given
+            {"id": [1], "title": "T", "author_id": 1},
+            {"id": {"a": 1}, "title": "T", "author_id": 1},
+        ],
+        user_name="tester",
+    )
+    assert [(result["status"], result.get("error")) for result in results][:4] == [
+        ("created", None),
+        ("invalid", "Unknown author_id - 999999"),
+        ("invalid", "Unknown genre_id - 99aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"),
+        ("invalid", "Unknown currency_code - XXX"),
+    ]
+    assert [(result["status"], result["id"]) for result in results[4:]] == [
+        ("invalid", [1]),
+        ("invalid", {"a": 1}),
+    ]
+    assert db_manager.db.session.get(Books, 9111) is not None
+    for book_id in (9112, 9113, 9114):
+        assert db_manager.db.session.get(Books, book_id) is None
+
+
+def test_upsert_books_route(client, cleanup):
+    cleanup.extend(range(9200, 9300))
+    books = [
+        {"id": i, "title": f"Batch Book {i}", "author_id": 150, "currency_code": "USD"}
+        for i in range(9200, 9300)
+    ]
+    response = client.post("/api/v1/books:batch", json=books, headers=ADMIN_AUTH)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert (data["created"], data["updated"], data["invalid"]) == (100, 0, 0)
+
+    # the catalog cache is invalidated
+    response = client.get("/api/v1/books?author=150&currency=USD&limit=500", headers=ADMIN_AUTH)
+    assert len(response.get_json()) >= 100
+
+    response = client.post("/api/v1/books:batch", json=books[:10], headers=ADMIN_AUTH)
+    assert response.get_json()["updated"] == 10
+
+
+def test_upsert_books_route_invalid(client):
+    response = client.post("/api/v1/books:batch", json={"id": 1}, headers=ADMIN_AUTH)
+    assert response.status_code == 400
+    assert response.get_json()["error"]["code"] == 4000001
+
+
+def test_upsert_books_route_forbidden(client):
+    response = client.post(
+        "/api/v1/books:batch", json=[], headers={"Authorization": "Basic bWU6bWU="}
+    )
+    assert response.status_code == 403
+
+
+@pytest.fixture()
+def stocked_books(cleanup):
+    cleanup.extend([9301, 9302])
+    upsert_books(
+        [
+            {"id": 9301, "title": "Stocked", "author_id": 101, "stock": 5},
+            {"id": 9302, "title": "Scarce", "author_id": 101, "stock": 1},
+        ],
+        user_name="tester",
+    )
+    return cleanup
+
+
+def get_stock(book_id):
+    db_manager.db.session.expire_all()
+    return db_manager.db.session.get(Books, book_id).stock
+
+
+def test_reserve_books(client, stocked_books):
+    reserved, results = reserve_books({9301: 2, 9302: 1}, user_name="buyer")
+    assert reserved
+    assert [result["status"] for result in results] == ["reserved", "reserved"]
+    assert (get_stock(9301), get_stock(9302)) == (3, 0)
+
+    # all or nothing
+    reserved, results = reserve_books({9301: 1, 9302: 1, 9999: 1}, user_name="buyer")
+    assert not reserved
+    assert [result["status"] for result in results] == [
+        "aborted",
+        "insufficient_stock",
+        "not_found",
+    ]
+    assert (get_stock(9301), get_stock(9302)) == (3, 0)
+
+
+def test_reserve_book_concurrently(app, stocked_books):
+    def reserve():
+        with app.app_context():
+            return reserve_books({9301: 1}, user_name="buyer")[0]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        outcomes = list(executor.map(lambda _: reserve(), range(20)))
+
+    # never oversold
+    assert outcomes.count(True) == 5
+    assert get_stock(9301) == 0
+
+
+def test_reserve_book_route(client, stocked_books):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    response = client.post("/api/v1/books/9302/reserve", headers=headers)
+    assert response.status_code == 200
+    assert response.get_json()["items"][0]["status"] == "reserved"
+
+    response = client.post("/api/v1/books/9302/reserve", json={"quantity": 1}, headers=headers)
+    assert response.status_code == 409
+    data = response.get_json()
+    assert data["error"]["code"] == 4090001
+    assert data["error"]["details"][0]["status"] == "insufficient_stock"
+
+    response = client.post("/api/v1/books/9999/reserve", headers=headers)
+    assert response.status_code == 404
+
+    response = client.post("/api/v1/books/9301/reserve", json={"quantity": 0}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_reserve_books_route(client, stocked_books):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    response = client.post(
+        "/api/v1/books:reserve",
+        json=[{"id": 9301, "quantity": 2}, {"id": 9301}, {"id": 9302}],
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.get_json()["items"] == [
+        {"id": 9301, "quantity": 3, "status": "reserved"},
+        {"id": 9302, "quantity": 1, "status": "reserved"},
+    ]
+
+    response = client.post("/api/v1/books:reserve", json=[{"id": 9301, "quantity": 3}], headers=headers)
+    assert response.status_code == 409
+
+    response = client.post("/api/v1/books:reserve", json=[{"id": "x"}], headers=headers)
+    assert response.status_code == 400
+
+
+def test_reserve_book_keeps_unrelated_pages_cached(client, stocked_books):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    related, unrelated = "/api/v1/books?author=101&fields=title", "/api/v1/books?author=150"
+    catalog_cache.invalidate()
+    assert client.get(related, headers=headers).status_code == 200
+    assert client.get(unrelated, headers=headers).status_code == 200
+
+    response = client.post("/api/v1/books/9302/reserve", headers=headers)
+    assert response.status_code == 200
+
+    # only the pages listing the reserved book are dropped
+    misses = catalog_cache.misses
+    assert client.get(unrelated, headers=headers).status_code == 200
+    assert catalog_cache.misses == misses
+    assert client.get(related, headers=headers).status_code == 200
+    assert catalog_cache.misses == misses + 1
@@ -0,0 +1,193 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db_manager
+from app.models import Books, Genres
+from app.services.cache_service import ResponseCache, SnapshotCache, catalog_cache
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+def test_response_cache_get_or_set():
+    cache = ResponseCache(ttl=60, max_entries=2)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return b"[]", {"Link": "next"}
+
+    entry = cache.get_or_set("a", compute)
+    assert entry.payload == b"[]"
+    assert entry.headers == {"Link": "next"}
+    assert cache.get_or_set("a", compute) == entry
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_response_cache_expiry_and_size_bound():
+    cache = ResponseCache(ttl=60, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.set(key, key.encode(), {}, cache.generation)
+
+    # least recently used entry got evicted
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.get("c").payload == b"c"
+
+    cache.ttl = 0.01
+    cache.set("d", b"d", {}, cache.generation)
+    time.sleep(0.02)
+    assert cache.get("d") is None
+
+
+def test_response_cache_skips_stale_generation():
+    cache = ResponseCache()
+    generation = cache.generation
+    cache.invalidate()
+
+    # payload computed before the invalidation must not be cached
+    entry = cache.set("a", b"stale", {}, generation)
+    assert entry.payload == b"stale"
+    assert cache.get("a") is None
+
+
+def test_response_cache_invalidate_tags():
+    cache = ResponseCache()
+    cache.set("a", b"a", {}, cache.generation, tags=[("Books", 1), ("Books", 2)])
+    cache.set("b", b"b", {}, cache.generation, tags=[("Books", 3)])
+    generation = cache.generation
+    cache.invalidate_tags([("Books", 2)])
+
+    assert cache.get("a") is None
+    assert cache.get("b").payload == b"b"
+    # payload computed before the invalidation must not be cached
+    cache.set("c", b"c", {}, generation, tags=[("Books", 4)])
+    assert cache.get("c") is None
+
+
+def test_snapshot_cache_reloads_in_background(app):
+    loads, release = [], threading.Event()
+
+    def load():
+        loads.append(threading.current_thread().name)
+        if len(loads) > 1:
+            release.wait(5)
+        return len(loads)
+
+    changes = []
+    cache = SnapshotCache("numbers", load, ttl=60, on_change=lambda: changes.append(1))
+    cache.init_app(app)
+    assert cache.get() == 1 and cache.get() == 1
+    assert loads == [threading.current_thread().name]
+
+    # the last snapshot is served until the background reload finished
+    cache.invalidate()
+    assert cache.get() == 1
+    assert cache.get() == 1
+    release.set()
+    cache.wait_for_refresh(timeout=5)
+    assert cache.get() == 2
+    assert loads[1] == "numbers-refresher"
+    assert changes == [1]
+
+
+def test_snapshot_cache_without_ttl(app):
+    loads = []
+    cache = SnapshotCache("numbers", lambda: loads.append(1) or len(loads), ttl=0)
+    cache.init_app(app)
+    # never expires, e.g. when read per row
+    assert [cache.get() for _ in range(3)] == [1, 1, 1]
+    assert len(loads) == 1
+
+    cache.invalidate()
+    cache.get()
+    cache.wait_for_refresh(timeout=5)
+    assert cache.get() == 2
+
+
+def test_snapshot_cache_without_snapshot(app):
+    def load():
+        raise OperationalError("SELECT", {}, Exception("database is locked"))
+
+    cache = SnapshotCache("broken", load)
+    cache.init_app(app)
+    cache.load = lambda: "loaded"
+    # nothing to serve yet, hence loaded by the reader
+    assert cache.get() == "loaded"
+
+
+def test_catalog_cache_invalidated_on_write(client):
+    catalog_cache.set("a", b"[]", {}, catalog_cache.generation)
+    assert catalog_cache.get("a") is not None
+
+    genre = Genres(ID=uuid.uuid4(), name="Test Genre")
+    db_manager.db.session.add(genre)
+    db_manager.db.session.commit()
+    assert catalog_cache.get("a") is None
+
+    db_manager.db.session.delete(genre)
+    db_manager.db.session.commit()
+
+
+def test_catalog_cache_invalidated_on_commit(app, client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    url = "/api/v1/books?author=101&fields=id,title"
+
+    def get_title():
+        with app.app_context():
+            books = app.test_client().get(url, headers=headers).get_json()
+        return next(book["title"] for book in books if book["id"] == 201)
+
+    book = db_manager.db.session.get(Books, 201)
+    title = book.title
+    try:
+        book.title = "Flushed Heights"
+        db_manager.db.session.flush()
+        # a request between the flush & the commit reads (& caches) the committed row
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(get_title).result() == title
+        db_manager.db.session.commit()
+        assert get_title() == "Flushed Heights"
+    finally:
+        book.title = title
+        db_manager.db.session.commit()
+
+    # rolled back changes keep the cache
+    assert get_title() == title
+    book.title = "Rolled Back Heights"
+    db_manager.db.session.flush()
+    db_manager.db.session.rollback()
+    misses = catalog_cache.misses
+    assert get_title() == title
+    assert catalog_cache.misses == misses
+
+
+def test_get_books_etag(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    response = client.get("/api/v1/books", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag
+
+    response = client.get("/api/v1/books", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.get_data() == b""
+
+    response = client.get("/api/v1/books", headers={**headers, "If-None-Match": '"other"'})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == etag
@@ -0,0 +1,96 @@
+import gzip
+
+import brotli
+import pytest
+
+from app import create_app
+from app.utils.compression_utils import response_compressor
+
+BASIC_AUTH = {"Authorization": "Basic bWU6bWU="}
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    # compress the (small) sample catalog as well
+    response_compressor.min_size = 64
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+@pytest.mark.parametrize(
+    "accept_encoding,expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("deflate", None),
+        ("", None),
+    ],
+)
+def test_get_books_compressed(client, accept_encoding, expected):
+    plain = client.get("/api/v1/books", headers=BASIC_AUTH)
+    response = client.get(
+        "/api/v1/books", headers={**BASIC_AUTH, "Accept-Encoding": accept_encoding}
+    )
+    assert response.status_code == 200
+    assert "Accept-Encoding" in response.vary
+    assert response.content_encoding == expected
+
+    payload = response.get_data()
+    if expected == "gzip":
+        payload = gzip.decompress(payload)
+    elif expected == "br":
+        payload = brotli.decompress(payload)
+    assert payload == plain.get_data()
+
+
+def test_get_books_compressed_once(client, monkeypatch):
+    compressed = []
+    compress = response_compressor.compress
+    monkeypatch.setattr(
+        response_compressor,
+        "compress",
+        lambda payload, encoding: compressed.append(encoding) or compress(payload, encoding),
+    )
+    headers = {**BASIC_AUTH, "Accept-Encoding": "gzip"}
+
+    first = client.get("/api/v1/books", headers=headers)
+    second = client.get("/api/v1/books", headers=headers)
+    assert first.get_data() == second.get_data()
+    assert compressed == ["gzip"]
+
+    client.get("/api/v1/books", headers={**BASIC_AUTH, "Accept-Encoding": "br"})
+    assert compressed == ["gzip", "br"]
+
+
+def test_get_books_compressed_etag(client):
+    plain = client.get("/api/v1/books", headers=BASIC_AUTH)
+    headers = {**BASIC_AUTH, "Accept-Encoding": "gzip"}
+    response = client.get("/api/v1/books", headers=headers)
+
+    etag = response.headers["ETag"]
+    assert etag != plain.headers["ETag"]
+
+    response = client.get("/api/v1/books", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_small_response_not_compressed(client):
+    response_compressor.min_size = 1024 * 1024
+    response = client.get("/api/v1/books", headers={**BASIC_AUTH, "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.content_encoding is None
+
+
+def test_jsonify_response_compressed(client):
+    response_compressor.min_size = 1
+    response = client.get("/health/live", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.content_encoding == "gzip"
+    assert b"UP" in gzip.decompress(response.get_data())
@@ -0,0 +1,175 @@
+import pytest
+from sqlalchemy import create_engine, event, exc, text
+
+from app import create_app, db_manager
+from app.database import (
+    REPLICA_BIND_KEY,
+    STATEMENT_STARTS_KEY,
+    DatabaseManager,
+    InstrumentedQueuePool,
+)
+
+BASIC_AUTH = {"Authorization": "Basic bWU6bWU="}
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+    db_manager.mark_replica(up=True)
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+@pytest.fixture()
+def executed_on(client):
+    """
+    Records the bind key of the engine executing every statement
+    """
+    binds = []
+    listeners = {
+        bind_key: lambda *args, bind_key=bind_key: binds.append(bind_key or "primary")
+        for bind_key in db_manager.db.engines
+    }
+    for bind_key, listener in listeners.items():
+        event.listen(db_manager.db.engines[bind_key], "before_cursor_execute", listener)
+    yield binds
+    for bind_key, listener in listeners.items():
+        event.remove(db_manager.db.engines[bind_key], "before_cursor_execute", listener)
+
+
+def test_get_pool_options():
+    config = {
+        "DB_POOL_SIZE": 4,
+        "DB_POOL_MAX_OVERFLOW": 2,
+        "DB_POOL_TIMEOUT": 5.0,
+        "DB_POOL_RECYCLE": 1800,
+        "DB_POOL_PRE_PING": True,
+    }
+    assert DatabaseManager.get_pool_options(config) == {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": 4,
+        "max_overflow": 2,
+        "pool_timeout": 5.0,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
+
+
+def test_get_sqlite_pragmas():
+    config = {
+        "DB_SQLITE_PRAGMAS": {"journal_mode": "WAL", "cache_size": -2000},
+        "DB_SQLITE_BIND_PRAGMAS": {"replica": {"journal_mode": None, "cache_size": -4000}},
+    }
+    assert DatabaseManager.get_sqlite_pragmas(config) == {
+        "journal_mode": "WAL",
+        "cache_size": -2000,
+    }
+    assert DatabaseManager.get_sqlite_pragmas(config, REPLICA_BIND_KEY) == {"cache_size": -4000}
+
+    with pytest.raises(ValueError):
+        DatabaseManager.get_sqlite_pragmas({"DB_SQLITE_PRAGMAS": {"cache_size": "1; DROP"}})
+
+
+def test_sqlite_pragmas_applied(client):
+    # the journal mode is set via the primary & persisted in the file, read by the replica
+    for bind_key in (None, REPLICA_BIND_KEY):
+        with db_manager.db.engines[bind_key].connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+            assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+
+
+def test_instrumented_queue_pool(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.sqlite3'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        status = engine.pool.get_status()
+        assert status["checked_out"] == 1
+
+        # pool is exhausted - checkout times out
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    status = engine.pool.get_status()
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 2
+    assert status["timeouts"] == 1
+    assert status["checkout_latency_buckets"]["+Inf"] == 2
+    assert status["wait_time_seconds"] > 0
+
+
+def test_statement_observers(client):
+    observed = []
+    observer = lambda conn, statement, parameters, executemany, duration: observed.append(
+        (statement, duration)
+    )
+    DatabaseManager.statement_observers.append(observer)
+    try:
+        db = db_manager.db
+        db.session.execute(text("SELECT 1"))
+        assert observed[-1][0] == "SELECT 1" and observed[-1][1] >= 0
+
+        # failed statements don't leave their start time behind in the connection
+        for _ in range(3):
+            with pytest.raises(exc.OperationalError):
+                db.session.execute(text("SELECT * FROM missing_table"))
+            db.session.rollback()
+        assert db.session.connection().info.get(STATEMENT_STARTS_KEY) == []
+        assert len(observed) == 1
+    finally:
+        DatabaseManager.statement_observers.remove(observer)
+
+
+def test_read_only_routes_use_replica(client, executed_on):
+    response = client.get("/api/v1/books?limit=1", headers=BASIC_AUTH)
+    assert response.status_code == 200
+    assert executed_on == [REPLICA_BIND_KEY]
+
+    # writes & their reads go to the primary
+    executed_on.clear()
+    response = client.post(
+        "/api/v1/books/999999/reserve", json={"quantity": 1}, headers=BASIC_AUTH
+    )
+    assert response.status_code == 404
+    assert executed_on and set(executed_on) == {"primary"}
+
+
+def test_read_only_routes_fall_back_to_primary(client, executed_on):
+    db_manager.mark_replica(up=False)
+    assert db_manager.get_replica_engine() is None
+    client.get("/api/v1/books?limit=1&sort=price", headers=BASIC_AUTH)
+    assert executed_on == ["primary"]
+
+    db_manager.mark_replica(up=True)
+    executed_on.clear()
+    client.get("/api/v1/books?limit=1&sort=stock", headers=BASIC_AUTH)
+    assert executed_on == [REPLICA_BIND_KEY]
+
+
+def test_replica_marked_down_on_connection_error(client, tmp_path):
+    engine = create_engine(f"sqlite:///file:{tmp_path / 'missing.sqlite3'}?mode=ro&uri=true")
+    event.listen(engine, "handle_error", db_manager.on_replica_error)
+    with pytest.raises(exc.OperationalError):
+        engine.connect()
+    assert db_manager.get_replica_engine() is None
+
+
+def test_health_check_replica(client):
+    response = client.get("/health")
+    assert response.status_code == 200
+    components = response.get_json()["components"]
+    assert components["db_replica"]["status"] == "UP"
+    assert set(components["pool"]["details"]) == {"default", REPLICA_BIND_KEY}
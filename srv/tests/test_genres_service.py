@@ -0,0 +1,110 @@
+import uuid
+
+import pytest
+
+from app import create_app, db_manager
+from app.models import Genres
+from app.services.genres_service import GenreTree, get_tree
+from app.services.refdata_service import Genre, genre_cache
+
+FICTION = "10aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+DRAMA = "11aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+def genre(genre_id, parent_id, name):
+    return Genre(id=genre_id, name=name, descr=None, parent_id=parent_id)
+
+
+def test_genre_tree():
+    tree = GenreTree(
+        [
+            genre("a", None, "A"),
+            genre("b", "a", "B"),
+            genre("c", "b", "C"),
+            genre("d", "a", "D"),
+            genre("e", "missing", "E"),
+        ]
+    )
+    assert tree.roots == ("a", "e")
+    assert tree.get_descendants("a") == ("a", "b", "c", "d")
+    assert tree.get_descendants("c") == ("c",)
+    assert tree.to_dict("b") == {
+        "id": "b",
+        "name": "B",
+        "descr": None,
+        "children": [{"id": "c", "name": "C", "descr": None, "children": []}],
+    }
+    with pytest.raises(KeyError):
+        tree.get_descendants("x")
+
+
+def reload_genres():
+    genre_cache.get()
+    genre_cache.wait_for_refresh(timeout=5)
+
+
+def test_genre_tree_of_cached_genres(client):
+    tree = get_tree()
+    assert get_tree() is tree
+    assert DRAMA in tree.get_descendants(FICTION)
+
+    # writing a genre reloads the cached genres & hence rebuilds the tree
+    sub_genre = Genres(ID=uuid.uuid4(), name="Test Genre", parent_ID=DRAMA)
+    db_manager.db.session.add(sub_genre)
+    db_manager.db.session.commit()
+    reload_genres()
+    assert str(sub_genre.ID) in get_tree().get_descendants(FICTION)
+
+    db_manager.db.session.delete(sub_genre)
+    db_manager.db.session.commit()
+    reload_genres()
+    assert str(sub_genre.ID) not in get_tree()
+
+
+def test_get_genre_tree(client):
+    response = client.get(
+        "/api/v1/genres/tree", headers={"Authorization": "Basic bWU6bWU="}
+    )
+    assert response.status_code == 200
+    fiction = next(root for root in response.get_json() if root["id"] == FICTION)
+    assert DRAMA in {child["id"] for child in fiction["children"]}
+
+
+def test_get_genre_books(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    books = client.get(f"/api/v1/genres/{DRAMA}/books", headers=headers).get_json()
+    assert {book["id"] for book in books} == {201, 207}
+
+    # books of all sub-genres are included
+    books = client.get(f"/api/v1/genres/{FICTION}/books", headers=headers).get_json()
+    assert {201, 207} < {book["id"] for book in books}
+
+    response = client.get(f"/api/v1/genres/{FICTION}/books?limit=1", headers=headers)
+    assert f"/api/v1/genres/{FICTION}/books?" in response.headers["Link"]
+
+
+def test_get_genre_books_invalid(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    response = client.get("/api/v1/genres/fiction/books", headers=headers)
+    assert response.status_code == 400
+
+    response = client.get(f"/api/v1/genres/{uuid.uuid4()}/books", headers=headers)
+    assert response.status_code == 404
+    assert response.get_json()["error"]["code"] == 4040001
+
+    # the genre is given by the path only
+    response = client.get(f"/api/v1/genres/{DRAMA}/books?genre={FICTION}", headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()["error"]["code"] == 4000001
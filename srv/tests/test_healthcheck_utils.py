@@ -14,3 +14,58 @@ def test_run_health_check(app):
     assert result["status"] == "UP"
     assert "db" in result["components"]
     assert result["components"]["db"]["status"] == "UP"
+
+
+def test_run_health_check_pool(app):
+    with app.app_context():
+        result = run_health_check(app.config)
+
+    pool = result["components"]["pool"]
+    assert pool["status"] == "UP"
+    stats = pool["details"]["default"]
+    assert stats["size"] == app.config["DB_POOL_SIZE"]
+    assert stats["checkouts"] >= 1
+    assert stats["checkout_latency_buckets"]["+Inf"] == stats["checkouts"]
+
+
+def test_db_health_prober(app):
+    from app.utils.heathcheck_utils import DbHealthProber
+
+    prober = DbHealthProber(interval=0)
+    prober.init_app(app)
+
+    status = prober.get_status()
+    assert status["status"] == "UP"
+    assert status["latency_ms"] >= 0
+    assert app.extensions["db_health_prober"] is prober
+
+
+def test_db_health_prober_down(app, monkeypatch):
+    from app.utils import heathcheck_utils
+
+    def failing_health_check(config):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(heathcheck_utils, "run_health_check_db", failing_health_check)
+    prober = heathcheck_utils.DbHealthProber(interval=0)
+    prober.init_app(app)
+    assert prober.probe()["status"] == "DOWN"
+
+
+def test_health_check_down(app, monkeypatch):
+    from app.utils import heathcheck_utils
+
+    def failing_health_check(config, engine=None):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(heathcheck_utils, "run_health_check_db", failing_health_check)
+    heathcheck_utils.DbHealthProber(app, interval=0)
+
+    response = app.test_client().get("/health")
+    assert response.status_code == 503
+    data = response.get_json()
+    assert data["status"] == "DOWN"
+    assert data["components"]["db"]["status"] == "DOWN"
+    assert data["components"]["pool"]["status"] == "UP"
+    # liveness doesn't depend on the database
+    assert app.test_client().get("/health/live").status_code == 200
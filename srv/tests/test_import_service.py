@@ -0,0 +1,84 @@
+import io
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import inspect
+
+from app import create_app, db_manager
+from app.models import Books, Currencies
+from app.services.import_service import batched, get_table_for_file, read_csv_rows
+from app.services.search_service import search_books
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+def test_get_table_for_file(client):
+    assert get_table_for_file("db/data/sap.sample.bookshop-Books.csv") is Books.__table__
+    assert get_table_for_file("sap.common-Currencies.csv") is Currencies.__table__
+    with pytest.raises(ValueError):
+        get_table_for_file("sap.sample.bookshop-Orders.csv")
+
+
+def test_read_csv_rows():
+    file = io.StringIO("code;symbol;NAME;minorUnit\nEUR;€;Euro;100\nXXX;;Test;\n")
+    assert list(read_csv_rows(file, Currencies.__table__)) == [
+        {"code": "EUR", "symbol": "€", "name": "Euro", "minorUnit": 100},
+        {"code": "XXX", "symbol": None, "name": "Test", "minorUnit": None},
+    ]
+
+    file = io.StringIO('ID,title,price\n1,"Quoted, ""title""",1.50\n')
+    assert list(read_csv_rows(file, Books.__table__)) == [
+        {"ID": 1, "title": 'Quoted, "title"', "price": Decimal("1.50")}
+    ]
+
+    with pytest.raises(ValueError, match="Unknown columns"):
+        list(read_csv_rows(io.StringIO("ID,isbn\n1,2\n"), Books.__table__))
+    with pytest.raises(ValueError, match="line 2"):
+        list(read_csv_rows(io.StringIO("ID,price\n1,cheap\n"), Books.__table__))
+
+
+def test_batched():
+    assert list(batched(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_import_csv_command(app, client):
+    books_count = db_manager.db.session.query(Books).count()
+    db_manager.db.session.rollback()
+
+    # re-import the sample data in tiny batches & transactions
+    result = app.test_cli_runner().invoke(
+        args=[
+            "db",
+            "import-csv",
+            "--batch-size=2",
+            "--batches-per-transaction=2",
+            "--delete-existing",
+            "--disable-indexes",
+        ]
+    )
+    assert result.exit_code == 0, result.output
+    assert f"SAP_SAMPLE_BOOKSHOP_BOOKS: {books_count} rows" in result.output
+    assert "rows/s" in result.output
+
+    assert db_manager.db.session.query(Books).count() == books_count
+    indexes = inspect(db_manager.db.engine).get_indexes(Books.__tablename__)
+    assert len(indexes) == len(Books.__table__.indexes)
+    assert search_books("raven", limit=1)["items"][0]["title"] == "The Raven"
+
+
+def test_import_csv_command_invalid_file(app, tmp_path):
+    path = tmp_path / "sap.sample.bookshop-Orders.csv"
+    path.write_text("ID\n1\n")
+    result = app.test_cli_runner().invoke(args=["db", "import-csv", str(path)])
+    assert result.exit_code != 0
+    assert "No table found" in result.output
@@ -0,0 +1,80 @@
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask import Flask, jsonify
+
+from app import create_app
+from app.utils.json_utils import OrjsonProvider, StdlibJSONProvider
+
+DATA = {
+    "id": 1,
+    "price": {"value": Decimal("12.34"), "currency": {"code": "EUR"}},
+    "genre": uuid.UUID("10aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"),
+}
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def make_provider():
+    apps = []
+
+    def make(provider_class, decimal_mode):
+        # providers reference their app weakly
+        apps.append(Flask(__name__))
+        apps[-1].config["JSON_DECIMAL_MODE"] = decimal_mode
+        return provider_class(apps[-1])
+
+    yield make
+
+
+def test_json_provider_is_orjson(app):
+    assert isinstance(app.json, OrjsonProvider)
+
+
+@pytest.mark.parametrize("provider_class", [OrjsonProvider, StdlibJSONProvider])
+@pytest.mark.parametrize(
+    "decimal_mode,expected", [("string", "12.34"), ("number", 12.34)]
+)
+def test_json_provider_decimal_mode(make_provider, provider_class, decimal_mode, expected):
+    provider = make_provider(provider_class, decimal_mode)
+    payload = provider.dumpb(DATA)
+
+    assert isinstance(payload, bytes)
+    assert provider.loads(payload) == {
+        "id": 1,
+        "price": {"value": expected, "currency": {"code": "EUR"}},
+        "genre": "10aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa",
+    }
+
+
+def test_orjson_provider_dates(make_provider):
+    provider = make_provider(OrjsonProvider, "string")
+    assert provider.loads(
+        provider.dumps(
+            {
+                "date": date(2025, 1, 31),
+                "datetime": datetime(2025, 1, 31, 12, 30, tzinfo=timezone.utc),
+            }
+        )
+    ) == {"date": "2025-01-31", "datetime": "2025-01-31T12:30:00+00:00"}
+
+
+def test_orjson_provider_unsupported_type(make_provider):
+    provider = make_provider(OrjsonProvider, "string")
+    with pytest.raises(TypeError):
+        provider.dumps({"value": object()})
+
+
+def test_orjson_provider_response(app):
+    with app.app_context():
+        response = jsonify(DATA)
+
+    assert response.mimetype == "application/json"
+    assert response.get_json()["price"]["value"] == "12.34"
@@ -0,0 +1,63 @@
+import base64
+
+import pytest
+
+from app import create_app
+from app.utils.metrics_utils import (
+    fingerprint_statement,
+    get_statement_operation,
+    normalize_statement,
+)
+
+ADMIN_AUTH = {"Authorization": "Basic " + base64.b64encode(b"admin:admin").decode()}
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+def test_normalize_statement():
+    assert (
+        normalize_statement("SELECT *  FROM t\n WHERE id IN (?, ?, ?) AND name = 'x'")
+        == "SELECT * FROM t WHERE id IN (?) AND name = ?"
+    )
+    assert fingerprint_statement("SELECT a FROM t WHERE id = 1") == fingerprint_statement(
+        "SELECT a FROM t WHERE id = :id"
+    )
+    assert fingerprint_statement("SELECT a FROM t") != fingerprint_statement(
+        "SELECT b FROM t"
+    )
+    assert get_statement_operation("  select 1") == "SELECT"
+
+
+def test_metrics_unauthorized(client):
+    assert client.get("/metrics").status_code == 401
+
+
+def test_metrics_forbidden(client):
+    response = client.get("/metrics", headers={"Authorization": "Basic bWU6bWU="})
+    assert response.status_code == 403
+    assert response.get_json()["error"]["code"] == 4030001
+
+
+def test_metrics(client):
+    client.get("/api/v1/books", headers=ADMIN_AUTH)
+
+    response = client.get("/metrics", headers=ADMIN_AUTH)
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    metrics = response.get_data(as_text=True)
+    assert 'bookstore_http_request_duration_seconds_count{endpoint="routes.get_books"' in metrics
+    assert 'bookstore_sql_statement_duration_seconds_count{fingerprint="' in metrics
+    assert 'bookstore_auth_duration_seconds_count{loader="basic",outcome="success"}' in metrics
+    assert 'bookstore_db_pool_connections{pool="default",state="checked_out"}' in metrics
+    assert 'bookstore_cache_requests_total{cache="catalog",result="miss"}' in metrics
+    assert 'bookstore_admission_requests_total{admission="immediate"}' in metrics
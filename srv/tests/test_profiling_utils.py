@@ -0,0 +1,155 @@
+import base64
+import pstats
+import sys
+import threading
+import time
+
+import pytest
+
+from app import create_app
+from app.utils import profiling_utils
+from app.utils.profiling_utils import StackSampler, request_profiler
+
+BASIC_AUTH = {"Authorization": "Basic bWU6bWU="}
+ADMIN_AUTH = {"Authorization": "Basic " + base64.b64encode(b"admin:admin").decode()}
+
+
+@pytest.fixture()
+def app(tmp_path):
+    app = create_app()
+    request_profiler.directory = str(tmp_path)
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+def busy_wait(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def profile_books(client, profile_format: str) -> str:
+    response = client.get(
+        "/api/v1/books?limit=100", headers={**ADMIN_AUTH, "X-Profile": profile_format}
+    )
+    assert response.status_code == 200
+    return response.headers["X-Profile-Id"]
+
+
+def test_unprofiled_request(client, tmp_path):
+    response = client.get("/api/v1/books", headers=ADMIN_AUTH)
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profiling_requires_login(client):
+    assert client.get("/api/v1/books", headers={"X-Profile": "pstats"}).status_code == 401
+
+
+def test_profiling_requires_scope(client):
+    response = client.get("/api/v1/books", headers={**BASIC_AUTH, "X-Profile": "pstats"})
+    assert response.status_code == 403
+    assert client.get("/profiles", headers=BASIC_AUTH).status_code == 403
+
+
+def test_profiling_unknown_format(client):
+    response = client.get("/api/v1/books", headers={**ADMIN_AUTH, "X-Profile": "flame"})
+    assert response.status_code == 400
+    assert response.get_json()["error"]["code"] == 4000001
+
+
+def test_profile_pstats(client, tmp_path):
+    profile_id = profile_books(client, "pstats")
+
+    response = client.get(f"/profiles/{profile_id}", headers=ADMIN_AUTH)
+    assert response.status_code == 200
+    assert response.mimetype == "application/octet-stream"
+    path = tmp_path / "download.pstats"
+    path.write_bytes(response.data)
+    functions = {function for _, _, function in pstats.Stats(str(path)).stats}
+    assert "get_books" in functions
+
+    response = client.get(f"/profiles/{profile_id}?format=text&sort=tottime", headers=ADMIN_AUTH)
+    assert response.status_code == 200
+    assert "get_books" in response.get_data(as_text=True)
+    assert client.get(f"/profiles/{profile_id}?format=text&sort=x", headers=ADMIN_AUTH).status_code == 400
+
+
+def test_profile_pstats_busy(client):
+    # another request is being profiled via `cProfile`
+    with profiling_utils._pstats_lock:
+        response = client.get("/api/v1/books", headers={**ADMIN_AUTH, "X-Profile": "pstats"})
+    assert response.status_code == 503
+    assert response.get_json()["error"]["code"] == 5030001
+    assert response.headers["Retry-After"] == "1"
+
+    assert profile_books(client, "pstats")
+    assert not profiling_utils._pstats_lock.locked()
+
+
+def test_profile_collapsed(client):
+    profile_id = profile_books(client, "collapsed")
+
+    response = client.get(f"/profiles/{profile_id}", headers=ADMIN_AUTH)
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    for line in response.get_data(as_text=True).splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert ";" in stack and int(count) > 0
+
+
+def test_list_profiles(client):
+    first = profile_books(client, "pstats")
+    second = profile_books(client, "collapsed")
+
+    profiles = client.get("/profiles", headers=ADMIN_AUTH).get_json()
+    assert [profile["id"] for profile in profiles] == [second, first]
+    assert profiles[0]["path"] == "/api/v1/books?limit=100"
+    assert profiles[0]["endpoint"] == "routes.get_books"
+    assert profiles[0]["status"] == 200
+
+    assert client.get("/profiles/unknown", headers=ADMIN_AUTH).status_code == 404
+
+
+def test_prune_profiles(client):
+    request_profiler.max_profiles = 2
+    profile_ids = [profile_books(client, "pstats") for _ in range(3)]
+
+    profiles = client.get("/profiles", headers=ADMIN_AUTH).get_json()
+    assert [profile["id"] for profile in profiles] == profile_ids[:0:-1]
+    assert client.get(f"/profiles/{profile_ids[0]}", headers=ADMIN_AUTH).status_code == 404
+
+
+def test_stack_sampler():
+    switch_interval = sys.getswitchinterval()
+    sampler = StackSampler(threading.get_ident(), interval=0.001)
+    sampler.enable()
+    busy_wait(0.05)
+    sampler.disable()
+
+    assert sys.getswitchinterval() == switch_interval
+    assert sum(sampler.stacks.values()) > 0
+    stack, count = sampler.to_collapsed().splitlines()[0].rsplit(" ", 1)
+    assert stack.split(";")[-1].startswith("busy_wait (")
+    assert int(count) > 0
+
+
+def test_stack_sampler_failing_to_start(monkeypatch):
+    switch_interval = sys.getswitchinterval()
+    sampler = StackSampler(threading.get_ident(), interval=0.001)
+
+    def start():
+        raise RuntimeError("can't start new thread")
+
+    monkeypatch.setattr(sampler._thread, "start", start)
+    with pytest.raises(RuntimeError):
+        sampler.enable()
+    sampler.disable()
+    assert sys.getswitchinterval() == switch_interval
+    assert StackSampler._active == 0
@@ -0,0 +1,100 @@
+import functools
+import logging
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app, db_manager
+from app.services.cache_service import catalog_cache
+from app.utils.query_utils import (
+    QueryBudgetExceeded,
+    explain_statement,
+    get_query_budget,
+    query_budget,
+)
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    app.config.update(TESTING=True)
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+def get_query_count(response) -> int:
+    server_timing = response.headers["Server-Timing"]
+    return int(server_timing.split('desc="')[1].split(" ")[0])
+
+
+def test_get_books_query_budget(client):
+    catalog_cache.invalidate()
+    response = client.get("/api/v1/books", headers={"Authorization": "Basic bWU6bWU="})
+    assert response.status_code == 200
+    assert get_query_count(response) == 1
+
+
+def test_health_check_live_query_budget(client):
+    response = client.get("/health/live")
+    assert response.status_code == 200
+    assert get_query_count(response) == 0
+
+
+def test_query_budget_exceeded(app):
+    @query_budget(1)
+    def chatty():
+        for _ in range(2):
+            db_manager.db.session.execute(text("SELECT 1"))
+        return "done"
+
+    app.add_url_rule("/chatty", view_func=chatty)
+    with pytest.raises(QueryBudgetExceeded):
+        app.test_client().get("/chatty")
+
+    # not enforced - only logged
+    app.config["SQL_QUERY_BUDGET_ENFORCE"] = False
+    assert app.test_client().get("/chatty").status_code == 200
+
+
+def test_get_query_budget():
+    def decorator(f):
+        # like `functools.wraps`, but not copying the `__dict__` of the wrapped function
+        return functools.update_wrapper(lambda *args, **kwargs: f(*args, **kwargs), f, updated=())
+
+    @decorator
+    @query_budget(2)
+    @decorator
+    def view():
+        pass
+
+    assert "query_budget" not in view.__dict__
+    assert get_query_budget(view) == 2
+    assert get_query_budget(decorator(lambda: None)) is None
+    assert get_query_budget(None) is None
+
+
+def test_slow_query_log(app, caplog):
+    app.config["SQL_SLOW_QUERY_THRESHOLD_MS"] = 0
+    with app.app_context(), caplog.at_level(logging.WARNING, logger="sql-query"):
+        db_manager.db.session.execute(
+            text("SELECT ID FROM SAP_SAMPLE_BOOKSHOP_BOOKS WHERE ID = :id"), {"id": 201}
+        )
+
+    assert "Slow SQL statement" in caplog.text
+    assert "Query plan:" in caplog.text
+    assert "SAP_SAMPLE_BOOKSHOP_BOOKS" in caplog.text
+
+
+def test_explain_statement_sqlite():
+    import sqlite3
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT)")
+    plan = explain_statement(conn, "sqlite", "SELECT * FROM t WHERE id = ?", (1,))
+    assert "SEARCH t USING INTEGER PRIMARY KEY" in plan
+    assert explain_statement(conn, "sqlite", "SELECT * FROM missing", ()) is None
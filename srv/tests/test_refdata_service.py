@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db_manager
+from app.models import Currencies
+from app.services import refdata_service
+from app.services.refdata_service import currency_cache, genre_cache
+
+BASIC_AUTH = {"Authorization": "Basic bWU6bWU="}
+DRAMA = "11aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+@pytest.fixture()
+def statements(client):
+    """
+    Records the SQL statements executed on any engine
+    """
+    executed = []
+    listener = lambda conn, cursor, statement, *args: executed.append(statement)
+    engines = list(db_manager.db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", listener)
+    yield executed
+    for engine in engines:
+        event.remove(engine, "before_cursor_execute", listener)
+
+
+def test_code_lists_loaded_at_startup(client, statements):
+    assert refdata_service.get_currency("GBP").symbol == "£"
+    assert refdata_service.get_genre(DRAMA).name == "Drama"
+    assert refdata_service.get_currency("XXX") is None
+    assert refdata_service.get_genre(None) is None
+    assert statements == []
+
+
+def test_currency_cache_invalidated_on_write(client):
+    currencies = currency_cache.get()
+    with pytest.raises(TypeError):
+        currencies["XTS"] = None
+
+    currency = Currencies(code="XTS", name="Test Currency", symbol="¤")
+    db_manager.db.session.add(currency)
+    db_manager.db.session.commit()
+    try:
+        # the last snapshot is served while reloading
+        assert refdata_service.get_currency("XTS") is None
+        currency_cache.wait_for_refresh(timeout=5)
+        assert refdata_service.get_currency("XTS").symbol == "¤"
+        assert currency_cache.get() is not currencies
+    finally:
+        db_manager.db.session.delete(currency)
+        db_manager.db.session.commit()
+    currency_cache.get()
+    currency_cache.wait_for_refresh(timeout=5)
+    assert refdata_service.get_currency("XTS") is None
+
+
+def test_get_books_resolves_code_lists(client, statements):
+    response = client.get("/api/v1/books?limit=500", headers=BASIC_AUTH)
+    assert response.status_code == 200
+    book = next(book for book in response.get_json() if book["id"] == 201)
+    assert book["price"]["currency"] == {"code": "GBP", "symbol": "£"}
+    assert book["genre"] == "Drama"
+
+    # code lists are neither joined nor loaded per request
+    assert not any("CURRENCIES" in sql or "GENRES" in sql for sql in statements)
+
+
+def test_get_currencies(client):
+    response = client.get("/api/v1/currencies", headers=BASIC_AUTH)
+    assert response.status_code == 200
+    currencies = response.get_json()
+    assert [currency["code"] for currency in currencies] == sorted(
+        currency["code"] for currency in currencies
+    )
+    assert {
+        "code": "EUR",
+        "name": "Euro",
+        "descr": "European Euro",
+        "symbol": "€",
+        "minor_unit": 100,
+    } in currencies
+
+
+def test_get_genres(client):
+    response = client.get("/api/v1/genres", headers=BASIC_AUTH)
+    assert response.status_code == 200
+    drama = next(genre for genre in response.get_json() if genre["id"] == DRAMA)
+    assert drama["name"] == "Drama"
+    assert drama["parent_id"] == "10aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa"
+    assert len(response.get_json()) == len(genre_cache.get())
@@ -0,0 +1,154 @@
+import pytest
+from sqlalchemy import event, inspect, text
+
+import config
+from app import create_app, db_manager
+from app.models import Books
+from app.services.search_service import (
+    SqliteSearchBackend,
+    decode_search_cursor,
+    encode_search_cursor,
+    get_search_terms,
+    search_books,
+)
+
+
+@pytest.fixture()
+def app():
+    app = create_app()
+    yield app
+
+
+@pytest.fixture()
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+def test_get_search_terms():
+    assert get_search_terms('"raven" OR -poe*') == ["raven", "OR", "poe"]
+    with pytest.raises(ValueError):
+        get_search_terms(" %* ")
+
+
+def test_search_cursor():
+    assert decode_search_cursor(encode_search_cursor(50)) == 50
+    with pytest.raises(ValueError):
+        decode_search_cursor("not-a-cursor")
+
+
+def test_search_books_ranked(client):
+    # matches in the title rank before matches in the description only
+    page = search_books("heights", limit=10)
+    assert page["items"][0]["title"] == "Wuthering Heights"
+
+    # all words must match
+    assert search_books("raven nevermore", limit=10)["items"][0]["title"] == "The Raven"
+    assert search_books("raven heights", limit=10)["items"] == []
+
+
+def test_search_index_in_sync(client):
+    book = Books(
+        ID=9001,
+        title="Zyxwvut Chronicles",
+        descr="A book about searching",
+        stock=1,
+        price=1,
+        AUTHOR_ID=101,
+        genre_ID="11aaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa",
+        currency_code="GBP",
+        createdBy="tester",
+        modifiedBy="tester",
+    )
+    db_manager.db.session.add(book)
+    db_manager.db.session.commit()
+    assert [b["id"] for b in search_books("zyxwvut", limit=10)["items"]] == [9001]
+
+    book.title = "Renamed Chronicles"
+    db_manager.db.session.commit()
+    assert search_books("zyxwvut", limit=10)["items"] == []
+    assert [b["id"] for b in search_books("renamed", limit=10)["items"]] == [9001]
+
+    db_manager.db.session.delete(book)
+    db_manager.db.session.commit()
+    assert search_books("renamed", limit=10)["items"] == []
+
+
+@pytest.fixture()
+def rebuilds(client):
+    """
+    Records the statements rebuilding the full-text index
+    """
+    statements = []
+
+    def listener(conn, cursor, statement, *args):
+        if "'rebuild'" in statement:
+            statements.append(statement)
+
+    event.listen(db_manager.db.engine, "before_cursor_execute", listener)
+    yield statements
+    event.remove(db_manager.db.engine, "before_cursor_execute", listener)
+
+
+def test_search_setup_keeps_index(client, rebuilds):
+    backend = SqliteSearchBackend()
+    backend.setup()
+    assert rebuilds == []
+
+    # re-created triggers of an index in sync don't rebuild it
+    backend.drop_triggers()
+    backend.setup()
+    assert rebuilds == []
+    with db_manager.db.engine.connect() as conn:
+        assert backend.is_in_sync(conn)
+
+
+def test_search_setup_rebuilds_stale_index(client, rebuilds):
+    backend = SqliteSearchBackend()
+    backend.drop_triggers()
+    with db_manager.db.engine.begin() as conn:
+        conn.execute(
+            text(
+                f'INSERT INTO "{Books.__tablename__}" (ID, title, stock, price, AUTHOR_ID) '
+                "VALUES (9002, 'Qwertzuiop Tales', 1, 1, 101)"
+            )
+        )
+
+    backend.setup()
+    assert len(rebuilds) == 1
+    assert [b["id"] for b in search_books("qwertzuiop", limit=10)["items"]] == [9002]
+
+    db_manager.db.session.delete(db_manager.db.session.get(Books, 9002))
+    db_manager.db.session.commit()
+    assert search_books("qwertzuiop", limit=10)["items"] == []
+
+
+def test_search_setup_without_books_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        config.DevelopmentConfig,
+        "SQLALCHEMY_DATABASE_URI",
+        f"sqlite:///{tmp_path / 'empty.sqlite3'}",
+    )
+    monkeypatch.setattr(config.DevelopmentConfig, "SQLALCHEMY_BINDS", {})
+
+    app = create_app()
+    with app.app_context():
+        assert not inspect(db_manager.db.engine).has_table(SqliteSearchBackend.FTS_TABLE)
+
+
+def test_search_books_route(client):
+    headers = {"Authorization": "Basic bWU6bWU="}
+    response = client.get("/api/v1/books/search?q=the&limit=1", headers=headers)
+    assert response.status_code == 200
+    first_page = response.get_json()
+    assert len(first_page) == 1
+
+    # follow the `next` link to the second page
+    next_url = response.headers["Link"].split(">")[0][1:]
+    second_page = client.get(next_url, headers=headers).get_json()
+    assert len(second_page) == 1
+    assert second_page[0]["id"] != first_page[0]["id"]
+
+    response = client.get("/api/v1/books/search?q=", headers=headers)
+    assert response.status_code == 400
+    assert response.get_json()["error"]["code"] == 4000001
@@ -0,0 +1,116 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+from flask import Flask
+from sap.xssec.security_context_xsuaa import SecurityContextXSUAA
+
+from app.utils import xsuaa_key_utils
+from app.utils.xsuaa_key_utils import VerificationKeyRefresher, get_jkus, supports_key_cache
+
+CREDENTIALS = {"uaadomain": "uaa.example.com", "identityzoneid": "zone-1"}
+
+
+@pytest.fixture()
+def token_keys_server():
+    """
+    Local stand-in for the XSUAA `token_keys` endpoint
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        keys = [{"kid": "key-1", "value": "-----BEGIN PUBLIC KEY-----..."}]
+        status = 200
+
+        def do_GET(self):
+            self.send_response(Handler.status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps({"keys": Handler.keys}).encode())
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.handler = Handler
+    server.url = f"http://127.0.0.1:{server.server_port}/token_keys"
+    yield server
+    server.shutdown()
+
+
+def get_cached_key(jku, kid):
+    cache = SecurityContextXSUAA.verificationKeyCache
+    entry = cache._cache.get(cache._create_cache_key(jku, kid))
+    return entry.key if entry and entry.is_valid() else None
+
+
+def test_get_jkus():
+    assert get_jkus(CREDENTIALS) == [
+        "https://uaa.example.com/token_keys",
+        "https://uaa.example.com/token_keys?zid=zone-1",
+    ]
+    assert get_jkus({"url": "https://uaa.example.com"}) == [
+        "https://uaa.example.com/token_keys"
+    ]
+    assert get_jkus({}) == []
+
+
+def test_refresh_warms_xssec_key_cache(token_keys_server):
+    refresher = VerificationKeyRefresher()
+    refresher.credentials = CREDENTIALS
+    refresher.token_keys_url = token_keys_server.url
+
+    assert refresher.refresh()
+    for jku in get_jkus(CREDENTIALS):
+        assert get_cached_key(jku, "key-1") == "-----BEGIN PUBLIC KEY-----..."
+
+
+def test_refresh_keeps_last_known_good_keys(token_keys_server):
+    refresher = VerificationKeyRefresher()
+    refresher.credentials = CREDENTIALS
+    refresher.token_keys_url = token_keys_server.url
+    assert refresher.refresh()
+
+    # key endpoint fails - last known good keys remain cached
+    token_keys_server.handler.status = 503
+    assert not refresher.refresh()
+    jku = get_jkus(CREDENTIALS)[0]
+    assert refresher.get_keys(jku) == {"key-1": "-----BEGIN PUBLIC KEY-----..."}
+    assert get_cached_key(jku, "key-1") == "-----BEGIN PUBLIC KEY-----..."
+
+
+def test_background_refresh(token_keys_server):
+    refresher = VerificationKeyRefresher(refresh_interval=0.01)
+    refresher.credentials = CREDENTIALS
+    refresher.token_keys_url = token_keys_server.url
+    assert refresher.refresh()
+
+    # rotated key gets picked up by the background thread
+    token_keys_server.handler.keys = [{"kid": "key-2", "value": "rotated"}]
+    refresher.start()
+    try:
+        for _ in range(500):
+            if get_cached_key(get_jkus(CREDENTIALS)[0], "key-2"):
+                break
+            threading.Event().wait(0.01)
+    finally:
+        refresher.stop()
+
+    assert get_cached_key(get_jkus(CREDENTIALS)[0], "key-2") == "rotated"
+
+
+def test_prefetch_skipped_without_key_cache(monkeypatch, caplog):
+    assert supports_key_cache()
+    # another `sap-xssec` version without the key cache internals
+    monkeypatch.setattr(xsuaa_key_utils, "key_cache", None)
+    assert not supports_key_cache()
+
+    app = Flask(__name__)
+    app.config["AUTH_XSUAA_CRED"] = CREDENTIALS
+    refresher = VerificationKeyRefresher()
+    refresher.init_app(app)
+    assert refresher.last_refresh_at is None
+    assert refresher._thread is None
+    assert "Skipping verification key prefetch" in caplog.text